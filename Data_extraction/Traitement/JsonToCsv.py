@@ -1,21 +1,22 @@
-import csv
-import json
+"""Export CSV des offres traitées, en flux.
 
-# Charger les données JSON
-with open("processed_jobs.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
+Les offres sont lues une à une (tableau "results" de processed_jobs.json, tableau JSON
+ou JSONL, éventuellement compressés en gzip) et écrites par lots: la mémoire utilisée
+ne dépend pas de la taille du jeu de données.
 
-# Accéder à la liste selon la clé réelle
-data = data["results"]  # ← adapte ce nom selon la structure réelle
+Usage: python -m data_extraction.Traitement.JsonToCsv [processed_jobs.json]
+       [--output processed_jobs.csv] [--gzip]
+"""
 
+import argparse
+import csv
+import itertools
+import logging
 
-# S'assurer que les données sont une liste
-if not isinstance(data, list):
-    print("Erreur : le fichier JSON ne contient pas une liste d'offres d'emploi.")
-    exit()
+from data_extraction.Traitement.json_stream import iter_records, open_text
 
-# Définir les champs à écrire dans le CSV (dans l'ordre souhaité)
-fieldnames = [
+# Champs écrits dans le CSV (dans l'ordre souhaité)
+FIELDNAMES = [
     "job_url",
     "title",
     "company",
@@ -32,14 +33,77 @@ fieldnames = [
     "niveau_qualification",
 ]
 
-# Écrire dans le fichier CSV
-with open("processed_jobs.csv", "w", newline="", encoding="utf-8") as csvfile:
-    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-    writer.writeheader()
+# Nombre de lignes écrites à la fois, et taille du tampon du fichier de sortie
+CHUNK_ROWS = 1000
+BUFFER_SIZE = 1 << 20
+
+
+def export_csv(
+    input_path,
+    output_path,
+    fieldnames=FIELDNAMES,
+    member="results",
+    chunk_rows=CHUNK_ROWS,
+):
+    """Écrit les offres de `input_path` dans le CSV `output_path`, retourne leur nombre.
+
+    Le CSV est compressé en gzip si `output_path` finit par .gz.
 
-    for item in data:
+    member: la clé du tableau des offres quand le fichier JSON contient un objet
+    """
+    rows = (
         # Si un champ est manquant, mettre une valeur vide
-        row = {key: item.get(key, "") for key in fieldnames}
-        writer.writerow(row)
+        {key: item.get(key, "") for key in fieldnames}
+        for item in iter_records(input_path, member=member)
+    )
+    count = 0
+    if output_path.endswith(".gz"):
+        output = open_text(output_path, "w")
+    else:
+        output = open(
+            output_path, "w", newline="", encoding="utf-8", buffering=BUFFER_SIZE
+        )
+    with output:
+        writer = csv.DictWriter(output, fieldnames=fieldnames)
+        writer.writeheader()
+        while chunk := list(itertools.islice(rows, chunk_rows)):
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export CSV en flux des offres traitées (JSON, JSONL, .gz)."
+    )
+    parser.add_argument("input", nargs="?", default="processed_jobs.json")
+    parser.add_argument("--output", default="processed_jobs.csv")
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Compresser le CSV (ajoute .gz au nom de sortie)",
+    )
+    parser.add_argument(
+        "--member",
+        default="results",
+        help="Clé du tableau des offres dans un fichier JSON objet",
+    )
+    parser.add_argument(
+        "--fields",
+        nargs="+",
+        default=FIELDNAMES,
+        help="Champs à écrire, dans l'ordre",
+    )
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    output = args.output
+    if args.gzip and not output.endswith(".gz"):
+        output += ".gz"
+    count = export_csv(args.input, output, args.fields, args.member, args.chunk_rows)
+    logging.info(f"Conversion terminée : {output} créé avec {count} offres.")
+
 
-print("Conversion terminée : processed_jobs.csv créé avec succès.")
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
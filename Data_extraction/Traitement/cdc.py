@@ -0,0 +1,280 @@
+"""Empreinte du contenu des offres et flux des changements entre deux fusions.
+
+Chaque offre normalisée porte un "content_hash" calculé sur ses champs de contenu. En
+comparant ces empreintes à celles de la fusion précédente (gardées dans un fichier
+SQLite), on produit un delta JSONL des offres ajoutées, modifiées ou disparues: les
+étapes coûteuses (classification Groq de pipline.py, ...) ne traitent que ce delta.
+
+Une ligne du delta:
+{"op": "insert" | "update" | "delete", "key": {champ: valeur}, "content_hash": ...,
+ "previous_hash": ..., "offer": {...}}
+("previous_hash" n'est présent que pour "update", "offer" est absent pour "delete")
+
+Chaque capture écrit son propre delta (merged_jobs.delta.000012.jsonl pour la 12e), et
+chaque étape qui les consomme a un curseur dans le fichier d'état: elle relit tous les
+deltas postérieurs à son curseur, et ne l'avance qu'une fois son traitement réussi. Une
+étape qui n'a pas tourné, ou qui a échoué, reprend donc tous les changements manqués.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+
+from data_extraction.Traitement.json_stream import iter_records
+
+# Champs qui ne décrivent pas le contenu de l'offre: une nouvelle source dans "via"
+# ne rend pas l'offre "modifiée"
+NON_CONTENT_FIELDS = ("via", "content_hash", "job_url")
+
+OPS = ("insert", "update", "delete")
+
+
+def content_hash(offer):
+    """Empreinte stable (SHA-256) des champs de contenu de l'offre, indépendante de
+    l'ordre des clés.
+    """
+    content = {k: v for k, v in offer.items() if k not in NON_CONTENT_FIELDS}
+    canonical = json.dumps(
+        content, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def with_content_hash(offer):
+    """Ajoute (ou recalcule) le champ "content_hash" de l'offre, et la retourne."""
+    offer["content_hash"] = content_hash(offer)
+    return offer
+
+
+def offer_key(offer, unique_keys):
+    """La clé d'unicité de l'offre, {champ: valeur}."""
+    return {k: offer.get(k) for k in unique_keys}
+
+
+def _key_text(key):
+    return json.dumps(key, sort_keys=True, ensure_ascii=False)
+
+
+class ChangeCapture:
+    """Empreintes des offres de la dernière fusion, pour en déduire les changements.
+
+    path: le fichier SQLite d'état, ex: merged_jobs.cdc.sqlite
+
+    unique_keys: les champs qui identifient une offre (ceux de la fusion), inutiles pour
+    ne lire que les deltas (pending, ack)
+    """
+
+    def __init__(self, path, unique_keys=()):
+        self.unique_keys = list(unique_keys)
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS offers (key TEXT PRIMARY KEY, "
+                "content_hash TEXT NOT NULL, run INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs (run INTEGER PRIMARY KEY, "
+                "inserted INTEGER, updated INTEGER, deleted INTEGER, delta TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cursors (consumer TEXT PRIMARY KEY, "
+                "run INTEGER NOT NULL)"
+            )
+
+    def capture(self, offers, delta_path, complete=True):
+        """Compare les offres à la fusion précédente et écrit le delta JSONL de ce
+        passage (voir delta_file), sauf s'il n'y a aucun changement.
+
+        complete: `offers` est tout le jeu fusionné; sinon ce ne sont que les offres
+        ajoutées ou modifiées depuis la capture précédente (fusion incrémentale), et
+        les offres absentes ne sont pas considérées comme disparues.
+
+        Le delta est écrit dans un fichier temporaire puis renommé, et l'état n'est
+        validé qu'ensuite: un arrêt en cours de route rejoue le même delta au prochain
+        passage au lieu de perdre des changements.
+
+        Retourne {op: nombre d'offres}.
+        """
+        counts = dict.fromkeys(OPS, 0)
+        run = (self._conn.execute("SELECT MAX(run) FROM runs").fetchone()[0] or 0) + 1
+        delta_path = delta_file(delta_path, run)
+        tmp_path = delta_path + ".tmp"
+        try:
+            with self._conn, open(tmp_path, "w", encoding="utf-8") as delta:
+                for offer in offers:
+                    key = offer_key(offer, self.unique_keys)
+                    digest = offer.get("content_hash") or content_hash(offer)
+                    row = self._conn.execute(
+                        "SELECT content_hash FROM offers WHERE key = ?",
+                        (_key_text(key),),
+                    ).fetchone()
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO offers (key, content_hash, run) "
+                        "VALUES (?, ?, ?)",
+                        (_key_text(key), digest, run),
+                    )
+                    if row is not None and row[0] == digest:
+                        continue
+                    op = "insert" if row is None else "update"
+                    entry = {"op": op, "key": key, "content_hash": digest}
+                    if row is not None:
+                        entry["previous_hash"] = row[0]
+                    entry["offer"] = offer
+                    delta.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    counts[op] += 1
+                if complete:
+                    # Les offres absentes de cette fusion ont disparu
+                    for key, digest in self._conn.execute(
+                        "SELECT key, content_hash FROM offers WHERE run < ?", (run,)
+                    ).fetchall():
+                        entry = {
+                            "op": "delete",
+                            "key": json.loads(key),
+                            "content_hash": digest,
+                        }
+                        delta.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                        counts["delete"] += 1
+                    self._conn.execute("DELETE FROM offers WHERE run < ?", (run,))
+                changed = any(counts.values())
+                self._conn.execute(
+                    "INSERT INTO runs (run, inserted, updated, deleted, delta) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        run,
+                        counts["insert"],
+                        counts["update"],
+                        counts["delete"],
+                        os.path.abspath(delta_path) if changed else None,
+                    ),
+                )
+                if changed:
+                    delta.flush()
+                    os.fsync(delta.fileno())
+                    os.replace(tmp_path, delta_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logging.info(
+            f"Passage {run} ({delta_path}): {counts['insert']} ajoutées, "
+            f"{counts['update']} modifiées, {counts['delete']} disparues."
+        )
+        return counts
+
+    def pending(self, consumer):
+        """Les deltas que l'étape `consumer` n'a pas encore traités: paires (passage,
+        fichier), dans l'ordre des fusions.
+        """
+        row = self._conn.execute(
+            "SELECT run FROM cursors WHERE consumer = ?", (consumer,)
+        ).fetchone()
+        return self._conn.execute(
+            "SELECT run, delta FROM runs WHERE run > ? AND delta IS NOT NULL "
+            "ORDER BY run",
+            (row[0] if row else 0,),
+        ).fetchall()
+
+    def ack(self, consumer, run):
+        """Enregistre que l'étape `consumer` a traité les deltas jusqu'au passage `run`."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cursors (consumer, run) VALUES (?, ?)",
+                (consumer, run),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def delta_file(delta_path, run):
+    """Le delta du passage `run`: merged_jobs.delta.jsonl -> merged_jobs.delta.000012.jsonl"""
+    root, ext = os.path.splitext(delta_path)
+    return f"{root}.{run:06d}{ext or '.jsonl'}"
+
+
+def iter_delta(path, ops=OPS):
+    """Parcourt les lignes d'un delta JSONL dont l'opération est dans `ops`."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if entry["op"] in ops:
+                    yield entry
+
+
+def apply_delta(results, delta_paths):
+    """Prépare une étape coûteuse à ne traiter que les deltas `delta_paths`, dans l'ordre
+    des fusions (voir ChangeCapture.pending).
+
+    results: les offres déjà traitées par l'étape lors des passages précédents, qui ont
+    gardé leur "content_hash" (sinon elles sont retrouvées par leur clé)
+
+    Retourne (résultats à conserver, offres à (re)traiter): les offres modifiées ou
+    disparues sont retirées des résultats, la dernière version des offres ajoutées ou
+    modifiées est à traiter, sauf si elle figure déjà dans les résultats (traitée lors
+    d'un passage précédent qui n'a pas abouti pour toutes les offres).
+    """
+    stale_hashes = set()
+    stale_keys = set()
+    key_fields = ()
+    pending = {}
+    for delta_path in delta_paths:
+        for entry in iter_delta(delta_path):
+            key_fields = entry["key"].keys()
+            key = _key_text(entry["key"])
+            if entry["op"] == "insert":
+                pending[key] = entry
+                continue
+            stale_keys.add(key)
+            if entry["op"] == "update":
+                stale_hashes.add(entry["previous_hash"])
+                pending[key] = entry
+            else:
+                stale_hashes.add(entry["content_hash"])
+                pending.pop(key, None)
+    kept = []
+    for result in results:
+        if "content_hash" in result:
+            stale = result["content_hash"] in stale_hashes
+        else:
+            stale = _key_text(offer_key(result, key_fields)) in stale_keys
+        if not stale:
+            kept.append(result)
+    done = {result.get("content_hash") for result in kept}
+    return kept, [
+        entry["offer"]
+        for entry in pending.values()
+        if entry["content_hash"] not in done
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Delta JSONL des offres ajoutées, modifiées ou disparues depuis la "
+        "dernière fusion."
+    )
+    parser.add_argument("merged", help="Le jeu fusionné (JSON, JSONL)")
+    parser.add_argument("--state", default="merged_jobs.cdc.sqlite")
+    parser.add_argument(
+        "--delta",
+        default="merged_jobs.delta.jsonl",
+        help="Nom des deltas, numérotés par passage: merged_jobs.delta.000012.jsonl",
+    )
+    parser.add_argument(
+        "--unique_keys", nargs="+", default=["title", "publication_date"]
+    )
+    args = parser.parse_args()
+
+    capture = ChangeCapture(args.state, args.unique_keys)
+    try:
+        capture.capture(iter_records(args.merged), args.delta)
+    finally:
+        capture.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
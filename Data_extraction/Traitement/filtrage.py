@@ -1,9 +1,21 @@
 #!/usr/bin/env python
 import argparse
+import collections
+import concurrent.futures
+import itertools
 import json
 import logging
 import os
-from datetime import datetime
+import sqlite3
+import tempfile
+
+from data_extraction.dates import normalize_date
+from data_extraction.Traitement.cdc import ChangeCapture, with_content_hash
+from data_extraction.Traitement.json_stream import iter_from, iter_records, source_files
+from data_extraction.Traitement.near_duplicates import (
+    merge_near_duplicates,
+    near_duplicate_settings,
+)
 
 # Configuration du logging
 logging.basicConfig(
@@ -18,39 +30,17 @@ def clean_string(value):
     return value.strip() if isinstance(value, str) else value
 
 
-def parse_date_value(date_str):
+def parse_date_value(date_str, source=None):
     """
-    Essaie de parser une date donnée en utilisant plusieurs formats connus.
-    Si la date est parsée avec succès, elle est retournée au format ISO (YYYY-MM-DD).
-    Pour les formats sans année (défini par une année par défaut de 1900), on remplace
-    l'année par l'année en cours.
+    Convertit une date au format ISO (YYYY-MM-DD), voir data_extraction.dates.
+    Pour les formats sans année (ex: "10 Apr-10:20"), l'année courante est utilisée.
     Si aucun format ne correspond, la date d'origine est retournée.
+
+    source: le site d'origine, dont les formats habituels sont essayés en premier
     """
     if not date_str or not isinstance(date_str, str):
         return date_str
-
-    # Liste de formats à essayer. On ajoute le format pour "10 Apr-10:20".
-    formats = [
-        "%d/%m/%Y",  # Format typique d/m/Y
-        "%Y/%m/%d",  # Format Y/m/d
-        "%Y-%m-%d",  # Format ISO
-        "%d-%m-%Y",  # Format d-m-Y
-        "%m/%d/%Y",  # Format US
-        "%d %b-%H:%M",  # Format pour "10 Apr-10:20" (année manquante, renvoie 1900 par défaut)
-    ]
-
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(date_str, fmt)
-            # Si l'année n'est pas renseignée et reste à 1900, on remplace par l'année courante
-            if dt.year == 1900:
-                dt = dt.replace(year=datetime.now().year)
-            return dt.strftime("%Y-%m-%d")
-        except ValueError:
-            continue
-
-    logging.warning(f"Aucun format reconnu pour la date '{date_str}'.")
-    return date_str
+    return normalize_date(date_str, source, default=date_str)
 
 
 # Normalisation pour le format Rekrute (anciennement Recrut)
@@ -79,7 +69,7 @@ def normalize_rekrute(entry, source):
         "contrat": clean_string(entry.get("type_contrat")),
         "region": None,  # Non renseigné pour ce format
         "competences": entry.get("required_skills"),
-        "publication_date": parse_date_value(entry.get("publication_start")),
+        "publication_date": parse_date_value(entry.get("publication_start"), "rekrute"),
         "secteur": clean_string(entry.get("secteur")),
         "salaire": None,
         "domaine": None,
@@ -137,7 +127,9 @@ def normalize_marroc(entry, source):
         "contrat": clean_string(entry.get("contrat")),
         "region": region,
         "competences": competences,
-        "publication_date": parse_date_value(entry.get("date_publication")),
+        "publication_date": parse_date_value(
+            entry.get("date_publication"), "marocannonces"
+        ),
         "secteur": None,
         "salaire": clean_string(entry.get("salaire")),
         "domaine": clean_string(entry.get("domaine")),
@@ -164,7 +156,7 @@ def normalize_emploisma(entry, source):
         "contrat": clean_string(entry.get("contrat")),
         "region": clean_string(entry.get("region")),
         "competences": entry.get("competences"),
-        "publication_date": parse_date_value(entry.get("publication_date")),
+        "publication_date": parse_date_value(entry.get("publication_date"), "emploi"),
         "secteur": None,
         "salaire": None,
         "domaine": None,
@@ -173,10 +165,88 @@ def normalize_emploisma(entry, source):
     return normalized
 
 
+# Normalisation par source, aussi utilisée par les processus de normalize_parallel
+NORMALIZERS = {
+    "Rekrute": normalize_rekrute,
+    "MarrocAnnonces": normalize_marroc,
+    "Emplois.ma": normalize_emploisma,
+}
+
+CHUNK_SIZE = 2000
+
+
+def normalize_offer(item, source):
+    """Normalise une offre de la source et y ajoute son empreinte "content_hash"."""
+    return with_content_hash(NORMALIZERS[source](item, source))
+
+
+def normalize_chunk(source, items):
+    """Normalise un lot d'offres d'une source (exécuté dans un processus du pool)."""
+    return [normalize_offer(item, source) for item in items]
+
+
+def iter_chunks(items, size):
+    """Découpe un itérable en listes de `size` éléments."""
+    items = iter(items)
+    while chunk := list(itertools.islice(items, size)):
+        yield chunk
+
+
+def normalize_parallel(items, source, pool, chunk_size=CHUNK_SIZE, window=None):
+    """
+    Normalise les offres d'une source par lots sur un pool de processus, et les rend
+    dans l'ordre d'origine. Au plus `window` lots sont en cours à la fois (deux par
+    cœur par défaut): la mémoire reste bornée même si `items` est un flux.
+    """
+    window = window or 2 * (os.cpu_count() or 1)
+    chunks = iter_chunks(items, chunk_size)
+    pending = collections.deque(
+        pool.submit(normalize_chunk, source, chunk)
+        for chunk in itertools.islice(chunks, window)
+    )
+    while pending:
+        done = pending.popleft().result()
+        for chunk in itertools.islice(chunks, 1):
+            pending.append(pool.submit(normalize_chunk, source, chunk))
+        yield from done
+
+
+def normalize_source(items, source, pool=None, chunk_size=CHUNK_SIZE):
+    """Offres normalisées d'une source, en parallèle si un pool est fourni."""
+    if pool is None:
+        return (normalize_offer(item, source) for item in items)
+    return normalize_parallel(items, source, pool, chunk_size)
+
+
+def normalization_pool(workers):
+    """Pool de processus de normalisation, None pour normaliser dans ce processus."""
+    if workers is None or workers <= 1:
+        return None
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+
+
+def load_jsonl_file(filepath):
+    """Charge un fichier JSONL (une offre par ligne)."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
 def load_json_file(filepath):
-    """Charge un fichier JSON et retourne la liste d'objets."""
+    """
+    Charge un fichier JSON et retourne la liste d'objets.
+    Accepte aussi un fichier JSONL, ou le dossier de segments JSONL d'une source
+    (ex: scraping_output/offres_emploi_rekrute/), lus dans l'ordre des segments.
+    """
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"Le fichier {filepath} n'existe pas.")
+    if os.path.isdir(filepath):
+        data = []
+        for name in sorted(os.listdir(filepath)):
+            if name.endswith(".jsonl"):
+                data.extend(load_jsonl_file(os.path.join(filepath, name)))
+        return data
+    if filepath.endswith(".jsonl"):
+        return load_jsonl_file(filepath)
     with open(filepath, "r", encoding="utf-8") as f:
         data = json.load(f)
         return data if isinstance(data, list) else [data]
@@ -194,21 +264,26 @@ def remove_duplicates(data, unique_keys):
         if key not in seen:
             seen[key] = item
         else:
-            # Fusionner le champ "via"
-            existing_via = seen[key].get("via", [])
-            new_via = item.get("via", [])
-            seen[key]["via"] = list(set(existing_via + new_via))
-            # Pour les autres champs, mettre à jour si la nouvelle valeur est non nulle
-            for k, v in item.items():
-                if k != "via" and v not in (None, ""):
-                    seen[key][k] = v
+            merge_item(seen[key], item)
     return list(seen.values())
 
 
-def merge_files(file_rekrute, file_marroc, file_emploisma, unique_keys):
+def merge_files(
+    file_rekrute,
+    file_marroc,
+    file_emploisma,
+    unique_keys,
+    near_duplicates=None,
+    workers=1,
+):
     """
     Charge les trois fichiers JSON, les normalise selon leur type, fusionne les données
     et supprime les doublons.
+
+    near_duplicates: réglages de la fusion des quasi-doublons entre sources (voir
+    near_duplicates.near_duplicate_settings), None pour ne fusionner que les doublons exacts
+
+    workers: nombre de processus de normalisation, les offres gardent leur ordre
     """
     logging.info(f"Chargement du fichier Rekrute : {file_rekrute}")
     data_rekrute = load_json_file(file_rekrute)
@@ -217,19 +292,330 @@ def merge_files(file_rekrute, file_marroc, file_emploisma, unique_keys):
     logging.info(f"Chargement du fichier Emplois.ma : {file_emploisma}")
     data_emploisma = load_json_file(file_emploisma)
 
-    normalized_rekrute = [normalize_rekrute(item, "Rekrute") for item in data_rekrute]
-    normalized_marroc = [
-        normalize_marroc(item, "MarrocAnnonces") for item in data_marroc
-    ]
-    normalized_emploisma = [
-        normalize_emploisma(item, "Emplois.ma") for item in data_emploisma
-    ]
-
-    all_data = normalized_rekrute + normalized_marroc + normalized_emploisma
+    pool = normalization_pool(workers)
+    try:
+        all_data = []
+        for data, source in (
+            (data_rekrute, "Rekrute"),
+            (data_marroc, "MarrocAnnonces"),
+            (data_emploisma, "Emplois.ma"),
+        ):
+            all_data.extend(normalize_source(data, source, pool))
+    finally:
+        if pool is not None:
+            pool.shutdown()
     merged_data = remove_duplicates(all_data, unique_keys)
+    if near_duplicates is not None:
+        merged_data = merge_near_duplicates(merged_data, merge_item, near_duplicates)
     return merged_data
 
 
+def merge_item(existing, item):
+    """Fusionne un doublon dans l'offre déjà vue, comme remove_duplicates."""
+    existing["via"] = list(dict.fromkeys(existing.get("via", []) + item.get("via", [])))
+    for k, v in item.items():
+        if k != "via" and v not in (None, ""):
+            existing[k] = v
+    return with_content_hash(existing)
+
+
+class MergeIndex:
+    """Index sur disque des offres fusionnées, par clé d'unicité.
+
+    Seule l'offre en cours de fusion est en mémoire: les autres sont dans un fichier
+    SQLite temporaire (ou `path`), relu dans l'ordre de première apparition à la fin.
+
+    reset: vider l'index existant; sinon les offres déjà indexées sont conservées
+    (voir MergedStore)
+    """
+
+    def __init__(self, unique_keys, path=None, reset=True):
+        self.unique_keys = unique_keys
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".sqlite", prefix="merge_index_")
+            os.close(fd)
+            self._temporary = path
+        else:
+            self._temporary = None
+        self._conn = sqlite3.connect(path)
+        if reset:
+            # Index jetable: pas de journal, il est reconstruit en cas d'arrêt
+            self._conn.execute("PRAGMA journal_mode=OFF")
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.execute("DROP TABLE IF EXISTS offers")
+        else:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS offers (id INTEGER PRIMARY KEY, "
+            "key TEXT NOT NULL UNIQUE, offer TEXT NOT NULL)"
+        )
+
+    def add(self, item):
+        """Ajoute une offre normalisée, ou la fusionne avec son doublon déjà indexé.
+
+        Retourne l'identifiant de l'offre dans l'index.
+        """
+        key = json.dumps([item.get(k) for k in self.unique_keys], ensure_ascii=False)
+        row = self._conn.execute(
+            "SELECT id, offer FROM offers WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return self._conn.execute(
+                "INSERT INTO offers (key, offer) VALUES (?, ?)",
+                (key, json.dumps(item, ensure_ascii=False)),
+            ).lastrowid
+        merged = merge_item(json.loads(row[1]), item)
+        self._conn.execute(
+            "UPDATE offers SET offer = ? WHERE id = ?",
+            (json.dumps(merged, ensure_ascii=False), row[0]),
+        )
+        return row[0]
+
+    def __iter__(self):
+        for (offer,) in self._conn.execute("SELECT offer FROM offers ORDER BY id"):
+            yield json.loads(offer)
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM offers").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+        if self._temporary is not None:
+            os.remove(self._temporary)
+
+
+class MergedStore(MergeIndex):
+    """Jeu de données fusionné persistant, pour la fusion incrémentale.
+
+    En plus des offres et de leur index de dédoublonnage, le fichier SQLite garde pour
+    chaque fichier source la position jusqu'à laquelle il a été fusionné. Les scrapers
+    n'écrivant qu'en fin de fichier, seules les offres ajoutées depuis sont relues.
+
+    Les offres ajoutées ou modifiées par ces fusions sont notées jusqu'à ce qu'elles
+    aient été passées au suivi des changements (voir changed, clear_changes).
+
+    path: le fichier SQLite, ex: merged_jobs.sqlite
+    """
+
+    def __init__(self, unique_keys, path):
+        super().__init__(unique_keys, path, reset=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS positions (path TEXT PRIMARY KEY, "
+                "inode INTEGER, size INTEGER, position INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS changes (id INTEGER PRIMARY KEY)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (name, value) VALUES ('unique_keys', ?)",
+                (json.dumps(unique_keys),),
+            )
+        stored = json.loads(
+            self._conn.execute(
+                "SELECT value FROM meta WHERE name = 'unique_keys'"
+            ).fetchone()[0]
+        )
+        if stored != list(unique_keys):
+            self._conn.close()
+            raise ValueError(
+                f"{path} a été construit avec les clés {stored}, pas {list(unique_keys)}"
+            )
+
+    def position(self, path):
+        """Position de reprise d'un fichier source (voir json_stream.iter_from).
+
+        Un fichier remplacé (compaction des segments) ou tronqué est relu depuis le
+        début: une offre déjà présente est refusionnée avec elle-même, sans doublon.
+        """
+        row = self._conn.execute(
+            "SELECT inode, size, position FROM positions WHERE path = ?",
+            (os.path.abspath(path),),
+        ).fetchone()
+        if row is None:
+            return 0
+        stat = os.stat(path)
+        inode, size, position = row
+        if stat.st_ino != inode or stat.st_size < size:
+            logging.info(f"{path} a été réécrit, il est relu depuis le début.")
+            return 0
+        if stat.st_size == size and not path.endswith(".jsonl"):
+            # Fichier JSON inchangé: inutile de le relire pour sauter ses offres
+            return None
+        return position
+
+    def fold(self, path, source, pool=None):
+        """Fusionne les nouvelles offres d'un fichier source, retourne leur nombre.
+
+        Les offres et la nouvelle position sont enregistrées dans la même transaction:
+        un arrêt en cours de route ne perd ni ne compte deux fois aucune offre.
+        """
+        start = self.position(path)
+        if start is None:
+            return 0
+        stat = os.stat(path)
+        reached = {"position": start}
+
+        def records():
+            for record, position in iter_from(path, start):
+                yield record
+                reached["position"] = position
+
+        added = 0
+        with self._conn:
+            for item in normalize_source(records(), source, pool):
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO changes (id) VALUES (?)", (self.add(item),)
+                )
+                added += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO positions (path, inode, size, position) "
+                "VALUES (?, ?, ?, ?)",
+                (os.path.abspath(path), stat.st_ino, stat.st_size, reached["position"]),
+            )
+        return added
+
+    def changed(self):
+        """Les offres ajoutées ou modifiées depuis le dernier clear_changes."""
+        for (offer,) in self._conn.execute(
+            "SELECT offer FROM offers JOIN changes USING (id) ORDER BY id"
+        ):
+            yield json.loads(offer)
+
+    def clear_changes(self):
+        with self._conn:
+            self._conn.execute("DELETE FROM changes")
+
+
+def iter_normalized(file_rekrute, file_marroc, file_emploisma, pool=None):
+    """Parcourt les offres normalisées des trois sources, lues au fil de l'eau."""
+    for filepath, source in (
+        (file_rekrute, "Rekrute"),
+        (file_marroc, "MarrocAnnonces"),
+        (file_emploisma, "Emplois.ma"),
+    ):
+        logging.info(f"Lecture en flux du fichier {source} : {filepath}")
+        yield from normalize_source(iter_records(filepath), source, pool)
+
+
+def write_json_stream(items, output):
+    """Écrit les offres en un tableau JSON, une à une, retourne leur nombre."""
+    count = 0
+    with open(output, "w", encoding="utf-8") as f:
+        f.write("[")
+        for item in items:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(item, indent=4, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n" if count else "]\n")
+    return count
+
+
+def write_jsonl(items, output):
+    """Écrit les offres en JSONL, une par ligne, retourne leur nombre."""
+    count = 0
+    with open(output, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def merge_files_stream(
+    file_rekrute,
+    file_marroc,
+    file_emploisma,
+    unique_keys,
+    output,
+    index_path=None,
+    workers=1,
+):
+    """
+    Comme merge_files, mais en mémoire constante: les sources sont lues en flux,
+    chaque offre est normalisée puis dédoublonnée dans un index SQLite sur disque,
+    et le résultat est écrit au fil de l'eau (JSONL si `output` finit par .jsonl).
+    Retourne le nombre d'offres écrites.
+    """
+    index = MergeIndex(unique_keys, index_path)
+    pool = normalization_pool(workers)
+    try:
+        read = 0
+        for item in iter_normalized(file_rekrute, file_marroc, file_emploisma, pool):
+            index.add(item)
+            read += 1
+        logging.info(f"{read} offres lues, {len(index)} après dédoublonnage.")
+        write = write_jsonl if output.endswith(".jsonl") else write_json_stream
+        return write(index, output)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        index.close()
+
+
+def merge_files_incremental(
+    file_rekrute,
+    file_marroc,
+    file_emploisma,
+    unique_keys,
+    store_path,
+    output=None,
+    workers=1,
+    delta=None,
+    cdc_state=None,
+):
+    """
+    Fusion incrémentale: seules les offres ajoutées aux sources depuis la fusion
+    précédente sont normalisées et fusionnées dans le jeu persistant `store_path`
+    (voir MergedStore). Le résultat complet est ensuite écrit dans `output`, si fourni:
+    c'est une relecture de tout le jeu, à réserver aux besoins d'un export.
+
+    delta: si fourni, le delta des offres ajoutées ou modifiées par cette fusion (et
+    celles des fusions précédentes faites sans delta) est écrit à partir de l'état
+    `cdc_state` (voir cdc.ChangeCapture), sans relire le reste du jeu.
+
+    Retourne le nombre de nouvelles offres lues.
+    """
+    store = MergedStore(unique_keys, store_path)
+    pool = normalization_pool(workers)
+    try:
+        before = len(store)
+        read = 0
+        for filepath, source in (
+            (file_rekrute, "Rekrute"),
+            (file_marroc, "MarrocAnnonces"),
+            (file_emploisma, "Emplois.ma"),
+        ):
+            for path in source_files(filepath):
+                added = store.fold(path, source, pool)
+                if added:
+                    logging.info(f"{added} nouvelles offres {source} dans {path}")
+                read += added
+        logging.info(
+            f"{read} nouvelles offres lues, {len(store) - before} ajoutées au jeu "
+            f"fusionné ({len(store)} offres)."
+        )
+        if delta:
+            capture = ChangeCapture(cdc_state, unique_keys)
+            try:
+                capture.capture(store.changed(), delta, complete=False)
+            finally:
+                capture.close()
+            # Après la validation du delta: un arrêt entre les deux recapture les mêmes
+            # offres, qui ont les mêmes empreintes et ne produisent aucun changement
+            store.clear_changes()
+        if output:
+            write = write_jsonl if output.endswith(".jsonl") else write_json_stream
+            write(store, output)
+        return read
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        store.close()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Fusion et normalisation de 3 fichiers JSON d'offres d'emploi issus de sources différentes."
@@ -263,19 +649,120 @@ def main():
     parser.add_argument(
         "--output",
         type=str,
-        default="merged_jobs.json",
-        help="Fichier de sortie pour les données fusionnées",
+        default=None,
+        help="Fichier de sortie pour les données fusionnées (merged_jobs.json par "
+        "défaut; avec --incremental, seulement s'il est demandé)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Fusion en flux, en mémoire constante (sortie JSONL si --output finit par .jsonl)",
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        action="store_true",
+        help="Fusionner aussi les quasi-doublons entre sources (MinHash/LSH, hors --stream)",
+    )
+    parser.add_argument(
+        "--similarity",
+        type=float,
+        default=None,
+        help="Seuil de similarité des quasi-doublons, entre 0 et 1 (NEAR_DUP_THRESHOLD, 0.8)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Nombre de processus de normalisation (1: dans ce processus)",
+    )
+    parser.add_argument(
+        "--incremental",
+        type=str,
+        default=None,
+        metavar="STORE",
+        help="Fusion incrémentale dans ce fichier SQLite persistant: seules les offres "
+        "ajoutées aux sources depuis la dernière fusion sont traitées",
+    )
+    parser.add_argument(
+        "--delta",
+        type=str,
+        default=None,
+        help="Écrire aussi le delta JSONL des offres ajoutées, modifiées ou disparues "
+        "depuis la fusion précédente, un fichier par fusion: DELTA devient "
+        "merged_jobs.delta.000012.jsonl (voir cdc.py)",
+    )
+    parser.add_argument(
+        "--cdc_state",
+        type=str,
+        default="merged_jobs.cdc.sqlite",
+        help="Fichier SQLite des empreintes de la fusion précédente, pour --delta",
+    )
+    parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="Fichier SQLite de l'index de dédoublonnage en mode --stream (temporaire par défaut)",
     )
 
     args = parser.parse_args()
+    if args.stream and args.incremental:
+        parser.error("--stream et --incremental sont incompatibles")
+    if (args.stream or args.incremental) and args.near_duplicates:
+        parser.error(
+            "--near-duplicates n'est pas disponible en mode --stream ou --incremental"
+        )
+    if args.output is None and not args.incremental:
+        args.output = "merged_jobs.json"
+    near_duplicates = None
+    if args.near_duplicates:
+        near_duplicates = near_duplicate_settings()
+        if args.similarity is not None:
+            near_duplicates["threshold"] = args.similarity
 
     try:
-        merged = merge_files(
-            args.file_rekrute, args.file_marroc, args.file_emploisma, args.unique_keys
+        if args.incremental:
+            merge_files_incremental(
+                args.file_rekrute,
+                args.file_marroc,
+                args.file_emploisma,
+                args.unique_keys,
+                args.incremental,
+                args.output,
+                args.workers,
+                args.delta,
+                args.cdc_state,
+            )
+        elif args.stream:
+            merge_files_stream(
+                args.file_rekrute,
+                args.file_marroc,
+                args.file_emploisma,
+                args.unique_keys,
+                args.output,
+                args.index,
+                args.workers,
+            )
+        else:
+            merged = merge_files(
+                args.file_rekrute,
+                args.file_marroc,
+                args.file_emploisma,
+                args.unique_keys,
+                near_duplicates,
+                args.workers,
+            )
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(merged, f, indent=4, ensure_ascii=False)
+        logging.info(
+            f"Fusion terminée. Le résultat est sauvegardé dans "
+            f"{args.output or args.incremental}."
         )
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(merged, f, indent=4, ensure_ascii=False)
-        logging.info(f"Fusion terminée. Le résultat est sauvegardé dans {args.output}.")
+        if args.delta and not args.incremental:
+            capture = ChangeCapture(args.cdc_state, args.unique_keys)
+            try:
+                capture.capture(iter_records(args.output), args.delta)
+            finally:
+                capture.close()
     except Exception as e:
         logging.error("Une erreur est survenue : %s", e)
 
@@ -0,0 +1,206 @@
+"""Lecture incrémentale de fichiers d'offres JSON et JSONL.
+
+Les fichiers sont lus par blocs: un tableau JSON de plusieurs centaines de Mo est parcouru
+objet par objet, sans être chargé en mémoire d'un coup.
+"""
+
+import gzip
+import json
+import os
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# Nombre de caractères d'un nombre coupé que le décodeur laisse derrière lui: "1." ou
+# "1e" sont décodés 1 (reste ".", "e"), "1e+" aussi (reste "e+")
+_NUMBER_TAIL = 2
+
+
+class _Reader:
+    """Lecteur JSON par blocs: le tampon ne garde que la partie pas encore décodée."""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self):
+        # Ajoute un bloc au tampon, en oubliant la partie déjà décodée
+        chunk = self.f.read(self.chunk_size)
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        self.eof = not chunk
+
+    def peek(self):
+        """Le prochain caractère hors espaces, None en fin de fichier."""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in _WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                return None
+            self.fill()
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"'{char}' attendu, '{found}' trouvé")
+        self.position += 1
+
+    def decode(self):
+        """Décode la valeur suivante, en lisant autant de blocs que nécessaire."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                # La valeur est coupée par la fin du tampon: lire la suite
+                if self.eof:
+                    raise
+                self.fill()
+                continue
+            # Un nombre coupé par la fin du tampon est décodé trop court ("12" puis
+            # "34", "1" puis ".5"): il n'est complet que suivi d'un autre caractère
+            if (
+                isinstance(value, (int, float))
+                and not self.eof
+                and end + _NUMBER_TAIL >= len(self.buffer)
+            ):
+                self.fill()
+                continue
+            self.position = end
+            return value
+
+    def array(self):
+        """Parcourt les éléments du tableau qui commence ici."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.decode()
+            if self.peek() == "]":
+                self.position += 1
+                return
+            self.expect(",")
+
+    def rest(self):
+        """Décode tout le reste du fichier en une seule valeur."""
+        return json.loads(self.buffer[self.position :] + self.f.read())
+
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE, member=None):
+    """Parcourt les éléments du tableau JSON d'un fichier texte ouvert, un par un.
+
+    member: si le fichier contient un objet, la clé du tableau à parcourir, ex:
+    "results" pour processed_jobs.json. Les valeurs des clés précédentes sont décodées
+    puis oubliées, celles des clés suivantes ne sont pas lues.
+
+    Un fichier contenant un seul objet (et non un tableau), sans `member`, produit cet objet.
+    """
+    reader = _Reader(f, chunk_size)
+    first = reader.peek()
+    if first is None:
+        return
+    if first == "[":
+        yield from reader.array()
+        return
+    if member is None:
+        # Un objet seul: il est de toute façon entièrement en mémoire une fois décodé
+        yield reader.rest()
+        return
+    reader.expect("{")
+    while reader.peek() != "}":
+        if reader.peek() is None:
+            raise ValueError("Objet JSON non terminé")
+        key = reader.decode()
+        reader.expect(":")
+        if key == member:
+            if reader.peek() != "[":
+                raise ValueError(f"La clé '{member}' ne contient pas un tableau")
+            yield from reader.array()
+            return
+        reader.decode()
+        if reader.peek() == ",":
+            reader.position += 1
+    raise KeyError(member)
+
+
+def iter_jsonl(f):
+    """Parcourt les objets d'un fichier JSONL ouvert, une ligne à la fois."""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def open_text(filepath, mode="r"):
+    """Ouvre un fichier texte UTF-8, compressé en gzip si son nom finit par .gz."""
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, mode + "t", encoding="utf-8", newline="")
+    return open(filepath, mode, encoding="utf-8", newline="")
+
+
+def iter_records(filepath, chunk_size=CHUNK_SIZE, member=None):
+    """Parcourt les offres d'un fichier JSON, JSONL, ou d'un dossier de segments JSONL.
+
+    Équivalent en flux de filtrage.load_json_file: la mémoire utilisée ne dépend pas
+    de la taille du fichier. Les fichiers .json.gz et .jsonl.gz sont aussi acceptés.
+
+    member: pour un fichier JSON contenant un objet, la clé du tableau des offres, ex:
+    "results" (voir iter_json_array)
+    """
+    if os.path.isdir(filepath):
+        for path in source_files(filepath):
+            yield from iter_records(path, chunk_size, member)
+        return
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Le fichier {filepath} n'existe pas.")
+    with open_text(filepath) as f:
+        if filepath.removesuffix(".gz").endswith(".jsonl"):
+            yield from iter_jsonl(f)
+        else:
+            yield from iter_json_array(f, chunk_size, member)
+
+
+def source_files(filepath):
+    """Les fichiers d'une source: le fichier lui-même, ou les segments JSONL d'un dossier."""
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Le fichier {filepath} n'existe pas.")
+    if os.path.isdir(filepath):
+        return [
+            os.path.join(filepath, name)
+            for name in sorted(os.listdir(filepath))
+            if name.endswith(".jsonl")
+        ]
+    return [filepath]
+
+
+def iter_from(path, position=0, chunk_size=CHUNK_SIZE):
+    """Parcourt les offres d'un fichier à partir de `position`, avec la position de reprise
+    après chacune: paires (offre, position).
+
+    Pour un fichier JSONL, la position est un décalage en octets et seules les lignes
+    complètes sont lues (une ligne sans retour à la ligne est une écriture en cours).
+    Pour un fichier JSON, c'est le nombre d'offres déjà lues, qui sont relues mais ignorées.
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "rb") as f:
+            f.seek(position)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                position += len(line)
+                if line.strip():
+                    yield json.loads(line), position
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for index, item in enumerate(iter_json_array(f, chunk_size), start=1):
+            if index > position:
+                yield item, index
@@ -0,0 +1,210 @@
+"""Détection des quasi-doublons entre sources (MinHash + LSH).
+
+Une même offre publiée sur Rekrute, Emploi.ma et MarocAnnonces a rarement exactement le
+même titre ou la même date: elle échappe à la clé d'unicité de filtrage.remove_duplicates.
+Chaque offre est ici résumée par une signature MinHash des n-grammes de mots de son
+titre, de son entreprise et de sa description. Les signatures sont découpées en bandes:
+deux offres ne sont comparées que si elles partagent au moins une bande identique, ce
+qui évite de comparer toutes les paires.
+"""
+
+import logging
+import os
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+from data_extraction.dates import parse_date
+
+FIELDS = ("title", "company", "description")
+
+# Nombre premier de Mersenne 2^61 - 1 des fonctions de hachage (a * x + b) mod p
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"\w+")
+
+
+def near_duplicate_settings():
+    """Réglages de la détection, à partir des variables d'environnement.
+
+    threshold: similarité de Jaccard estimée à partir de laquelle deux offres sont
+    fusionnées (NEAR_DUP_THRESHOLD)
+
+    num_perm: nombre de fonctions de hachage de la signature, plus précis mais plus lent
+
+    shingle_size: nombre de mots par n-gramme
+
+    max_days: écart maximal entre les dates de publication de deux quasi-doublons,
+    None pour l'ignorer (une offre republiée des mois plus tard est une autre offre)
+    """
+    max_days = os.getenv("NEAR_DUP_MAX_DAYS", "30")
+    return {
+        "threshold": float(os.getenv("NEAR_DUP_THRESHOLD", 0.8)),
+        "num_perm": int(os.getenv("NEAR_DUP_NUM_PERM", 128)),
+        "shingle_size": int(os.getenv("NEAR_DUP_SHINGLE_SIZE", 3)),
+        "max_days": int(max_days) if max_days else None,
+        "seed": 1,
+    }
+
+
+def lsh_bands(threshold, num_perm):
+    """Découpage (bandes, lignes) de la signature selon le seuil de similarité.
+
+    Deux offres de similarité s partagent une bande avec une probabilité
+    1 - (1 - s^lignes)^bandes, qui bascule vers (1 / bandes)^(1 / lignes). On retient le
+    découpage dont la bascule est la plus proche sous `threshold`: les paires au-dessus du
+    seuil sont presque toutes candidates, les faux positifs sont écartés à la vérification.
+    """
+    candidates = [
+        (bands, num_perm // bands)
+        for bands in range(1, num_perm + 1)
+        if num_perm % bands == 0
+    ]
+    below = [c for c in candidates if (1 / c[0]) ** (1 / c[1]) <= threshold]
+    return min(
+        below or candidates,
+        key=lambda c: abs((1 / c[0]) ** (1 / c[1]) - threshold),
+    )
+
+
+def normalize_text(text):
+    """Minuscules, sans accents: "Développeur" et "developpeur" donnent les mêmes mots."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def shingles(offer, size=3, fields=FIELDS):
+    """Empreintes (uint64) des n-grammes de `size` mots des champs de l'offre."""
+    words = []
+    for field in fields:
+        value = offer.get(field)
+        if isinstance(value, list):
+            value = " ".join(str(item) for item in value if item)
+        if isinstance(value, str):
+            words.extend(_WORD.findall(normalize_text(value)))
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    # crc32 plutôt que hash(): les empreintes sont stables d'un processus à l'autre
+    hashes = np.fromiter(
+        (zlib.crc32(word.encode("utf-8")) for word in words),
+        dtype=np.uint64,
+        count=len(words),
+    )
+    if len(hashes) < size:
+        size = len(hashes)
+    # Combinaison des empreintes de `size` mots consécutifs, calculée par décalages
+    combined = np.zeros(len(hashes) - size + 1, dtype=np.uint64)
+    for offset in range(size):
+        combined = (
+            combined * np.uint64(1000003) ^ hashes[offset : offset + len(combined)]
+        )
+    return np.unique(combined)
+
+
+class MinHasher:
+    """Calcule les signatures MinHash de `num_perm` fonctions (a * x + b) mod p."""
+
+    def __init__(self, num_perm=128, seed=1):
+        generator = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = generator.randint(1, 1 << 61, size=num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, 1 << 61, size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes):
+        """Signature (uint64, num_perm) d'un ensemble d'empreintes non vide."""
+        # Le produit déborde de 64 bits: il reste une famille de hachage utilisable
+        with np.errstate(over="ignore"):
+            values = (np.outer(hashes, self.a) + self.b) % _PRIME & _MAX_HASH
+        return values.min(axis=0)
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            # Le représentant d'un groupe est son offre la plus ancienne dans la liste
+            self.parent[max(i, j)] = min(i, j)
+
+
+def _close_dates(first, second, max_days):
+    if max_days is None:
+        return True
+    first, second = parse_date(first), parse_date(second)
+    if first is None or second is None:
+        return True
+    return abs((first - second).days) <= max_days
+
+
+def find_near_duplicates(offers, settings=None):
+    """Groupes de quasi-doublons: liste de listes d'indices dans `offers`, par ordre
+    croissant, sans les offres isolées.
+    """
+    settings = settings or near_duplicate_settings()
+    threshold = settings["threshold"]
+    bands, rows = lsh_bands(threshold, settings["num_perm"])
+    hasher = MinHasher(bands * rows, settings["seed"])
+    signatures = {}
+    buckets = {}
+    groups = _UnionFind(len(offers))
+    for index, offer in enumerate(offers):
+        hashes = shingles(offer, settings["shingle_size"])
+        if not len(hashes):
+            continue
+        signature = hasher.signature(hashes)
+        signatures[index] = signature
+        candidates = set()
+        for band in range(bands):
+            key = (band, signature[band * rows : (band + 1) * rows].tobytes())
+            bucket = buckets.setdefault(key, [])
+            candidates.update(bucket)
+            bucket.append(index)
+        for other in candidates:
+            if groups.find(other) == groups.find(index):
+                continue
+            # Vérification des candidats: part des fonctions de hachage en accord
+            similarity = np.count_nonzero(signatures[other] == signature) / len(
+                signature
+            )
+            if similarity >= threshold and _close_dates(
+                offers[other].get("publication_date"),
+                offer.get("publication_date"),
+                settings["max_days"],
+            ):
+                groups.union(other, index)
+    clusters = {}
+    for index in range(len(offers)):
+        clusters.setdefault(groups.find(index), []).append(index)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def merge_near_duplicates(offers, merge, settings=None):
+    """Fusionne les quasi-doublons dans la première offre de leur groupe.
+
+    merge: fonction (offre retenue, doublon) -> offre fusionnée, ex: filtrage.merge_item,
+    qui réunit les sources de "via"
+
+    Retourne les offres restantes, dans l'ordre d'origine.
+    """
+    clusters = find_near_duplicates(offers, settings)
+    dropped = set()
+    for members in clusters:
+        kept = offers[members[0]]
+        for index in members[1:]:
+            merge(kept, offers[index])
+            dropped.add(index)
+    logging.info(
+        f"{len(dropped)} quasi-doublons fusionnés en {len(clusters)} offres "
+        f"sur {len(offers)}."
+    )
+    return [offer for index, offer in enumerate(offers) if index not in dropped]
@@ -1,3 +1,4 @@
+import argparse
 import json
 import logging
 import os
@@ -9,6 +10,8 @@ from typing import Any, Dict, List
 import requests
 from dotenv import load_dotenv
 
+from data_extraction.Traitement.cdc import ChangeCapture, apply_delta
+
 # Configuration des logs
 logging.basicConfig(
     level=logging.INFO,
@@ -23,6 +26,9 @@ if not API_KEY or not API_KEY.startswith("gsk_"):
     logging.error("Clé API Groq non configurée - Vérifiez .env")
     exit(1)
 
+# Nom de cette étape dans le fichier d'état CDC (son curseur de deltas traités)
+CONSUMER = "classification"
+
 
 def load_json(file_path: str) -> List[Dict[str, Any]]:
     """Charge le fichier JSON d'entrée"""
@@ -155,15 +161,13 @@ Exemple de format de sortie :
             return []
 
 
-def main():
-    input_file = "merged_jobs.json"
-    output_file = "processed_jobs.json"
-    batch_size = 2  # Nombre d'offres par lot
-    cooldown_after_batches = 10  # Nombre de lots avant une pause longue
-    cooldown_delay = 60  # Délai en secondes pour la pause longue
-
-    data = load_json(input_file)
-
+def process_offers(
+    data: List[Dict[str, Any]],
+    batch_size: int = 2,
+    cooldown_after_batches: int = 10,
+    cooldown_delay: int = 60,
+) -> List[Dict[str, Any]]:
+    """Classifie les offres par lots avec Groq, retourne les offres enrichies"""
     # Diviser les données en lots
     batches = [data[i : i + batch_size] for i in range(0, len(data), batch_size)]
     total_batches = len(batches)
@@ -190,6 +194,57 @@ def main():
                 f"Cooldown : Pause de {cooldown_delay} secondes après {cooldown_after_batches} lots"
             )
             time.sleep(cooldown_delay)
+    return results
+
+
+def load_previous_results(output_file: str) -> List[Dict[str, Any]]:
+    """Les offres déjà classifiées lors des passages précédents"""
+    if not os.path.exists(output_file):
+        return []
+    with open(output_file, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", [])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Classification des offres fusionnées avec l'API Groq."
+    )
+    parser.add_argument("--input", default="merged_jobs.json")
+    parser.add_argument("--output", default="processed_jobs.json")
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Ne classifier que les offres ajoutées ou modifiées dans les deltas de "
+        "filtrage.py --delta pas encore traités, les résultats précédents sont conservés",
+    )
+    parser.add_argument(
+        "--cdc_state",
+        default="merged_jobs.cdc.sqlite",
+        help="Fichier SQLite d'état de filtrage.py --delta, pour --delta",
+    )
+    args = parser.parse_args()
+    input_file = args.input
+    output_file = args.output
+
+    capture = None
+    deltas = []
+    failed = 0
+    if args.delta:
+        capture = ChangeCapture(args.cdc_state)
+        deltas = capture.pending(CONSUMER)
+        previous, data = apply_delta(
+            load_previous_results(output_file), [path for _, path in deltas]
+        )
+        logging.info(
+            f"Delta : {len(deltas)} fusions, {len(data)} offres à classifier, "
+            f"{len(previous)} résultats conservés"
+        )
+        processed = process_offers(data)
+        # Les offres des lots en échec restent dans les deltas: elles seront reprises
+        failed = len(data) - len(processed)
+        results = previous + processed
+    else:
+        results = process_offers(load_json(input_file))
 
     # Générer le dictionnaire des titres homogénéisés
     dictionnaire_titres = {}
@@ -214,6 +269,17 @@ def main():
         logging.info(f"✅ Traitement terminé : {output_file}")
     except Exception as e:
         logging.error(f"Erreur d'écriture : {str(e)}")
+        failed = None
+
+    if capture is not None:
+        if failed == 0 and deltas:
+            capture.ack(CONSUMER, deltas[-1][0])
+        elif failed:
+            logging.warning(
+                f"{failed} offres non classifiées : les deltas seront repris au "
+                "prochain passage"
+            )
+        capture.close()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,4 @@
-import re
-
-from selenium import webdriver
 from selenium.common.exceptions import (
-    NoSuchElementException,
     TimeoutException,
     WebDriverException,
 )
@@ -12,107 +8,112 @@ from selenium.webdriver.support.ui import WebDriverWait
 
 from data_extraction.Websites import (
     check_duplicate,
-    init_driver,
-    load_json,
     save_json,
     setup_logger,
     validate_json,
 )
+from data_extraction.Websites.checkpoint import Checkpoint, unsaved_offers
+from data_extraction.Websites.frontier import drain
+from data_extraction.Websites.html_fetch import (
+    PageFetcher,
+    absolute_url,
+    block_text,
+    element_text,
+    page_snapshot,
+)
+from data_extraction.Websites.incremental import IncrementalStop, is_full_crawl
+from data_extraction.Websites.recrawl import record_runs
+from data_extraction.Websites.search import (
+    crawl_keywords,
+    keyword_slug,
+    search_keywords,
+    search_url,
+)
+from data_extraction.Websites.section_parser import SectionSpec
+from data_extraction.Websites.seen_store import get_seen_store
 
 logger = setup_logger("maroc_ann.log")
 
+BASE_URL = "https://www.marocannonces.com"
+SEARCH_URL = search_url("marocannonces", "DATA")
+
+# Structure du texte d'une page d'offre: sections et champs "Libellé : valeur"
+DETAILS_SPEC = SectionSpec(
+    headers={
+        "description": (r"Annonce N°\s*:",),
+        "missions": (r"Missions\s*:\s*$",),
+        "profil": (r"Profil requis\s*:\s*$",),
+    },
+    labels={
+        "publication_date": ("Publiée le",),
+        "domaine": ("Domaine",),
+        "fonction": ("Fonction",),
+        "contrat": ("Contrat",),
+        "companie": ("companie",),
+        "salaire": ("Salaire",),
+        "niveau_etudes": ("Niveau_etudes",),
+        "ville": ("Ville",),
+        "annonceur": ("Annonceur",),
+        "telephone": ("Téléphone",),
+    },
+    labels_end_sections=True,
+)
+
 
-def extract_offers(driver: webdriver.Chrome):
-    """Extrait les offres sur la page actuelle du site."""
+def parse_offers(soup, page_url=BASE_URL):
+    """Extrait les offres d'une page de listing déjà chargée (HTML parsé)."""
     offers = []
-    try:
-        holders = driver.find_elements(
-            By.CSS_SELECTOR, "li:not(.adslistingpos) div.holder"
-        )
-        logger.info(f"{len(holders)} offres trouvées.")
-    except (NoSuchElementException, TimeoutException) as e:
-        logger.warning(f"Erreur lors de l'extraction des offres : {e}")
-        return offers
+    holders = soup.select("li:not(.adslistingpos) div.holder")
+    logger.info(f"{len(holders)} offres trouvées.")
 
     for holder in holders:
-        try:
-            job_url = holder.find_element(By.XPATH, "./..").get_attribute("href")
-            job_title = holder.find_element(By.TAG_NAME, "h3").text.strip()
-            location = holder.find_element(By.CLASS_NAME, "location").text.strip()
-
-            offers.append(
-                {
-                    "titre": job_title,
-                    "region": location,
-                    "job_url": job_url,
-                }
-            )
-        except NoSuchElementException as e:
-            logger.exception(f"Élément manquant dans une offre : {e}")
+        title = holder.find("h3")
+        location = holder.select_one(".location")
+        if title is None or location is None:
+            logger.warning("Élément manquant dans une offre")
             continue
+        offers.append(
+            {
+                "titre": element_text(title),
+                "region": element_text(location),
+                "job_url": absolute_url(page_url, holder.parent.get("href")),
+            }
+        )
     return offers
 
 
 def parse_details_text(text):
     """Analyse et structure le texte de l'offre d'emploi."""
+    parsed = DETAILS_SPEC.parse(text)
     details = {"via": "Maroc_annonces"}
-    lines = [line.strip() for line in text.split("\n") if line.strip()]
-    text_joined = "\n".join(lines)
+    lines = parsed.lines
 
     if len(lines) >= 2:
         details["titre"] = lines[0]
         details["region"] = lines[1]
 
-    for line in lines:
-        if line.startswith("Publiée le:"):
-            details["publication_date"] = line.split("Publiée le:")[1].strip()
+    fields = dict(parsed.fields)
+    contacts = [fields.pop("annonceur", None), fields.pop("telephone", None)]
 
-    def extract_block(pattern):
-        match = re.search(pattern, text_joined, re.DOTALL)
-        return match.group(1).strip().split("\n") if match else []
-
-    description = re.search(r"Annonce N°:.*\n(.*?)\nMissions :", text_joined, re.DOTALL)
+    description = parsed.text("description")
     if description:
-        details["description"] = description.group(1).strip()
+        details["description"] = description
 
-    missions = extract_block(r"Missions\s*:\s*\n(.*?)\nProfil requis\s*:")
-    profil = extract_block(r"Profil requis\s*:\s*\n(.*?)(Domaine\s*:|$)")
+    items = parsed.sections.get("missions", []) + parsed.sections.get("profil", [])
+    details["extra"] = [item.strip("- ").strip() for item in items]
+    details["extra"] = [item for item in details["extra"] if item]
+    details.update(fields)
+    details["extra"].extend(contact for contact in contacts if contact)
 
-    details["extra"] = [
-        item.strip("- ").strip() for item in missions + profil if item.strip()
-    ]
+    return details
 
-    fields = [
-        "Domaine",
-        "Fonction",
-        "Contrat",
-        "companie",
-        "Salaire",
-        "Niveau_etudes",
-        "Ville",
-    ]
-    for field in fields:
-        match = re.search(rf"{field}\s*:\s*(.+)", text_joined)
-        if match:
-            key = field.lower().replace(" ", "_")
-            details[key] = match.group(1).strip()
-
-    def get_next_line_value(label):
-        try:
-            idx = lines.index(label)
-            return lines[idx + 1] if idx + 1 < len(lines) else None
-        except ValueError:
-            return None
-
-    annonceur = get_next_line_value("Annonceur :")
-    telephone = get_next_line_value("Téléphone :")
-
-    if annonceur:
-        details["extra"].append(annonceur)
-    if telephone:
-        details["extra"].append(telephone)
 
-    return details
+def parse_details(soup):
+    """Détails d'une offre à partir du HTML de sa page (page chargée ou cache HTML)."""
+    container = soup.select_one("div.used-cars")
+    if container is None:
+        return {}
+    return parse_details_text(block_text(container))
 
 
 def extract_offer_details(driver, offer_url):
@@ -121,10 +122,10 @@ def extract_offer_details(driver, offer_url):
         driver.set_page_load_timeout(60)
         driver.get(offer_url)
 
-        container = WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, 15).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "div.used-cars"))
         )
-        return parse_details_text(container.text.strip())
+        return parse_details(page_snapshot(driver, "detail"))
     except TimeoutException:
         logger.exception(f"Timeout pour l'URL {offer_url}")
     except WebDriverException as we:
@@ -134,77 +135,196 @@ def extract_offer_details(driver, offer_url):
     return {}
 
 
-def change_page(driver, base_url, page_num):
-    """Navigue vers la page indiquée."""
-    try:
-        driver.get(base_url.format(page_num))
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.holder"))
-        )
-        logger.info(f"Page {page_num} chargée.")
-        return True
-    except TimeoutException:
-        logger.info("Plus de page à parcourir")
-        False
-    except Exception as e:
-        logger.exception(f"Erreur chargement page {page_num}: {e}")
-        return False
+def list_offers(
+    fetcher, seen_urls, full_crawl=None, results_url=SEARCH_URL, depth=None
+):
+    """Parcourt les pages de listing et retourne les offres (sans détails) pas encore vues.
+
+    results_url: le modèle d'URL des pages de résultats, voir search.marocannonces_search_url
+
+    depth: nombre maximal de pages d'un crawl incrémental (planificateur)
+    """
+    stop = IncrementalStop("marocannonces", full_crawl)
+    all_offers = []
+    page = 1
+
+    while True:
+        page_url = results_url.format(page)
+        soup = fetcher.get(page_url)
+        if soup is None:
+            logger.info("Plus de page à parcourir")
+            break
+        logger.info(f"Page {page} chargée.")
+        offers = parse_offers(soup, page_url)
+        if not offers:
+            logger.info("Fin de la pagination.")
+            break
+        all_offers.extend(offers)
+        new_urls = seen_urls.filter_new(offer["job_url"] for offer in offers)
+        if stop.page_done(len(new_urls)):
+            break
+        if depth and not stop.full_crawl and page >= depth:
+            logger.info(f"Profondeur planifiée atteinte ({depth} pages)")
+            break
+        page += 1
+
+    logger.info(f"{len(all_offers)} offres collectées (sans détails)")
+    return [
+        offer
+        for offer in all_offers
+        if offer.get("job_url") and not check_duplicate(seen_urls, offer["job_url"])
+    ]
 
 
-def main(logger=setup_logger("maroc_ann.log")):
-    try:
-        driver = init_driver()
-    except Exception as e:
-        logger.exception(f"Couldn't start the driver {e}")
+def complete_offer(driver, offer, seen_dates):
+    """Ajoute les détails à une offre du listing, None si elle est connue ou invalide."""
+    url = offer["job_url"]
+    logger.info(f"Détails en cours pour : {url}")
+    offer.update(extract_offer_details(driver, url))
+
+    pub_date = offer.get("publication_date")
+    if pub_date and pub_date in seen_dates:
+        logger.info(f"Offre déjà existante (date: {pub_date}), ignorée.")
+        return None
+
+    if validate_json(offer) is not None:
+        logger.warning(f"Offre invalide : {url}")
+        return None
+    return offer
+
+
+def crawl_keyword(
+    keyword, dedupe, mode=None, full_crawl=None, checkpoints=None, depth=None
+):
+    """Crawle un mot-clé (listing puis pages de détail), avec son propre point de reprise.
+
+    Un point de reprise (offres dont les détails restent à extraire) est enregistré après
+    chaque offre: en cas d'erreur il est conservé et l'exception remontée, le prochain
+    essai reprend à la première offre non traitée.
+
+    checkpoints: liste où ajouter le point de reprise, effacé une fois les offres sauvegardées
+
+    depth: nombre maximal de pages de résultats d'un crawl incrémental (planificateur)
+    """
+    fetcher = PageFetcher("div.holder", mode)
 
-    old_data = load_json("offres_marocannonces.json")
-    all_offers, new_data = [], []
+    seen_urls = get_seen_store("offres_marocannonces.json")
+    seen_dates = get_seen_store("offres_marocannonces.json", "publication_date")
+    checkpoint = Checkpoint(f"marocannonces_{keyword_slug(keyword)}")
+    if checkpoints is not None:
+        checkpoints.append(checkpoint)
+    state = checkpoint.load()
+    new_data = []
 
     try:
-        base_url = "https://www.marocannonces.com/maroc/offres-emploi-b309.html?kw=data+&pge={}"
-        page = 1
-
-        while change_page(driver, base_url, page):
-            offers = extract_offers(driver)
-            if not offers:
-                logger.info("Fin de la pagination.")
-                break
-            all_offers.extend(offers)
-            page += 1
-
-        logger.info(f"{len(all_offers)} offres collectées (sans détails)")
-
-        for offer in all_offers:
-            url = offer.get("job_url")
-            if not url or check_duplicate(old_data, url):
+        if state is not None:
+            offers = unsaved_offers(state, "offres_marocannonces.json")
+            new_data.extend(dedupe.claim_offers(offers))
+            pending = dedupe.claim_offers(state["pending"])
+            logger.info(f"Reprise du crawl {keyword}, {len(pending)} offres restantes")
+        else:
+            results_url = search_url("marocannonces", keyword)
+            pending = list_offers(fetcher, seen_urls, full_crawl, results_url, depth)
+            # Les offres déjà réclamées par un autre mot-clé ne sont pas rechargées
+            pending = dedupe.claim_offers(pending)
+            checkpoint.save(pending=pending)
+
+        for index, offer in enumerate(pending, start=1):
+            offer = complete_offer(fetcher.driver, offer, seen_dates)
+            if offer is None:
+                checkpoint.save(pending=pending[index:])
                 continue
+            new_data.append(offer)
+            checkpoint.save([offer], pending=pending[index:])
 
-            logger.info(f"Détails en cours pour : {url}")
-            offer.update(extract_offer_details(driver, url))
+    except Exception as e:
+        logger.exception(
+            f"Erreur lors du scraping {keyword} : {e}, point de reprise conservé"
+        )
+        raise
+    finally:
+        fetcher.close()
 
-            pub_date = offer.get("publication_date")
-            if pub_date and any(
-                pub_date == o.get("publication_date") for o in old_data
-            ):
-                logger.info(f"Offre déjà existante (date: {pub_date}), ignorée.")
-                continue
+    return new_data
 
-            try:
-                validate_json(offer)
-                new_data.append(offer)
-            except Exception as e:
-                logger.exception(f"Offre invalide : {url} - {e}")
 
-    finally:
-        if driver:
-            driver.quit()
-        save_json(new_data, "offres_marocannonces.json")
-        logger.info(
-            f"Scraping terminé avec {len(new_data)} nouvelles offres collectées."
-        )
+def main(
+    logger=setup_logger("maroc_ann.log"),
+    mode=None,
+    full_crawl=None,
+    keywords=None,
+    depths=None,
+):
+    """Parcourt les offres Data de MarocAnnonces puis leurs pages de détail.
+
+    Les mots-clés sont crawlés en parallèle et une offre trouvée par plusieurs d'entre
+    eux n'est extraite qu'une fois. Les offres ne sont sauvegardées que si tous réussissent.
+
+    mode: "http" pour lire les pages de listing sans navigateur (SCRAPER_FETCH_MODE)
+
+    full_crawl: parcourir toutes les pages au lieu de s'arrêter aux pages déjà connues
+
+    keywords: les mots-clés recherchés, SEARCH_KEYWORDS par défaut
+
+    depths: profondeur (en pages) de chaque mot-clé choisie par le planificateur (recrawl)
+    """
+    checkpoints = []
+    counts = {}
+    new_data = crawl_keywords(
+        "marocannonces",
+        keywords or search_keywords("marocannonces"),
+        lambda keyword, dedupe: crawl_keyword(
+            keyword, dedupe, mode, full_crawl, checkpoints, (depths or {}).get(keyword)
+        ),
+        counts=counts,
+    )
+
+    seen_dates = get_seen_store("offres_marocannonces.json", "publication_date")
+    save_json(new_data, "offres_marocannonces.json")
+    seen_dates.add_many(offer.get("publication_date") for offer in new_data)
+    if not is_full_crawl(full_crawl):
+        record_runs("marocannonces", counts, depths)
+    for checkpoint in checkpoints:
+        checkpoint.clear()
+    logger.info(f"Scraping terminé avec {len(new_data)} nouvelles offres collectées.")
 
     return new_data
 
 
+def enqueue_details(frontier, keywords=None, mode=None, full_crawl=None, depths=None):
+    """Parcourt les listings et met les offres en file dans la frontière Redis.
+
+    Les pages de détail sont ensuite extraites par les workers (drain_details), sur
+    autant de machines que nécessaire. Retourne le nombre d'offres mises en file.
+    """
+    seen_urls = get_seen_store("offres_marocannonces.json")
+    queued = 0
+    counts = {}
+    with PageFetcher("div.holder", mode) as fetcher:
+        for keyword in keywords or search_keywords("marocannonces"):
+            results_url = search_url("marocannonces", keyword)
+            depth = (depths or {}).get(keyword)
+            offers = list_offers(fetcher, seen_urls, full_crawl, results_url, depth)
+            counts[keyword] = len(offers)
+            queued += frontier.push(offers)
+    if not is_full_crawl(full_crawl):
+        record_runs("marocannonces", counts, depths)
+    logger.info(f"{queued} offres mises en file pour l'extraction des détails")
+    return queued
+
+
+def drain_details(frontier):
+    """Worker de la frontière: extrait et sauvegarde les détails des offres en file."""
+    seen_dates = get_seen_store("offres_marocannonces.json", "publication_date")
+    return drain(
+        frontier,
+        lambda driver, offer: complete_offer(driver, offer, seen_dates),
+        "offres_marocannonces.json",
+        after_save=lambda offers: seen_dates.add_many(
+            offer.get("publication_date") for offer in offers
+        ),
+    )
+
+
 if __name__ == "__main__":
     main()
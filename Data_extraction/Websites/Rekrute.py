@@ -1,121 +1,102 @@
 import time
 
-from selenium.common.exceptions import NoSuchElementException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-
 from data_extraction.Websites import (
     check_duplicate,
-    init_driver,
-    load_json,
     save_json,
     setup_logger,
-    validate_json,
+    validate_many,
+)
+from data_extraction.Websites.checkpoint import Checkpoint, unsaved_offers
+from data_extraction.Websites.html_fetch import (
+    PageFetcher,
+    absolute_url,
+    element_text,
+)
+from data_extraction.Websites.incremental import (
+    IncrementalStop,
+    is_full_crawl,
+    limit_pages,
+)
+from data_extraction.Websites.recrawl import record_runs
+from data_extraction.Websites.search import (
+    crawl_keywords,
+    keyword_slug,
+    search_keywords,
+    search_url,
 )
+from data_extraction.Websites.seen_store import get_seen_store
 
 logger = setup_logger("Rekrute.log")
 
+BASE_URL = "https://www.rekrute.com"
+SEARCH_URL = search_url("rekrute", "DATA")
 
-# --- Fonction d'extraction des offres sur la page courante ---
-def extract_offers(driver):
-    try:
-        data = load_json("offres_emploi_rekrute.json")
-    except FileNotFoundError:
-        data = []
-    offers_list = []
 
-    holders = driver.find_elements(By.CSS_SELECTOR, "div.holder")
+def _field_text(holder, icon_selector):
+    """Texte du premier <span> de la div qui contient l'icône donnée."""
+    field = holder.select_one(icon_selector)
+    if field is None:
+        return ""
+    parent_div = field.find_parent("div")
+    return element_text(parent_div.find("span")) if parent_div else ""
 
-    ("Offres trouvées sur cette page :", len(holders) - 1)
-
-    for holder in holders[1:]:  # Ignorer le premier conteneur qui est un filtre
-        try:
-            info_divs = holder.find_elements(By.CSS_SELECTOR, "div.info")
-        except NoSuchElementException:
-            info_divs = []
 
-        titre = ""
-        try:
-            parent_div = holder.find_element(By.XPATH, "./ancestor::div[1]")
+def parse_offers(soup, data, page_url=BASE_URL):
+    """Extrait les offres d'une page de résultats déjà chargée (HTML parsé).
 
-            titre = parent_div.find_element(By.CSS_SELECTOR, "a.titreJob")
-            job_url = titre.get_attribute("href")
-            if check_duplicate(data, job_url):
-                continue
+    soup: la page parsée
 
-            titre = titre.text.strip()
+    data: l'index des offres déjà extraites (SeenStore), pour ignorer les doublons
 
-        # 1. Récupérer les prerequis du poste
-        except NoSuchElementException:
-            titre = ""
-
-        competences = ""
-        if len(info_divs) >= 1:
-            try:
-                field = holder.find_element(By.CSS_SELECTOR, "i.fa.fa-search")
-
-                parent_div = field.find_element(By.XPATH, "./ancestor::div[1]")
-
-                competences = parent_div.find_element(By.TAG_NAME, "span").text.strip()
-            except NoSuchElementException:
-                competences = ""
-        # 2. Récupérer la description de la societe
-        companie = ""
-        if len(info_divs) >= 2:
-            try:
-                field = holder.find_element(By.CSS_SELECTOR, "i.fa.fa-industry")
-
-                parent_div = field.find_element(By.XPATH, "./ancestor::div[1]")
-
-                companie = parent_div.find_element(By.TAG_NAME, "span").text.strip()
+    page_url: l'URL de la page, pour résoudre les liens relatifs
+    """
+    offers_list = []
+    holders = soup.select("div.holder")
 
-            except NoSuchElementException:
-                companie = ""
+    for holder in holders[1:]:  # Ignorer le premier conteneur qui est un filtre
+        info_divs = holder.select("div.info")
 
-        # 3. Récupérer la description de la mission
-        description = ""
-        if len(info_divs) >= 2:
-            try:
-                field = holder.find_element(By.CSS_SELECTOR, "i.fa.fa-binoculars")
+        parent_div = holder.find_parent("div")
+        titre_link = parent_div.select_one("a.titreJob") if parent_div else None
+        if titre_link is None:
+            continue
+        job_url = absolute_url(page_url, titre_link.get("href"))
+        if check_duplicate(data, job_url):
+            continue
+        titre = element_text(titre_link)
 
-                parent_div = field.find_element(By.XPATH, "./ancestor::div[1]")
+        # 1. Prérequis du poste, 2. description de la société, 3. mission
+        competences = _field_text(holder, "i.fa.fa-search") if info_divs else ""
+        companie = (
+            _field_text(holder, "i.fa.fa-industry") if len(info_divs) >= 2 else ""
+        )
+        description = (
+            _field_text(holder, "i.fa.fa-binoculars") if len(info_divs) >= 2 else ""
+        )
 
-                description = parent_div.find_element(By.TAG_NAME, "span").text.strip()
-            except NoSuchElementException:
-                description = ""
-        # 4. Récupérer les dates de publication et le nombre de postes (<em class="date">)
+        # 4. Date de publication (<em class="date">)
         pub_start = ""
-        try:
-            date_elem = holder.find_element(By.CSS_SELECTOR, "em.date")
-
-            spans = date_elem.find_elements(By.TAG_NAME, "span")
-            pub_start = spans[0].text.strip() if len(spans) > 0 else ""
-
-        except NoSuchElementException:
-            pass
+        date_elem = holder.select_one("em.date")
+        if date_elem is not None:
+            spans = date_elem.find_all("span")
+            pub_start = element_text(spans[0]) if spans else ""
 
-        # 5. Récupérer les détails complémentaires (dernière div.info contenant une liste <li>)
-        secteur = secteur = niveau_experience = niveau_etudes = contrat = ""
+        # 5. Détails complémentaires (dernière div.info contenant une liste <li>)
+        secteur = niveau_experience = niveau_etudes = contrat = ""
         if len(info_divs) >= 3:
-            try:
-                details_div = info_divs[-1]
-                li_items = details_div.find_elements(By.TAG_NAME, "li")
-                for li in li_items:
-                    txt = li.text.strip()
-                    if "Secteur d'activité" in txt:
-                        secteur = txt.split(":", 1)[1].strip()
-                    elif "Fonction" in txt:
-                        secteur = txt.split(":", 1)[1].strip()
-                    elif "Expérience requise" in txt:
-                        niveau_experience = txt.split(":", 1)[1].strip()
-                    elif "Niveau d'étude demandé" in txt:
-                        niveau_etudes = txt.split(":", 1)[1].strip()
-                    elif "Type de contrat proposé" in txt:
-                        contrat = txt.split(":", 1)[1].strip()
-            except Exception:
-                pass
+            for li in info_divs[-1].find_all("li"):
+                txt = element_text(li)
+                if ":" not in txt:
+                    continue
+                value = txt.split(":", 1)[1].strip()
+                if "Secteur d'activité" in txt or "Fonction" in txt:
+                    secteur = value
+                elif "Expérience requise" in txt:
+                    niveau_experience = value
+                elif "Niveau d'étude demandé" in txt:
+                    niveau_etudes = value
+                elif "Type de contrat proposé" in txt:
+                    contrat = value
 
         offer = {
             "titre": titre,
@@ -130,112 +111,162 @@ def extract_offers(driver):
             "via": "Rekrute",
             "job_url": job_url,
         }
-        try:
-            validate_json(offer)
-            if not check_duplicate(data, offer["job_url"]):
-                offers_list.append(offer)
+        offers_list.append(offer)
 
-        except Exception as e:
-            logger.exception(f"Erreur de validation JSON : {e}")
+    # Une seule passe de validation pour toute la page
+    validate_many(offers_list)
+    return offers_list
 
-            continue
 
-    return offers_list
+def list_pages(fetcher, page_url=SEARCH_URL):
+    """Retourne les URLs absolues de toutes les pages de résultats d'une recherche.
 
+    page_url: la première page de résultats, voir search.rekrute_search_url
+    """
+    soup = fetcher.get(page_url, "div.holder")
+    if soup is None:
+        # Une liste vide passerait pour un crawl réussi sans offre nouvelle, qui
+        # retarderait le prochain passage (recrawl): on échoue pour réessayer
+        raise ConnectionError(f"Première page de résultats non chargée : {page_url}")
+    # Afficher le nombre maximal d'offres par page pour réduire le nombre de pages
+    amount_links = soup.select("div.slide-block div.pagination ul.amount li a")
+    if amount_links:
+        page_link = absolute_url(page_url, amount_links[-1].get("href"))
+        soup = fetcher.get(page_link, "div.slide-block div.pagination select") or soup
+    page_urls = [
+        absolute_url(BASE_URL, option.get("value"))
+        for option in soup.select("div.slide-block div.pagination select option")
+    ]
+    logger.info(f"Nombre total de pages :{len(page_urls)}")
+    return page_urls or [page_url]
 
-def access_rekrute(driver):
-    # Accéder à la page de base
-    base_url = "https://www.rekrute.com/offres-emploi-maroc.html"
-    driver.get(base_url)
 
-    # Attendre que la barre de recherche soit disponible, puis saisir "DATA"
-    search_input = WebDriverWait(driver, 15).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "#keywordSearch"))
-    )
-    search_input.clear()
-    search_input.send_keys("DATA" + Keys.RETURN)
+def crawl_pages(
+    fetcher, page_urls, full_crawl=None, data=None, checkpoint=None, dedupe=None
+):
+    """Extrait les nouvelles offres d'une liste de pages de résultats (tout ou partie du crawl).
 
+    fetcher: PageFetcher en mode "http" (Selenium en secours) ou "selenium"
 
-def get_pages_url(driver):
-    try:
-        # Sélecteur adapté pour la nouvelle structure
-        pagination = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "div.slide-block div.pagination")
-            )
-        )
-        amount_of_offers = pagination.find_element(
-            By.CSS_SELECTOR, "ul.amount"
-        ).find_elements(By.TAG_NAME, "li")
-        last_page_amount = amount_of_offers[-1]
-        page_link = last_page_amount.find_element(By.TAG_NAME, "a").get_attribute(
-            "href"
-        )
-        driver.get(page_link)
-        pagination = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "div.slide-block div.pagination select")
-            )
-        )
-        page_options = pagination.find_elements(By.TAG_NAME, "option")
-        total_pages = len(page_options)
-        logger.info(f"Nombre total de pages :{total_pages}")
-        page_urls = [url.get_attribute("value") for url in page_options]
+    page_urls: les pages à parcourir, dans l'ordre du site
 
-    except Exception as e:
-        logger.exception(
-            f"Pagination select non trouvée. Utilisation d'une seule page: {e}"
-        )
-        page_urls = []
-    return page_urls
+    full_crawl: parcourir toutes les pages au lieu de s'arrêter aux pages déjà connues
+
+    data: liste complétée au fil des pages, pour garder les offres en cas d'erreur
 
+    checkpoint: point de reprise mis à jour après chaque page (pages restantes et offres)
 
-def change_page(driver, page_url):
-    if page_url:
-        # Si l'URL est relative, on complète avec le domaine
-        if not page_url.startswith("http"):
-            page_url = "https://www.rekrute.com" + page_url
-            logger.info(f"accessing the page url: {page_url}")
+    dedupe: SharedDedupe commun aux crawls de plusieurs mots-clés
+    """
+    history = get_seen_store("offres_emploi_rekrute.json")
+    stop = IncrementalStop("rekrute", full_crawl)
+    data = [] if data is None else data
+    page_urls = list(page_urls)
+    for page_number, page_url in enumerate(page_urls, start=1):
         logger.info(f"Navigation vers la page : {page_url}")
-        driver.get(page_url)
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.holder"))
-        )
+        page = fetcher.get(page_url, "div.holder")
+        if page is None:
+            # Une page vide compterait comme déjà connue pour l'arrêt incrémental: on
+            # échoue pour garder le point de reprise et relancer à partir de cette page
+            raise ConnectionError(f"Page de résultats non chargée : {page_url}")
+        offers = parse_offers(page, history, page_url)
+        # L'arrêt incrémental compte les offres nouvelles, même trouvées par un autre mot-clé
+        done = stop.page_done(len(offers))
+        if dedupe is not None:
+            offers = dedupe.claim_offers(offers)
+        data.extend(offers)
+        logger.info(f"Page {page_number} traitée, total offres cumulées :{len(data)}")
+        if checkpoint is not None:
+            checkpoint.save(offers, pending=[] if done else page_urls[page_number:])
+        if done:
+            break
+    return data
 
 
-def main(logger=setup_logger("Rekrute.log")):
-    """Cette fonction permet de parcourir le site rekrute et d'en extraire les offres d'emploi.
-    L'utilisation par defaut recherche des offres liées au domaine de la Data.
+def crawl_keyword(
+    keyword, dedupe, mode=None, full_crawl=None, checkpoints=None, depth=None
+):
+    """Crawle les résultats d'un mot-clé, avec son propre point de reprise.
+
+    Un point de reprise est enregistré après chaque page: en cas d'erreur il est conservé
+    et l'exception remontée, le prochain essai reprend à la première page non traitée.
+
+    checkpoints: liste où ajouter le point de reprise, effacé une fois les offres sauvegardées
+
+    depth: nombre maximal de pages de résultats d'un crawl incrémental (planificateur)
     """
+    checkpoint = Checkpoint(f"rekrute_{keyword_slug(keyword)}")
+    if checkpoints is not None:
+        checkpoints.append(checkpoint)
+    state = checkpoint.load()
+    data = []
     try:
-        driver = init_driver()
+        with PageFetcher("div.holder", mode) as fetcher:
+            if state is not None:
+                offers = unsaved_offers(state, "offres_emploi_rekrute.json")
+                data.extend(dedupe.claim_offers(offers))
+                full_crawl = state["full_crawl"]
+                page_urls = state["pending"]
+                logger.info(
+                    f"Reprise du crawl {keyword}, {len(page_urls)} pages restantes"
+                )
+            else:
+                page_urls = limit_pages(
+                    list_pages(fetcher, search_url("rekrute", keyword)),
+                    depth,
+                    full_crawl,
+                )
+                checkpoint.save(pending=page_urls, full_crawl=is_full_crawl(full_crawl))
+            crawl_pages(fetcher, page_urls, full_crawl, data, checkpoint, dedupe)
     except Exception as e:
-        logger.exception(f"Couldn't start the driver {e}")
+        logger.exception(
+            f"Erreur lors de l'extraction {keyword} :{e}, point de reprise conservé "
+            f"({len(data)} offres)"
+        )
+        raise
+    return data
+
+
+def main(
+    logger=setup_logger("Rekrute.log"),
+    mode=None,
+    full_crawl=None,
+    keywords=None,
+    depths=None,
+):
+    """Cette fonction permet de parcourir le site rekrute et d'en extraire les offres d'emploi.
+    L'utilisation par defaut recherche des offres liées au domaine de la Data.
+
+    Les mots-clés sont crawlés en parallèle et une offre trouvée par plusieurs d'entre
+    eux n'est gardée qu'une fois. Les offres ne sont sauvegardées que si tous réussissent.
 
+    mode: "http" pour lire les pages de listing sans navigateur (SCRAPER_FETCH_MODE)
+
+    full_crawl: parcourir toutes les pages au lieu de s'arrêter aux pages déjà connues
+
+    keywords: les mots-clés recherchés, SEARCH_KEYWORDS par défaut
+
+    depths: profondeur (en pages) de chaque mot-clé choisie par le planificateur (recrawl)
+    """
     start_time = time.time()
     logger.info("Début de l'extraction des offres d'emploi sur Rekrute")
-    try:
-        # --- Initialisation du driver Chrome ---
-
-        data = []  # Liste qui contiendra toutes les offres
-        access_rekrute(driver)
-        logger.info("Accès à la page de recherche réussi.")
-        page_urls = get_pages_url(driver)
-        for page_number in range(1, len(page_urls) + 1):
-            change_page(driver, page_urls[page_number - 1])
-            data.extend(extract_offers(driver))
-            logger.info(
-                f"Page {page_number} traitée, total offres cumulées :{len(data)}"
-            )
-        # Boucle pour parcourir toutes les pages
-    except Exception as e:
-        logger.exception(f"Erreur lors de l'extraction :{e}")
-    finally:
-        if driver:
-            driver.quit()
-        save_json(data, filename="offres_emploi_rekrute.json")
-        logger.info(f"Nouvelles offres extraites : {len(data)}")
-        logger.info(f"Extraction terminée en {time.time() - start_time} secondes.")
+    checkpoints = []
+    counts = {}
+    data = crawl_keywords(
+        "rekrute",
+        keywords or search_keywords("rekrute"),
+        lambda keyword, dedupe: crawl_keyword(
+            keyword, dedupe, mode, full_crawl, checkpoints, (depths or {}).get(keyword)
+        ),
+        counts=counts,
+    )
+    save_json(data, filename="offres_emploi_rekrute.json")
+    if not is_full_crawl(full_crawl):
+        record_runs("rekrute", counts, depths)
+    for checkpoint in checkpoints:
+        checkpoint.clear()
+    logger.info(f"Nouvelles offres extraites : {len(data)}")
+    logger.info(f"Extraction terminée en {time.time() - start_time} secondes.")
     return data
 
 
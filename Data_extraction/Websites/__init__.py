@@ -1,10 +1,31 @@
 import json
 import logging
 import os
+import threading
 
 import undetected_chromedriver as uc
-from jsonschema import ValidationError, validate
-from selenium.webdriver.chrome.options import Options
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+_patched_drivers = set()
+
+
+def patch_chromedriver(chrome_driver_path):
+    """Patche le binaire undetected_chromedriver une seule fois par processus.
+
+    chrome_driver_path: le dossier contenant le binaire undetected_chromedriver
+    """
+    executable_path = os.path.join(chrome_driver_path, "undetected_chromedriver")
+    if executable_path in _patched_drivers:
+        return
+    try:
+        uc_patcher = uc.Patcher(executable_path=executable_path)
+        if not uc_patcher.is_binary_patched():
+            uc_patcher.patch_exe()
+        print("chromedriver binary has now been patched")
+        _patched_drivers.add(executable_path)
+    except Exception as e:
+        print(f"Exception during patching {e}")
 
 
 def init_driver():
@@ -21,8 +42,10 @@ def init_driver():
     if not isinstance(chrome_path, str):
         raise TypeError("CHROME_DRIVER_DIR must be a string")
 
-    # Configuration du chromedriver
-    chrome_options = Options()
+    from data_extraction.Websites.browser_profile import configure_options
+
+    # Configuration du chromedriver (uc.ChromeOptions pour que les préférences soient appliquées)
+    chrome_options = uc.ChromeOptions()
     chrome_options.add_argument("--headless=new")  # exécute Chrome sans interface
     chrome_options.add_argument("--no-sandbox")  # requis pour Docker
     chrome_options.add_argument(
@@ -30,15 +53,9 @@ def init_driver():
     )  # évite les erreurs liées à /dev/shm
     chrome_options.add_argument("--disable-gpu")
     # chrome_options.add_argument("--start-maximized") # Uniquement pour machine locale
-    try:
-        uc_patcher = uc.Patcher(
-            executable_path=os.path.join(chrome_driver_path, "undetected_chromedriver")
-        )
-        if not uc_patcher.is_binary_patched():
-            uc_patcher.patch_exe()
-        print("chromedriver binary has now been patched")
-    except Exception as e:
-        print(f"Exception during patching {e}")
+    # Profil allégé: flags mémoire, blocage des images et stratégie de chargement
+    configure_options(chrome_options)
+    patch_chromedriver(chrome_driver_path)
 
     try:
         driver = uc.Chrome(
@@ -112,91 +129,114 @@ def highlight(
         )
 
 
-def load_json(filename="default.json", encoding="utf-8"):
+def output_file(filename, output_directory="scraping_output"):
+    """Retourne le chemin absolu d'un fichier du dossier de sortie, en créant le dossier."""
     current_path = os.path.abspath(__file__)
     current_dir = os.path.dirname(current_path)  # Websites directory
     parent_dir = os.path.dirname(current_dir)  # Data extraction directory
-    filename = os.path.join(parent_dir, "scraping_output", filename)
-    try:
-        data = json.load(open(filename, "r", encoding=encoding))
-    except FileNotFoundError:
-        logging.info("Json file not found creating new one")
-        data = []
-        with open(filename, "w", encoding="utf-8") as js_file:
-            json.dump(data, js_file, ensure_ascii=False, indent=4)
-    return data
+    output_path = os.path.join(parent_dir, output_directory)
+    os.makedirs(output_path, exist_ok=True)
+    return os.path.join(output_path, filename)
+
+
+def load_json(filename="default.json", encoding="utf-8"):
+    """Retourne toutes les offres d'une source: l'historique JSON puis les segments JSONL."""
+    from data_extraction.Websites.offer_store import OfferStore
+
+    return list(OfferStore(filename).iter_offers())
 
 
 def save_json(data: list, filename="default.json", output_directory="scraping_output"):
     """
-    Saves the json data to the specified file in the output directory. Note that if the same filename exists, the data will be apended instead of being overwritten
+    Saves the json data of a source in the output directory. The new items are appended to the
+    source's JSONL segments (see OfferStore), so a save only costs the size of the new data and
+    concurrent scrapers never rewrite each other's files.
 
     data: list of items to be saved as json
 
-    filename: name of the file
+    filename: name of the source's history file, e.g. offres_emploi_rekrute.json
 
     output_directory: the directory where all json outputs are stored
 
     """
-    # --- Sauvegarde locale en JSON (pour vérification) --
-
-    # Get the absolute path of the current script
-    current_path = os.path.abspath(__file__)
-    current_dir = os.path.dirname(current_path)
-    parent_dir = os.path.dirname(current_dir)
-
-    # Constructing the output path
-    output_path = os.path.join(parent_dir, output_directory)
-    os.makedirs(output_path, exist_ok=True)
-
-    # Change the current working directory
-    os.chdir(output_path)
+    from data_extraction.Websites.offer_store import OfferStore
+    from data_extraction.Websites.seen_store import get_seen_store
+
+    store = OfferStore(filename, output_directory)
+    store.append(data)
+    logging.info(f"Saving {len(data)} new jobs to {store.directory}")
+
+    # Garde l'index des URLs déjà vues synchronisé avec l'historique
+    get_seen_store(filename).add_many(job.get("job_url") for job in data)
+
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "Job_schema.json"
+)
+
+# Validateurs compilés par chemin de schéma: {schema_path: (mtime, validator)}
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def get_validator(schema_path=SCHEMA_PATH):
+    """Retourne le validateur compilé du schéma, rechargé seulement si le fichier a changé."""
+    mtime = os.stat(schema_path).st_mtime_ns
+    cached = _validators.get(schema_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with _validators_lock:
+        cached = _validators.get(schema_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(schema_path) as f:
+            schema = json.load(f)
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        validator = validator_class(schema)
+        _validators[schema_path] = (mtime, validator)
+        logging.info(f"Schema loaded from {schema_path}")
+        return validator
+
+
+def validate_json(data, schema_path=SCHEMA_PATH):
+    """Validates the json data according to the schema provided in arguments"""
+    error = best_match(get_validator(schema_path).iter_errors(data))
+    if error is not None:
+        logging.error(f"Validation error: {error.message}")
+    return error
 
-    existing_data = []
-    try:
-        if os.path.exists(output_path):
-            with open(filename, "r", encoding="utf-8") as js_file:
-                existing_data = json.load(js_file)
-    except FileNotFoundError:
-        logging.error("File not found, creating new one")
-        json.dump
-    with open(filename, "w", encoding="utf-8") as js_file:
-        merged_data = existing_data + data
-        logging.info(
-            f"Saving {len(merged_data)} jobs to {filename}, {len(data)} new jobs"
-        )
-        json.dump(merged_data, js_file, ensure_ascii=False, indent=4)
 
+def validate_many(offers, schema_path=SCHEMA_PATH):
+    """Validates a whole batch of offers with a single compiled validator.
 
-def validate_json(
-    data,
-    schema_path=os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "Job_schema.json"
-    ),
-):
-    """Validates the json data according to the schema provided in arguments"""
-    with open(schema_path) as f:
-        schema = json.load(f)
-    try:
-        validate(data, schema)
-    except ValidationError as e:
-        logging.error(f"Validation error: {e.message}")
-        return e
+    Returns one list of error messages per offer, in the same order (empty when the offer is valid).
+    """
+    validator = get_validator(schema_path)
+    results = []
+    for offer in offers:
+        errors = [error.message for error in validator.iter_errors(offer)]
+        if errors:
+            logging.error(f"Validation error for {offer.get('job_url')}: {errors}")
+        results.append(errors)
+    return results
 
 
 def check_duplicate(data, job_url):
     """A function to check if a job offer is already present in the old data. Returns true if there is a duplicate offer found
 
-    data: the old job offers data
+    data: the old job offers data, either a list of offers or a SeenStore index
 
     job_url: the current job_url to be matched
     """
-    # Check if the job URL already exists in the data
-    for job in data[:][:]:
-        if job.get("job_url") == job_url:
-            logging.warning(f"Duplicate found: {job_url}")
-            return True
-    return False
+    if hasattr(data, "add_many"):
+        # SeenStore: lookup in the persistent index
+        duplicate = job_url in data
+    else:
+        duplicate = any(job.get("job_url") == job_url for job in data)
+    if duplicate:
+        logging.warning(f"Duplicate found: {job_url}")
+    return duplicate
 
 
 # Set up a logger
@@ -1,206 +1,146 @@
-import datetime
-import re
 import time
 
-from jsonschema import ValidationError
 from selenium import webdriver
 from selenium.common.exceptions import (
-    ElementClickInterceptedException,
-    ElementNotInteractableException,
-    NoSuchElementException,
     TimeoutException,
 )
 from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from data_extraction.dates import normalize_date
 from data_extraction.Websites import (
-    check_duplicate,
-    init_driver,
-    load_json,
     save_json,
     setup_logger,
     validate_json,
 )
+from data_extraction.Websites.checkpoint import Checkpoint, unsaved_offers
+from data_extraction.Websites.consent import register_overlay
+from data_extraction.Websites.detail_fetcher import fetch_details
+from data_extraction.Websites.driver_pool import get_driver_pool
+from data_extraction.Websites.frontier import drain
+from data_extraction.Websites.html_fetch import block_text, element_text, page_snapshot
+from data_extraction.Websites.incremental import (
+    IncrementalStop,
+    is_full_crawl,
+    limit_pages,
+)
+from data_extraction.Websites.recrawl import record_runs
+from data_extraction.Websites.search import (
+    crawl_keywords,
+    keyword_slug,
+    search_keywords,
+    search_url,
+)
+from data_extraction.Websites.section_parser import SectionSpec
+from data_extraction.Websites.seen_store import get_seen_store
+
+# Bannière CookieYes affichée sur les pages de bayt
+register_overlay(
+    "www.bayt.com",
+    "body > div.cky-consent-container.cky-box-bottom-left > div > button > img",
+    consent_cookies=["cookieyes-consent"],
+)
 
 logger = setup_logger("bayt.log")
 
-
-def extract_date_from_text(text: str):
-    try:
-        text = text.lower().strip()
-        # Chechking for string "yesterday"
-        if match := re.search(r"\s*yesterday", text):
-            days = 1
-        # Chechking for string "00 days ago"
-        elif match := re.search(r"(\d+)\s*\+\s*days\s*ago", text):
-            days = int(match.group(1))
-        # Chechking for string "00 days"
-        elif match := re.search(r"(\d+)\s*days", text):
-            days = int(match.group(1))
-        # Chechking for string "00 hours ago"
-        elif match := re.search(r"(\d+)\s*hours\s*ago", text):
-            days = int(match.group(1)) / 24
-        elif match := re.search(r"(\d+)\s*hour\s*ago", text):
-            days = int(match.group(1)) / 24
-        else:
-            days = None
-        if days is not None:
-            date_publication = datetime.datetime.now() - datetime.timedelta(days=days)
-            return date_publication.strftime("%d-%m-%Y")
-        else:
-            logger.warning(f"Time format not recognised: {text}")
-    except Exception as e:
-        logger.warning(f"Exception during time formatting {e}")
+# Sections de la description d'une offre, titres reconnus en début de ligne
+JOB_DETAILS_SPEC = SectionSpec(
+    headers={
+        "description": ("job description", "description"),
+        "competences": ("competences", "required skills", "skills"),
+    },
+    preamble="intro",
+    keep_header_line=True,
+    ignore_case=True,
+)
 
 
-def normalize_header(header, header_keywords):
-    header = header.lower().strip()
-    for norm, variations in header_keywords.items():
-        if any(header.startswith(v) for v in variations):
-            return norm
-    return header
+def extract_date_from_text(text: str):
+    """Date d'une mention relative ("3 days ago", "yesterday") au format jj-mm-aaaa."""
+    date = normalize_date(text, "bayt", "%d-%m-%Y")
+    if date is None:
+        logger.warning(f"Time format not recognised: {text}")
+    return date
 
 
 def text_segmentation(job_offer_details):
-    # headers
-    header_keywords = {
-        "description": ["Job description", "job description", "description"],
-        "competences": ["Competences", "competences", "skills", "required skills"],
-    }
-
-    # Flatten all possible headers
-    all_keywords = [kw for group in header_keywords.values() for kw in group]
-    regex_pattern = r"\n(?=({}))".format("|".join(map(re.escape, all_keywords)))
-
-    # Split using regex
-    sections = re.split(regex_pattern, job_offer_details, flags=re.IGNORECASE)
-
-    parsed_sections = {}
-    parsed_sections["intro"] = sections[0].strip()
+    """Découpe la description d'une offre en sections (intro, description, competences).
 
-    # Parse remaining sections into normalized keys
-    for i in range(1, len(sections), 2):
-        header = sections[i]
-        content = sections[i + 1] if i + 1 < len(sections) else ""
-        key = normalize_header(header, header_keywords)
-        parsed_sections[key] = content.strip()
-    return parsed_sections
+    Chaque section garde sa ligne de titre, comme sur la page.
+    """
+    parsed = JOB_DETAILS_SPEC.parse(job_offer_details)
+    return {section: "\n".join(lines) for section, lines in parsed.sections.items()}
 
 
-def access_bayt(driver: webdriver.Chrome):
-    # Accéder à la page de base
-    base_url = "https://www.bayt.com/en/morocco/"
-    driver.get(base_url)
-    # Attendre que la barre de recherche soit disponible, puis saisir "DATA"
-    search_input = WebDriverWait(driver, 15).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "input#text_search"))
-    )
-    search_input.clear()
-    while driver.current_url == base_url:
-        search_input.send_keys("DATA" + Keys.RETURN)
+def fetch_job_details(driver: webdriver.Chrome, job_url: str):
+    """Charge une page de détail et en extrait l'offre."""
+    # La bannière de consentement est fermée par le pool, une seule fois par session
+    driver.get(job_url)
+    offer = extract_job_details(driver)
+    offer["job_url"] = job_url
+    return offer
 
 
-def extract_job_info(driver: webdriver.Chrome):
-    try:
-        data = load_json("offres_emploi_bayt.json")
-    except FileNotFoundError:
-        data = []
+def new_job_urls(driver: webdriver.Chrome):
+    """URLs des offres de la page de résultats courante absentes de l'historique."""
+    seen = get_seen_store("offres_emploi_bayt.json")
     job_urls = WebDriverWait(driver, 15).until(
         EC.presence_of_all_elements_located(
             (By.CSS_SELECTOR, "div.row.is-compact.is-m.no-wrap > h2 > a")
         )
     )
     job_urls = [job_url.get_attribute("href") for job_url in job_urls]
-    offers = []
     # results_inner_card > ul > li.has-pointer-d.is-active > div.row.is-compact.is-m.no-wrap > h2 > a
     logger.info(f"Found {len(job_urls)} job offers.")
-    for i in range(len(job_urls)):
-        try:
-            job_url = job_urls[i]
-            if check_duplicate(data, job_url):
-                continue
-            driver.get(job_url)
-            try:
-                pop_up = WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located(
-                        (
-                            By.CSS_SELECTOR,
-                            "body > div.cky-consent-container.cky-box-bottom-left > div > button > img",
-                        )
-                    )
-                )
-                pop_up.click()
-                logger.info("Popup found and clicked.")
-            except (ElementClickInterceptedException, ElementNotInteractableException):
-                logger.info("No popup found — continuing without action.")
-
-            offer = extract_job_details(driver)
-            offer["job_url"] = job_url
-
-            try:
-                validate_json(offer)
-                offers.append(offer)
-            except ValidationError as e:
-                logger.exception(f"Erreur lors de validation JSON : {e}")
-                continue
-
-        except (
-            ElementClickInterceptedException,
-            ElementNotInteractableException,
-            NoSuchElementException,
-        ):
-            logger.exception("An error occurred while extracting the job details")
-    return offers
+    return seen.filter_new(job_urls)
 
 
-def extract_job_details(driver: webdriver.Chrome):
-    try:
-        titre = driver.find_element(By.CSS_SELECTOR, 'h1[id="job_title"]').text.strip()
+def extract_job_info(driver: webdriver.Chrome, concurrency=None, job_urls=None):
+    """Extrait les offres de la page de résultats courante.
 
-    except NoSuchElementException:
-        titre = ""
-    try:
-        publication_date = (
-            WebDriverWait(driver, 15)
-            .until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, 'span[id="jb-posted-date"]')
-                )
-            )
-            .text
-        )
-        publication_date = extract_date_from_text(publication_date)
-    except NoSuchElementException:
-        publication_date = ""
-    try:
-        companie = driver.find_element(
-            By.CSS_SELECTOR, 'a[class="t-default t-bold"]>span'
-        ).text.strip()
+    Les pages de détail sont chargées en parallèle sur `concurrency` drivers, dont
+    `driver` (DETAIL_CONCURRENCY par défaut), les offres restent dans l'ordre du listing.
 
-    except NoSuchElementException:
-        companie = ""
+    job_urls: les offres à extraire, par défaut les nouvelles offres de la page
+    """
+    if job_urls is None:
+        job_urls = new_job_urls(driver)
+
+    offers = []
+    for offer in fetch_details(job_urls, fetch_job_details, concurrency, driver=driver):
+        if offer is None:
+            continue
+        # validate_json journalise l'erreur et la retourne, sans la lever
+        if validate_json(offer) is None:
+            offers.append(offer)
+    return offers
 
-    try:
-        job_details = driver.find_element(
-            By.CSS_SELECTOR, 'div[class="t-break"]'
-        ).text.strip()
-        job_details = text_segmentation(job_details)
 
-    except NoSuchElementException:
-        job_details = ""
+def parse_job_details(soup):
+    """Détails d'une offre à partir du HTML de sa page (page chargée ou cache HTML)."""
+    publication_date = element_text(soup.select_one('span[id="jb-posted-date"]'))
+    job_details = block_text(soup.select_one('div[class="t-break"]'))
     offer = {
-        "titre": titre,
-        "publication_date": publication_date,
-        "companie": companie,
+        "titre": element_text(soup.select_one('h1[id="job_title"]')),
+        "publication_date": extract_date_from_text(publication_date)
+        if publication_date
+        else "",
+        "companie": element_text(soup.select_one('a[class="t-default t-bold"]>span')),
         "via": "Bayt",
     }
-    offer |= job_details
-
+    if job_details:
+        offer |= text_segmentation(job_details)
     return offer
 
 
+def extract_job_details(driver: webdriver.Chrome):
+    WebDriverWait(driver, 15).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, 'span[id="jb-posted-date"]'))
+    )
+    return parse_job_details(page_snapshot(driver, "detail"))
+
+
 def find_number_of_pages(driver: webdriver.Chrome):
     try:
         num_of_pages = WebDriverWait(driver, 15).until(
@@ -237,43 +177,213 @@ def change_page(
         return False
 
 
-def main(logger=setup_logger("bayt.log")):
+def open_search(driver: webdriver.Chrome, keyword="DATA"):
+    """Ouvre les résultats d'un mot-clé, retourne l'URL des résultats et le nombre de pages."""
+    driver.get(search_url("bayt", keyword))
+    main_page = driver.current_url.split("?")[0]
+    logger.info(f"accessed search page {main_page}")
+    max_pages = find_number_of_pages(driver) or 1
+    return main_page, max_pages
+
+
+def crawl_pages(
+    driver: webdriver.Chrome,
+    main_page: str,
+    pages,
+    detail_concurrency=None,
+    full_crawl=None,
+    data=None,
+    checkpoint=None,
+    dedupe=None,
+    frontier=None,
+):
+    """Extrait les nouvelles offres d'une plage de pages de résultats (tout ou partie du crawl).
+
+    main_page: l'URL de la page de résultats de la recherche
+
+    pages: les numéros de pages à parcourir, dans l'ordre
+
+    detail_concurrency: nombre de pages de détail chargées en parallèle
+
+    full_crawl: parcourir toutes les pages au lieu de s'arrêter aux pages déjà connues
+
+    data: liste complétée au fil des pages, pour garder les offres en cas d'erreur
+
+    checkpoint: point de reprise mis à jour après chaque page (pages restantes et offres)
+
+    dedupe: SharedDedupe commun aux crawls de plusieurs mots-clés
+
+    frontier: si défini, les offres sont mises en file pour les workers au lieu d'être
+    extraites, `data` ne contient alors que leurs URLs
+    """
+    pages = list(pages)
+    stop = IncrementalStop("bayt", full_crawl)
+    data = [] if data is None else data
+    for index, current_page in enumerate(pages, start=1):
+        if not change_page(driver, main_page, current_page, pages[-1]):
+            break
+        # Accéder aux offres d'emploi
+        logger.info(f"Going to page with url: {driver.current_url}")
+        job_urls = new_job_urls(driver)
+        # L'arrêt incrémental compte les offres nouvelles, même trouvées par un autre mot-clé
+        done = stop.page_done(len(job_urls))
+        if dedupe is not None:
+            job_urls = dedupe.claim(job_urls)
+        if frontier is not None:
+            offers = [{"job_url": job_url} for job_url in job_urls]
+            frontier.push(offers)
+        else:
+            offers = extract_job_info(driver, detail_concurrency, job_urls)
+        data.extend(offers)
+        logger.info(f"Page number {current_page} done, cumulated offers: {len(data)}")
+        if checkpoint is not None:
+            checkpoint.save(offers, pending=[] if done else pages[index:])
+        if done:
+            break
+    return data
+
+
+def crawl_keyword(
+    keyword,
+    dedupe,
+    detail_concurrency=None,
+    full_crawl=None,
+    checkpoints=None,
+    depth=None,
+):
+    """Crawle les résultats d'un mot-clé, avec son propre point de reprise.
+
+    Un point de reprise est enregistré après chaque page: en cas d'erreur il est conservé
+    et l'exception remontée, le prochain essai reprend à la première page non traitée.
+
+    checkpoints: liste où ajouter le point de reprise, effacé une fois les offres sauvegardées
+
+    depth: nombre maximal de pages de résultats d'un crawl incrémental (planificateur)
+    """
+    checkpoint = Checkpoint(f"bayt_{keyword_slug(keyword)}")
+    if checkpoints is not None:
+        checkpoints.append(checkpoint)
+    state = checkpoint.load()
+    data = []
     try:
-        driver = init_driver()
+        with get_driver_pool().driver() as driver:
+            if state is not None:
+                offers = unsaved_offers(state, "offres_emploi_bayt.json")
+                data.extend(dedupe.claim_offers(offers))
+                main_page, pages = state["main_page"], state["pending"]
+                full_crawl = state["full_crawl"]
+                logger.info(f"Resuming crawl {keyword}, {len(pages)} pages left")
+            else:
+                main_page, max_pages = open_search(driver, keyword)
+                pages = limit_pages(range(1, max_pages + 1), depth, full_crawl)
+                checkpoint.save(
+                    main_page=main_page,
+                    pending=pages,
+                    full_crawl=is_full_crawl(full_crawl),
+                )
+            crawl_pages(
+                driver,
+                main_page,
+                pages,
+                detail_concurrency,
+                full_crawl,
+                data,
+                checkpoint,
+                dedupe,
+            )
+        logger.info(f"All pages done for {keyword}.")
     except Exception as e:
-        logger.exception(f"Couldn't start the driver {e}")
+        logger.exception(
+            f"An error occurred during extraction of {keyword}:{e}, checkpoint kept "
+            f"({len(data)} offers)"
+        )
+        raise
+    return data
+
+
+def main(
+    logger=setup_logger("bayt.log"),
+    detail_concurrency=None,
+    full_crawl=None,
+    keywords=None,
+    depths=None,
+):
+    """Parcourt les résultats de bayt.com au Maroc pour chaque mot-clé ("DATA" par défaut).
+
+    Les mots-clés sont crawlés en parallèle et une offre trouvée par plusieurs d'entre
+    eux n'est extraite qu'une fois. Les offres ne sont sauvegardées que si tous réussissent.
+
+    detail_concurrency: nombre de pages de détail chargées en parallèle
+
+    full_crawl: parcourir toutes les pages au lieu de s'arrêter aux pages déjà connues
+
+    keywords: les mots-clés recherchés, SEARCH_KEYWORDS par défaut
+
+    depths: profondeur (en pages) de chaque mot-clé choisie par le planificateur (recrawl)
+    """
     start_time = time.time()
     logger.info("Début de l'extraction des offres d'emploi sur Bayt.com")
-    # Initialiser le driver
-    try:
-        data = []
-        # Accéder à la page de base
-        access_bayt(driver)
-        main_page = driver.current_url
-        print(f"The main page url is {main_page}")
-        logger.info("accessed search page")
-        # trouver le nombre de pages
-        max_pages = find_number_of_pages(driver)
-        current_page = 1
-        while change_page(driver, main_page, current_page, max_pages):
-            # Accéder aux offres d'emploi
-            logger.info(f"Going to page with url: {driver.current_url}")
-            data.extend(extract_job_info(driver))
-            logger.info(
-                f"Page number {current_page} done, cumulated offers: {len(data)}"
-            )
-            current_page += 1
-        logger.info("All pages done.")
-    except Exception as e:
-        logger.exception(f"An error occurred during extraction:{e}")
-    finally:
-        if driver:
-            driver.quit()
-        save_json(data, filename="offres_emploi_bayt.json")
-        logger.info(f"Nouvelles offres extraites : {len(data)}")
-        logger.info(f"Extraction terminée en {time.time() - start_time} secondes.")
+    checkpoints = []
+    counts = {}
+    data = crawl_keywords(
+        "bayt",
+        keywords or search_keywords("bayt"),
+        lambda keyword, dedupe: crawl_keyword(
+            keyword,
+            dedupe,
+            detail_concurrency,
+            full_crawl,
+            checkpoints,
+            (depths or {}).get(keyword),
+        ),
+        counts=counts,
+    )
+    save_json(data, filename="offres_emploi_bayt.json")
+    if not is_full_crawl(full_crawl):
+        record_runs("bayt", counts, depths)
+    for checkpoint in checkpoints:
+        checkpoint.clear()
+    logger.info(f"Nouvelles offres extraites : {len(data)}")
+    logger.info(f"Extraction terminée en {time.time() - start_time} secondes.")
     return data
 
 
+def enqueue_details(frontier, keywords=None, full_crawl=None, depths=None):
+    """Parcourt les résultats et met les offres en file dans la frontière Redis.
+
+    Les pages de détail sont ensuite extraites par les workers (drain_details), sur
+    autant de machines que nécessaire. Retourne le nombre d'offres en file.
+    """
+    counts = {}
+    with get_driver_pool().driver() as driver:
+        for keyword in keywords or search_keywords("bayt"):
+            main_page, max_pages = open_search(driver, keyword)
+            depth = (depths or {}).get(keyword)
+            queued = crawl_pages(
+                driver,
+                main_page,
+                limit_pages(range(1, max_pages + 1), depth, full_crawl),
+                full_crawl=full_crawl,
+                frontier=frontier,
+            )
+            counts[keyword] = len(queued)
+    if not is_full_crawl(full_crawl):
+        record_runs("bayt", counts, depths)
+    return frontier.counts()["queued"]
+
+
+def fetch_queued_offer(driver: webdriver.Chrome, offer):
+    """Extrait une offre mise en file, None si elle est invalide."""
+    offer = fetch_job_details(driver, offer["job_url"])
+    if validate_json(offer) is not None:
+        return None
+    return offer
+
+
+def drain_details(frontier):
+    """Worker de la frontière: extrait et sauvegarde les offres en file."""
+    return drain(frontier, fetch_queued_offer, "offres_emploi_bayt.json")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import WebDriverException
+
+from data_extraction.Websites import output_file, setup_logger
+
+logger = setup_logger("browser_profile.log")
+
+STATS_FILE = "page_stats.jsonl"
+
+# Ressources inutiles aux scrapers, qui ne lisent que le texte des pages
+BLOCKED_RESOURCES = {
+    "images": [
+        "*.png",
+        "*.jpg",
+        "*.jpeg",
+        "*.gif",
+        "*.webp",
+        "*.avif",
+        "*.svg",
+        "*.ico",
+        "*.bmp",
+    ],
+    "fonts": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav", "*.m3u8"],
+    "trackers": [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*googlesyndication.com*",
+        "*googleadservices.com*",
+        "*adservice.google.*",
+        "*connect.facebook.net*",
+        "*hotjar.com*",
+        "*clarity.ms*",
+        "*criteo.*",
+        "*taboola.com*",
+        "*outbrain.com*",
+        "*scorecardresearch.com*",
+        "*nr-data.net*",
+        "*snap.licdn.com*",
+        "*analytics.tiktok.com*",
+    ],
+}
+
+# Profil de blocage par domaine: catégories de BLOCKED_RESOURCES et motifs propres au site.
+# Les bannières de consentement ne sont pas bloquées: elles sont fermées par consent.py.
+SITE_PROFILES = {
+    "default": {"block": ["images", "fonts", "media", "trackers"]},
+    "www.rekrute.com": {"block": ["images", "fonts", "media", "trackers"]},
+    "www.bayt.com": {
+        "block": ["images", "fonts", "media", "trackers"],
+        "extra": ["*bayt.com/*/ads/*"],
+    },
+    "www.emploi.ma": {"block": ["images", "fonts", "media", "trackers"]},
+    "www.marocannonces.com": {
+        "block": ["images", "fonts", "media", "trackers"],
+        "extra": ["*adsbygoogle*", "*pagead2.*"],
+    },
+}
+
+# Flags réduisant la mémoire et le trafic en arrière-plan de Chrome
+LOW_MEMORY_FLAGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--renderer-process-limit=2",
+    "--js-flags=--max-old-space-size=512",
+]
+
+PAGE_LOAD_STRATEGIES = ("normal", "eager", "none")
+
+_stats_lock = threading.Lock()
+
+# Taille transférée et durées de la page courante, d'après l'API Performance du navigateur
+_STATS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0;
+for (const r of resources) { bytes += r.transferSize || 0; }
+return {
+    bytes: bytes,
+    requests: resources.length + 1,
+    dom_ms: nav ? Math.round(nav.domContentLoadedEventEnd) : null,
+};
+"""
+
+
+def profile_name():
+    """Profil du navigateur (BROWSER_PROFILE): "lean" bloque les ressources, "full" non."""
+    return os.getenv("BROWSER_PROFILE", "lean").lower()
+
+
+def page_load_strategy():
+    """Stratégie de chargement (PAGE_LOAD_STRATEGY): "eager" rend la main au DOMContentLoaded."""
+    strategy = os.getenv("PAGE_LOAD_STRATEGY", "eager").lower()
+    if strategy not in PAGE_LOAD_STRATEGIES:
+        logger.warning(f"PAGE_LOAD_STRATEGY inconnue: {strategy}, utilisation de eager")
+        return "eager"
+    return strategy
+
+
+def site_categories(host):
+    """Catégories bloquées pour un domaine (BROWSER_BLOCK surcharge tous les profils)."""
+    override = os.getenv("BROWSER_BLOCK")
+    if override is not None:
+        return [c.strip() for c in override.split(",") if c.strip()]
+    profile = SITE_PROFILES.get(host, SITE_PROFILES["default"])
+    return profile["block"]
+
+
+def blocked_patterns(url):
+    """Motifs d'URL bloqués par le protocole DevTools pour la page `url`."""
+    if profile_name() != "lean":
+        return []
+    host = urlparse(url).hostname or ""
+    patterns = []
+    for category in site_categories(host):
+        patterns.extend(BLOCKED_RESOURCES.get(category, []))
+    patterns.extend(SITE_PROFILES.get(host, {}).get("extra", []))
+    return patterns
+
+
+def configure_options(options):
+    """Ajoute le profil allégé aux options Chrome (flags mémoire, préférences, chargement).
+
+    Les préférences s'appliquent à tout le navigateur: seules les catégories bloquées
+    par tous les sites y figurent, le reste est bloqué par domaine avec apply_site_profile.
+    """
+    options.page_load_strategy = page_load_strategy()
+    if profile_name() != "lean":
+        return options
+    for flag in LOW_MEMORY_FLAGS:
+        options.add_argument(flag)
+    blocked_everywhere = set.intersection(
+        *(set(site_categories(host)) for host in SITE_PROFILES)
+    )
+    prefs = {"profile.default_content_setting_values.notifications": 2}
+    if "images" in blocked_everywhere:
+        prefs["profile.managed_default_content_settings.images"] = 2
+    options.add_experimental_option("prefs", prefs)
+    return options
+
+
+def apply_site_profile(driver, url):
+    """Active le blocage d'URL du domaine de `url` sur le driver, si le domaine a changé."""
+    host = urlparse(url).hostname
+    if not host or getattr(driver, "blocking_host", None) == host:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": blocked_patterns(url)}
+        )
+        driver.blocking_host = host
+    except WebDriverException as e:
+        logger.warning(f"Impossible d'appliquer le profil de blocage pour {host}: {e}")
+
+
+def stats_enabled():
+    return os.getenv("PAGE_STATS", "1") == "1"
+
+
+def record_page_stats(driver, url, elapsed):
+    """Ajoute les octets transférés et le temps de chargement de la page à page_stats.jsonl.
+
+    elapsed: la durée du driver.get en secondes
+    """
+    if not stats_enabled():
+        return
+    try:
+        stats = driver.execute_script(_STATS_SCRIPT) or {}
+    except WebDriverException as e:
+        logger.warning(f"Statistiques de chargement indisponibles pour {url}: {e}")
+        return
+    entry = {
+        "time": time.time(),
+        "host": urlparse(url).hostname,
+        "url": url,
+        "profile": profile_name(),
+        "strategy": page_load_strategy(),
+        "load_ms": round(elapsed * 1000),
+        **stats,
+    }
+    with _stats_lock:
+        with open(output_file(STATS_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def summarize(path=None):
+    """Moyennes par domaine et par profil, et économie du profil "lean" face à "full"."""
+    path = path or output_file(STATS_FILE)
+    totals = defaultdict(lambda: [0, 0, 0])  # pages, octets, millisecondes
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            total = totals[(entry["host"], entry["profile"])]
+            total[0] += 1
+            total[1] += entry.get("bytes") or 0
+            total[2] += entry.get("load_ms") or 0
+
+    summary = {}
+    for (host, profile), (pages, size, duration) in totals.items():
+        summary.setdefault(host, {})[profile] = {
+            "pages": pages,
+            "bytes": size / pages,
+            "load_ms": duration / pages,
+        }
+    for profiles in summary.values():
+        lean, full = profiles.get("lean"), profiles.get("full")
+        if lean and full:
+            profiles["saved"] = {
+                "bytes": full["bytes"] - lean["bytes"],
+                "load_ms": full["load_ms"] - lean["load_ms"],
+            }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Résumé des octets et temps de chargement enregistrés par les crawls "
+        "(lancer un crawl avec BROWSER_PROFILE=full pour mesurer l'économie)."
+    )
+    parser.add_argument(
+        "--stats", help=f"Fichier de statistiques, {STATS_FILE} par défaut"
+    )
+    args = parser.parse_args()
+
+    for host, profiles in sorted(summarize(args.stats).items()):
+        for profile, values in profiles.items():
+            print(
+                f"{host:<24} {profile:<5} "
+                f"{values['bytes'] / 1024:>10.1f} Ko {values['load_ms']:>8.0f} ms"
+                + (f" ({values['pages']} pages)" if "pages" in values else "")
+            )
+
+
+if __name__ == "__main__":
+    main()
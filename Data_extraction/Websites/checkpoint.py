@@ -0,0 +1,156 @@
+import json
+import os
+import time
+
+from data_extraction.Websites import output_file, setup_logger
+from data_extraction.Websites.seen_store import get_seen_store
+
+try:
+    import redis
+except ImportError:  # Redis est optionnel, les points de reprise sont alors locaux
+    redis = None
+
+logger = setup_logger("checkpoint.log")
+
+CHECKPOINT_DIRECTORY = os.path.join("scraping_output", "checkpoints")
+
+
+def max_age():
+    """Âge maximal d'un point de reprise en secondes (CHECKPOINT_MAX_AGE en heures, 24 par défaut)."""
+    return float(os.getenv("CHECKPOINT_MAX_AGE", 24)) * 3600
+
+
+class Checkpoint:
+    """Point de reprise d'un crawl: l'état (pages restantes, ...) et les offres déjà extraites.
+
+    L'état est réécrit en entier à chaque étape; les offres sont ajoutées à la suite et
+    l'état retient leur nombre, de sorte qu'une écriture interrompue ne laisse jamais
+    d'offre en double. Stocké dans scraping_output/checkpoints/, ou dans Redis si
+    CHECKPOINT_REDIS_URL est défini (partagé entre plusieurs machines).
+
+    name: le nom du crawl, ex: "rekrute" ou "rekrute_shard_<id de tâche>"
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._state = None
+        redis_url = os.getenv("CHECKPOINT_REDIS_URL")
+        if redis_url and redis is not None:
+            self._redis = redis.Redis.from_url(redis_url)
+        else:
+            self._redis = None
+            self._state_path = output_file(f"{name}.json", CHECKPOINT_DIRECTORY)
+            self._offers_path = output_file(
+                f"{name}.offers.jsonl", CHECKPOINT_DIRECTORY
+            )
+
+    def _read_state(self):
+        if self._redis is not None:
+            raw = self._redis.get(f"checkpoint:{self.name}")
+            return json.loads(raw) if raw else None
+        if not os.path.exists(self._state_path):
+            return None
+        with open(self._state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_offers(self, state):
+        count = state.get("offers", 0)
+        if not count:
+            return []
+        if self._redis is not None:
+            raw = self._redis.lrange(f"checkpoint:{self.name}:offers", 0, count - 1)
+            return [json.loads(offer) for offer in raw]
+        with open(self._offers_path, "rb") as f:
+            return [json.loads(line) for line in f.read(state["offset"]).splitlines()]
+
+    def load(self):
+        """Retourne l'état sauvegardé avec ses offres (clé "offers"), None s'il n'y en a pas.
+
+        Un point de reprise plus vieux que CHECKPOINT_MAX_AGE est supprimé.
+        """
+        state = self._read_state()
+        if state is None:
+            return None
+        if time.time() - state.get("updated", 0) > max_age():
+            logger.info(f"Point de reprise {self.name} périmé, nouveau crawl")
+            self.clear()
+            return None
+        self._state = state
+        offers = self._read_offers(state)
+        logger.info(f"Reprise de {self.name} avec {len(offers)} offres déjà extraites")
+        return {**state, "offers": offers}
+
+    def save(self, new_offers=(), **state):
+        """Ajoute les nouvelles offres et met à jour l'état du crawl.
+
+        new_offers: les offres extraites depuis la dernière sauvegarde
+
+        state: les champs d'état à mettre à jour, ex: pending=[...]
+        """
+        current = dict(self._state or {"offers": 0, "offset": 0})
+        current.update(state)
+        new_offers = list(new_offers)
+        if self._redis is not None:
+            offers_key = f"checkpoint:{self.name}:offers"
+            pipe = self._redis.pipeline(transaction=True)
+            # Les offres au-delà du compte enregistré viennent d'une sauvegarde interrompue
+            if current["offers"]:
+                pipe.ltrim(offers_key, 0, current["offers"] - 1)
+            else:
+                # ltrim(0, -1) garderait toute la liste
+                pipe.delete(offers_key)
+            if new_offers:
+                pipe.rpush(
+                    offers_key,
+                    *(json.dumps(offer, ensure_ascii=False) for offer in new_offers),
+                )
+            current["offers"] += len(new_offers)
+            current["updated"] = time.time()
+            pipe.set(f"checkpoint:{self.name}", json.dumps(current))
+            pipe.execute()
+        else:
+            current["offset"] = self._append_offers(current["offset"], new_offers)
+            current["offers"] += len(new_offers)
+            current["updated"] = time.time()
+            tmp_path = self._state_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(current, f, ensure_ascii=False)
+            os.replace(tmp_path, self._state_path)
+        self._state = current
+
+    def _append_offers(self, offset, offers):
+        """Écrit les offres à partir de `offset` (la fin des offres enregistrées dans l'état),
+        ce qui écarte les lignes d'une sauvegarde interrompue. Retourne la nouvelle fin."""
+        mode = "r+b" if os.path.exists(self._offers_path) else "wb"
+        with open(self._offers_path, mode) as f:
+            f.seek(offset)
+            f.truncate()
+            for offer in offers:
+                f.write((json.dumps(offer, ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def clear(self):
+        """Supprime le point de reprise, une fois les offres sauvegardées."""
+        self._state = None
+        if self._redis is not None:
+            self._redis.delete(
+                f"checkpoint:{self.name}", f"checkpoint:{self.name}:offers"
+            )
+            return
+        for path in (self._state_path, self._offers_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def unsaved_offers(state, history_file):
+    """Offres du point de reprise pas encore sauvegardées.
+
+    Si le processus s'est arrêté entre save_json et clear, les offres du point de reprise
+    sont déjà dans l'historique et ne doivent pas être ajoutées une seconde fois.
+
+    history_file: le fichier de sortie du scraper, ex: "offres_emploi_rekrute.json"
+    """
+    seen = get_seen_store(history_file)
+    return [offer for offer in state["offers"] if offer.get("job_url") not in seen]
@@ -0,0 +1,117 @@
+import threading
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from data_extraction.Websites import setup_logger
+
+logger = setup_logger("consent.log")
+
+# Clique l'élément s'il est présent, sans passer par l'attente implicite de find_element
+_CLICK_SCRIPT = """
+const element = document.querySelector(arguments[0]);
+if (element) { element.click(); return true; }
+return false;
+"""
+
+_overlays = {}
+_consent_cookies = {}
+_lock = threading.Lock()
+
+
+class Overlay:
+    """Une bannière (consentement, popup) à fermer une fois par session sur un domaine.
+
+    host: le domaine concerné, ex: "www.bayt.com"
+
+    dismiss_selector: sélecteur CSS de l'élément à cliquer pour fermer la bannière
+
+    consent_cookies: noms des cookies qui mémorisent le choix, réinjectés après un reset du driver
+
+    wait: attente maximale de la bannière en secondes, uniquement au premier passage
+    """
+
+    def __init__(self, host, dismiss_selector, consent_cookies=(), wait=3):
+        self.host = host
+        self.dismiss_selector = dismiss_selector
+        self.consent_cookies = tuple(consent_cookies)
+        self.wait = wait
+
+
+def register_overlay(host, dismiss_selector, consent_cookies=(), wait=3):
+    """Enregistre la bannière d'un site, fermée automatiquement par les drivers du pool."""
+    overlay = Overlay(host, dismiss_selector, consent_cookies, wait)
+    with _lock:
+        _overlays[host] = overlay
+    return overlay
+
+
+def _dismiss(driver, overlay):
+    try:
+        return driver.execute_script(_CLICK_SCRIPT, overlay.dismiss_selector)
+    except WebDriverException as e:
+        logger.warning(f"Impossible de fermer la bannière de {overlay.host}: {e}")
+        return False
+
+
+def _remember_cookies(driver, overlay):
+    cookies = [
+        cookie
+        for cookie in driver.get_cookies()
+        if cookie["name"] in overlay.consent_cookies
+    ]
+    if cookies:
+        with _lock:
+            _consent_cookies[overlay.host] = cookies
+
+
+def _restore_cookies(driver, overlay):
+    with _lock:
+        cookies = _consent_cookies.get(overlay.host, [])
+    for cookie in cookies:
+        try:
+            driver.add_cookie(
+                {key: cookie[key] for key in ("name", "value", "path") if key in cookie}
+            )
+        except WebDriverException as e:
+            logger.warning(f"Cookie {cookie['name']} non restauré: {e}")
+    return bool(cookies)
+
+
+def ensure_consent(driver, url):
+    """Ferme la bannière du domaine de `url` si ce n'est pas déjà fait pour ce driver.
+
+    Au premier passage sur un domaine, on attend la bannière au plus `wait` secondes
+    (sans erreur si elle n'apparaît pas) et on mémorise les cookies de consentement.
+    Ensuite, aucune attente: les cookies sont réinjectés dans les drivers remis à zéro
+    et une bannière encore affichée est fermée en un seul appel.
+    """
+    host = urlparse(url).hostname
+    overlay = _overlays.get(host)
+    if overlay is None:
+        return
+    done = getattr(driver, "consented_hosts", None)
+    if done is None:
+        done = driver.consented_hosts = set()
+    if host in done:
+        return
+
+    if _restore_cookies(driver, overlay):
+        # Le choix est connu: la page déjà chargée peut encore afficher la bannière
+        _dismiss(driver, overlay)
+    else:
+        try:
+            WebDriverWait(driver, overlay.wait, poll_frequency=0.25).until(
+                lambda d: _dismiss(d, overlay)
+            )
+            logger.info(f"Bannière de {host} fermée")
+        except TimeoutException:
+            logger.info(f"Pas de bannière sur {host} — on continue sans action")
+        _remember_cookies(driver, overlay)
+    done.add(host)
+
+
+def forget(driver):
+    """À appeler quand les cookies du driver sont effacés (reset du pool)."""
+    driver.consented_hosts = set()
@@ -0,0 +1,82 @@
+import os
+import queue
+import threading
+
+from data_extraction.Websites import setup_logger
+from data_extraction.Websites.driver_pool import get_driver_pool
+
+logger = setup_logger("detail_fetcher.log")
+
+
+def detail_concurrency(default=3):
+    """Nombre de pages de détail chargées en parallèle (DETAIL_CONCURRENCY)."""
+    return max(1, int(os.getenv("DETAIL_CONCURRENCY", default)))
+
+
+def detail_acquire_timeout(default=5):
+    """Secondes d'attente d'un driver libre pour les détails (DETAIL_ACQUIRE_TIMEOUT)."""
+    return float(os.getenv("DETAIL_ACQUIRE_TIMEOUT", default))
+
+
+def fetch_details(urls, fetch_one, concurrency=None, pool=None, driver=None):
+    """Charge les pages de détail en parallèle, chaque worker utilisant son propre driver.
+
+    Les résultats sont retournés dans l'ordre de `urls` (l'ordre du listing). Une URL
+    dont l'extraction échoue donne None à sa position.
+
+    urls: les URLs des pages de détail
+
+    fetch_one: fonction (driver, url) -> résultat, appelée pour chaque URL
+
+    concurrency: nombre maximal de drivers utilisés en même temps
+
+    pool: le pool de drivers, celui du processus par défaut
+
+    driver: le driver déjà tenu par l'appelant (celui du listing), qui compte parmi les
+    `concurrency` drivers. Les autres ne sont attendus que DETAIL_ACQUIRE_TIMEOUT
+    secondes: si le pool est entièrement pris (par les listings d'autres mots-clés),
+    les URLs restantes sont chargées une à une sur ce driver au lieu d'attendre sans fin
+    """
+    if not urls:
+        return []
+    pool = pool or get_driver_pool()
+    concurrency = min(concurrency or detail_concurrency(), len(urls))
+    results = [None] * len(urls)
+    pending = queue.Queue()
+    for item in enumerate(urls):
+        pending.put(item)
+
+    def fetch_pending(driver):
+        while True:
+            try:
+                index, url = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                results[index] = fetch_one(driver, url)
+            except Exception as e:
+                logger.exception(f"Échec de l'extraction des détails {url}: {e}")
+
+    def worker():
+        try:
+            with pool.driver(detail_acquire_timeout()) as driver:
+                fetch_pending(driver)
+        except TimeoutError:
+            logger.info("Aucun driver libre pour les détails, worker abandonné")
+
+    threads = [
+        threading.Thread(target=worker, name=f"detail-fetch-{i}")
+        for i in range(concurrency - 1 if driver is not None else concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    if driver is not None:
+        fetch_pending(driver)
+    for thread in threads:
+        thread.join()
+    if not pending.empty():
+        # Aucun driver obtenu et l'appelant n'en tient pas: attendre qu'un se libère
+        with pool.driver() as driver:
+            fetch_pending(driver)
+    logger.info(f"{len(urls)} pages de détail traitées avec {concurrency} drivers")
+    return results
@@ -0,0 +1,205 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from data_extraction.Websites import init_driver, setup_logger
+from data_extraction.Websites.browser_profile import (
+    apply_site_profile,
+    record_page_stats,
+)
+from data_extraction.Websites.consent import ensure_consent, forget
+from data_extraction.Websites.rate_limit import page_blocked, throttle
+
+logger = setup_logger("driver_pool.log")
+
+
+class DriverPool:
+    """Pool de drivers Chrome démarrés à l'avance et réutilisés entre les crawls.
+
+    Le pool appartient au processus (un worker Celery ou un script) : les drivers sont
+    vérifiés avant chaque utilisation, remis à zéro lorsqu'ils sont rendus et recyclés
+    après avoir servi `max_pages` pages.
+
+    size: nombre maximal de drivers vivants dans le processus (DRIVER_POOL_SIZE)
+
+    max_pages: nombre de pages chargées avant de recycler un driver (DRIVER_MAX_PAGES)
+
+    driver_factory: fonction qui démarre un nouveau driver
+    """
+
+    def __init__(self, size=None, max_pages=None, driver_factory=init_driver):
+        self.size = size if size is not None else int(os.getenv("DRIVER_POOL_SIZE", 4))
+        self.max_pages = (
+            max_pages
+            if max_pages is not None
+            else int(os.getenv("DRIVER_MAX_PAGES", 200))
+        )
+        self.driver_factory = driver_factory
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._alive = 0
+        self._closed = False
+
+    def _start_driver(self):
+        driver = self.driver_factory()
+        driver.pages_served = 0
+        original_get = driver.get
+
+        def counting_get(url):
+            driver.pages_served += 1
+            apply_site_profile(driver, url)
+            start = time.perf_counter()
+            with throttle(url, timeout_errors=(TimeoutException,)) as request:
+                result = original_get(url)
+                if page_blocked(driver):
+                    request.throttled()
+            record_page_stats(driver, url, time.perf_counter() - start)
+            ensure_consent(driver, url)
+            return result
+
+        # Compte les pages chargées pour savoir quand recycler le driver, applique le
+        # profil de blocage du site visité, respecte le limiteur du domaine, enregistre
+        # les octets et temps de chargement et ferme les bannières de consentement
+        # enregistrées (une fois par session)
+        driver.get = counting_get
+        logger.info("Nouveau driver démarré pour le pool")
+        return driver
+
+    def _is_healthy(self, driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except WebDriverException:
+            return False
+
+    def _is_worn_out(self, driver):
+        return getattr(driver, "pages_served", 0) >= self.max_pages
+
+    def _discard(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Erreur lors de la fermeture du driver: {e}")
+        with self._lock:
+            self._alive -= 1
+
+    def _reset(self, driver):
+        """Remet le driver dans un état neutre: un seul onglet, sans cookies ni stockage."""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        try:
+            driver.execute_script(
+                "window.localStorage.clear(); window.sessionStorage.clear();"
+            )
+        except WebDriverException:
+            pass
+        driver.delete_all_cookies()
+        forget(driver)
+        driver.execute_script("window.location.href = 'about:blank';")
+
+    def warm_up(self, count=None):
+        """Démarre des drivers à l'avance pour que les crawls n'attendent pas Chrome.
+
+        count: nombre de drivers à avoir prêts (DRIVER_POOL_WARM, 1 par défaut)
+        """
+        count = count if count is not None else int(os.getenv("DRIVER_POOL_WARM", 1))
+        count = min(count, self.size)
+        while True:
+            with self._lock:
+                if self._closed or self._alive >= count:
+                    return
+                self._alive += 1
+            try:
+                self._idle.put(self._start_driver())
+            except Exception:
+                with self._lock:
+                    self._alive -= 1
+                raise
+
+    def acquire(self, timeout=None):
+        """Retourne un driver sain, en le démarrant si le pool n'est pas plein."""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_start = self._alive < self.size
+                    if can_start:
+                        self._alive += 1
+                if can_start:
+                    try:
+                        return self._start_driver()
+                    except Exception:
+                        with self._lock:
+                            self._alive -= 1
+                        raise
+                try:
+                    driver = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError("Aucun driver disponible dans le pool")
+
+            if self._is_worn_out(driver) or not self._is_healthy(driver):
+                logger.info("Driver usé ou défaillant, recyclage")
+                self._discard(driver)
+                continue
+            return driver
+
+    def release(self, driver):
+        """Rend le driver au pool, ou le ferme s'il ne peut plus servir."""
+        if self._closed or self._is_worn_out(driver) or not self._is_healthy(driver):
+            self._discard(driver)
+            return
+        try:
+            self._reset(driver)
+        except WebDriverException as e:
+            logger.warning(f"Impossible de réinitialiser le driver: {e}")
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """Ferme tous les drivers inactifs; ceux encore utilisés seront fermés au retour."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Retourne le pool de drivers du processus courant, créé à la première demande."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def close_driver_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -1,251 +1,257 @@
-import re
-
-from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-
 from data_extraction.Websites import (
     check_duplicate,
-    init_driver,
-    load_json,
     save_json,
     setup_logger,
-    validate_json,
+    validate_many,
+)
+from data_extraction.Websites.checkpoint import Checkpoint, unsaved_offers
+from data_extraction.Websites.html_fetch import PageFetcher, element_text
+from data_extraction.Websites.incremental import (
+    IncrementalStop,
+    is_full_crawl,
+    limit_pages,
 )
+from data_extraction.Websites.recrawl import record_runs
+from data_extraction.Websites.search import (
+    crawl_keywords,
+    keyword_slug,
+    search_keywords,
+    search_url,
+)
+from data_extraction.Websites.seen_store import get_seen_store
 
 logger = setup_logger("emploi.log")
-# Liste pour stocker les nouvelles données scrappées
-new_jobs = []
 
+SEARCH_URL = search_url("emploi", "DATA")
 
-def access_emploi(driver: webdriver.Chrome):
-    # Accès à l'URL initiale pour soumettre la recherche "DATA AI ML"
-    driver.get(
-        "https://www.emploi.ma/recherche-jobs-maroc/data?f%5B0%5D=im_field_offre_metiers%3A31"
-    )
+# Libellés des <li> de "div.card-job-detail ul" et champ correspondant de l'offre
+DETAIL_LABELS = {
+    "Niveau d´études requis": "niveau_etudes",
+    "Niveau d’études requis": "niveau_etudes",
+    "Niveau d'expérience": "niveau_experience",
+    "Contrat proposé": "contrat",
+    "Région de": "region",
+    "Compétences clés": "competences",
+}
 
 
-def get_number_pages(driver: webdriver.Chrome):
-    try:
-        pages = WebDriverWait(driver, 15).until(
-            EC.presence_of_all_elements_located(
-                (By.CSS_SELECTOR, "li[class='pager-item active pagination-numbers']")
+def parse_cards(soup, data, page=0):
+    """Extrait les offres des cartes "div.card.card-job" d'une page déjà chargée.
+
+    Produit les mêmes dictionnaires que la boucle de `main`.
+
+    soup: la page parsée
+
+    data: l'index des offres déjà extraites (SeenStore), pour ignorer les doublons
+
+    page: le numéro de la page, utilisé dans les logs
+    """
+    jobs = []
+    for index, card in enumerate(soup.select("div.card.card-job"), start=1):
+        job_url = (card.get("data-href") or "").strip()
+        if check_duplicate(data, job_url):
+            continue
+
+        titre_link = card.select_one("a")
+        if titre_link is None:
+            logger.error(f"[Carte {index} - page {page}] Titre non trouvé.")
+        companie = card.select_one("a.card-job-company")
+        if companie is None:
+            logger.error(
+                f"[Carte {index} - page {page}] Nom de l'entreprise non trouvé."
             )
-        )
-        max_pages = int(pages[-1].text.strip())
-        return max_pages
-    except (NoSuchElementException, TimeoutException) as e:
-        logger.error(f"Page number not found: {e}")
-        return 1
+        description = card.select_one("div.card-job-description p")
+        if description is None:
+            logger.error(f"[Carte {index} - page {page}] Description non trouvée.")
 
+        # Informations complémentaires (niveau d'études, expérience, contrat, région, compétences)
+        details = dict.fromkeys(DETAIL_LABELS.values(), "")
+        ul = card.select_one("div.card-job-detail ul")
+        if ul is None:
+            logger.error(
+                f"[Carte {index} - page {page}] Section des détails complémentaires non trouvée."
+            )
+        else:
+            for li in ul.find_all("li"):
+                txt = element_text(li)
+                for label, field in DETAIL_LABELS.items():
+                    if label in txt:
+                        details[field] = element_text(li.find("strong"))
+                        break
 
-def main(logger=setup_logger("emploi.log")):
-    # Initialisation du driver
-    try:
-        driver = init_driver()
-    except Exception as e:
-        logger.exception(f"Couldn't start the driver {e}")
+        time_elem = card.select_one("time")
+        if time_elem is None:
+            logger.error(
+                f"[Carte {index} - page {page}] Date de publication non trouvée."
+            )
+        pub_date = (time_elem.get("datetime") or "").strip() if time_elem else ""
 
-    try:
-        access_emploi(driver)
-        max_pages = get_number_pages(driver)
-        logger.info(f"Nombre de pages trouvées: {max_pages}")
-        page = 0
-        # Boucle de pagination
-        data = load_json("offres_emploi_emploi.json")
-        while page < max_pages:
-            # Récupère l'URL actuelle
-            url = driver.current_url
-
-            # Si l'URL contient déjà un paramètre "page"
-            if re.search(r"page=\d+", url):
-                new_url = re.sub(r"page=\d+", f"page={page}", url)
-                new_url += "?f%5B0%5D=im_field_offre_metiers%3A31"
-            else:
-                sep = (
-                    "&" if "?" in url else "?"
-                )  # gère les cas où d'autres paramètres existent déjà
-                new_url = f"{url}{sep}page={page}"
-
-            driver.get(new_url)
-            logger.info(f"Scraping de la page {page + 1} : {new_url}")
-
-            # Attendre que les cartes d'offres soient chargées
-            try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_all_elements_located(
-                        (By.CSS_SELECTOR, "div.card.card-job")
-                    )
-                )
-            except TimeoutException:
-                logger.error(
-                    f"Aucune carte trouvée sur la page {page} ou temps d'attente dépassé."
-                )
-                break
-
-            cards = WebDriverWait(driver, 15).until(
-                EC.presence_of_all_elements_located(
-                    (By.CSS_SELECTOR, "div.card.card-job")
-                )
+        job = {
+            "job_url": job_url,
+            "titre": element_text(titre_link),
+            "companie": element_text(companie),
+            "description": element_text(description),
+            "niveau_etudes": details["niveau_etudes"],
+            "niveau_experience": details["niveau_experience"],
+            "contrat": details["contrat"],
+            "region": details["region"],
+            "competences": details["competences"],
+            "publication_date": pub_date,
+            "via": "emploi.ma",
+        }
+        jobs.append(job)
+
+    # Une seule passe de validation pour toute la page
+    validate_many(jobs)
+    return jobs
+
+
+def page_url(results_url, page):
+    """URL de la page `page` (à partir de 0) d'une recherche."""
+    separator = "&" if "?" in results_url else "?"
+    return f"{results_url}{separator}page={page}"
+
+
+def list_pages(fetcher, results_url=SEARCH_URL):
+    """Retourne les numéros des pages de résultats d'une recherche (à partir de 0)."""
+    soup = fetcher.get(results_url)
+    if soup is None:
+        # Une liste vide passerait pour un crawl réussi sans offre nouvelle, qui
+        # retarderait le prochain passage (recrawl): on échoue pour réessayer
+        raise ConnectionError(f"Première page de résultats non chargée : {results_url}")
+    pages = soup.select("li[class='pager-item active pagination-numbers']")
+    max_pages = int(element_text(pages[-1])) if pages else 1
+    logger.info(f"Nombre de pages trouvées: {max_pages}")
+    return list(range(max_pages))
+
+
+def crawl(
+    fetcher,
+    full_crawl=None,
+    pages=None,
+    jobs=None,
+    checkpoint=None,
+    results_url=SEARCH_URL,
+    dedupe=None,
+):
+    """Parcourt les pages de résultats et retourne les nouvelles offres.
+
+    fetcher: PageFetcher en mode "http" (Selenium en secours) ou "selenium"
+
+    full_crawl: parcourir toutes les pages au lieu de s'arrêter aux pages déjà connues
+
+    pages: les numéros de pages à parcourir, toutes les pages de la recherche par défaut
+
+    jobs: liste complétée au fil des pages, pour garder les offres en cas d'erreur
+
+    checkpoint: point de reprise mis à jour après chaque page (pages restantes et offres)
+
+    results_url: la première page de résultats, voir search.emploi_search_url
+
+    dedupe: SharedDedupe commun aux crawls de plusieurs mots-clés
+    """
+    data = get_seen_store("offres_emploi_emploi.json")
+    stop = IncrementalStop("emploi", full_crawl)
+    jobs = [] if jobs is None else jobs
+    pages = list_pages(fetcher, results_url) if pages is None else list(pages)
+    for index, page in enumerate(pages, start=1):
+        url = page_url(results_url, page)
+        logger.info(f"Scraping de la page {page + 1} : {url}")
+        soup = fetcher.get(url)
+        if soup is None:
+            # Sans exception, les pages restantes seraient perdues et le point de
+            # reprise effacé: on le garde pour reprendre à cette page
+            raise ConnectionError(
+                f"Aucune carte trouvée sur la page {page} ou temps d'attente dépassé."
             )
-            logger.info(f"Nombre de cartes trouvées sur la page {page} : {len(cards)}")
-
-            # Si aucune carte n'est présente, sortir de la boucle
-            if not cards:
-                logger.warning(
-                    "Aucune offre trouvée sur cette page, fin de la pagination."
-                )
-                break
-
-            for index, card in enumerate(cards, start=1):
-                # Récupérer l'URL de l'offre
-                try:
-                    job_url = (
-                        card.get_attribute("data-href").strip()
-                        if card.get_attribute("data-href")
-                        else ""
-                    )
-                    if check_duplicate(data, job_url):
-                        continue
-
-                except Exception as e:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Erreur lors de la récupération de l'URL : {e}"
-                    )
-                    job_url = ""
-                # Récupérer le titre de l'offre
-                try:
-                    titre = card.find_element(By.CSS_SELECTOR, "a").text.strip()
-                except NoSuchElementException:
-                    logger.error(f"[Carte {index} - page {page}] Titre non trouvé.")
-                    titre = ""
-
-                # Récupérer le nom de l'entreprise
-                try:
-                    companie = card.find_element(
-                        By.CSS_SELECTOR, "a.card-job-company"
-                    ).text.strip()
-                except NoSuchElementException:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Nom de l'entreprise non trouvé."
-                    )
-                    companie = ""
-
-                # Récupérer la description
-                try:
-                    description = card.find_element(
-                        By.CSS_SELECTOR, "div.card-job-description p"
-                    ).text.strip()
-                except NoSuchElementException:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Description non trouvée."
-                    )
-                    description = ""
-
-                # Informations complémentaires (niveau d'études, expérience, contrat, région, compétences)
-                niveau_etudes = ""
-                niveau_experience = ""
-                contrat = ""
-                region = ""
-                competences = ""
-                try:
-                    ul = card.find_element(By.CSS_SELECTOR, "div.card-job-detail ul")
-                    li_elements = ul.find_elements(By.TAG_NAME, "li")
-                    for li in li_elements:
-                        txt = li.text.strip()
-                        if (
-                            "Niveau d´études requis" in txt
-                            or "Niveau d’études requis" in txt
-                        ):
-                            try:
-                                niveau_etudes = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                niveau_etudes = ""
-                        elif "Niveau d'expérience" in txt:
-                            try:
-                                niveau_experience = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                niveau_experience = ""
-                        elif "Contrat proposé" in txt:
-                            try:
-                                contrat = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                contrat = ""
-                        elif "Région de" in txt:
-                            try:
-                                region = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                region = ""
-                        elif "Compétences clés" in txt:
-                            try:
-                                competences = li.find_element(
-                                    By.TAG_NAME, "strong"
-                                ).text.strip()
-                            except NoSuchElementException:
-                                competences = ""
-                except NoSuchElementException:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Section des détails complémentaires non trouvée."
-                    )
-
-                # Récupérer la date de publication
-                try:
-                    pub_date = (
-                        card.find_element(By.CSS_SELECTOR, "time")
-                        .get_attribute("datetime")
-                        .strip()
-                    )
-                except NoSuchElementException:
-                    logger.error(
-                        f"[Carte {index} - page {page}] Date de publication non trouvée."
-                    )
-                    pub_date = ""
-
-                # Création du dictionnaire de l'offre
-                job = {
-                    "job_url": job_url,
-                    "titre": titre,
-                    "companie": companie,
-                    "description": description,
-                    "niveau_etudes": niveau_etudes,
-                    "niveau_experience": niveau_experience,
-                    "contrat": contrat,
-                    "region": region,
-                    "competences": competences,
-                    "publication_date": pub_date,
-                    "via": "emploi.ma",
-                }
-
-                # Ajout de l'offre aux nouvelles offres et mémorisation de l'
-                try:
-                    validate_json(job)
-
-                    new_jobs.append(job)
-                except Exception:
-                    logger.error("Erreur lors de la validation JSON")
-
-            # Passage à la page suivante
-            page += 1
-        logger.info(f"Nombre total d'offres nouvellement extraites : {len(new_jobs)}")
+        page_jobs = parse_cards(soup, data, page)
+        # L'arrêt incrémental compte les offres nouvelles, même trouvées par un autre mot-clé
+        done = stop.page_done(len(page_jobs))
+        if dedupe is not None:
+            page_jobs = dedupe.claim_offers(page_jobs)
+        jobs.extend(page_jobs)
+        if checkpoint is not None:
+            checkpoint.save(page_jobs, pending=[] if done else pages[index:])
+        if done:
+            break
+    return jobs
+
+
+def crawl_keyword(
+    keyword, dedupe, mode=None, full_crawl=None, checkpoints=None, depth=None
+):
+    """Crawle les résultats d'un mot-clé, avec son propre point de reprise.
+
+    Un point de reprise est enregistré après chaque page: en cas d'erreur il est conservé
+    et l'exception remontée, le prochain essai reprend à la première page non traitée.
+
+    checkpoints: liste où ajouter le point de reprise, effacé une fois les offres sauvegardées
 
+    depth: nombre maximal de pages de résultats d'un crawl incrémental (planificateur)
+    """
+    checkpoint = Checkpoint(f"emploi_{keyword_slug(keyword)}")
+    if checkpoints is not None:
+        checkpoints.append(checkpoint)
+    state = checkpoint.load()
+    results_url = search_url("emploi", keyword)
+    jobs = []
+    try:
+        with PageFetcher("div.card.card-job", mode) as fetcher:
+            if state is not None:
+                offers = unsaved_offers(state, "offres_emploi_emploi.json")
+                jobs.extend(dedupe.claim_offers(offers))
+                pages, full_crawl = state["pending"], state["full_crawl"]
+                logger.info(f"Reprise du crawl {keyword}, {len(pages)} pages restantes")
+            else:
+                pages = limit_pages(list_pages(fetcher, results_url), depth, full_crawl)
+                checkpoint.save(pending=pages, full_crawl=is_full_crawl(full_crawl))
+            crawl(fetcher, full_crawl, pages, jobs, checkpoint, results_url, dedupe)
     except Exception as e:
-        logger.error(f"Erreur lors du scraping :{e}")
-    finally:
-        if driver:
-            driver.quit()
-        logger.info("Extraction terminée !")
-        save_json(new_jobs, "offres_emploi_emploi.json")
-    return new_jobs
+        logger.error(
+            f"Erreur lors du scraping {keyword} :{e}, point de reprise conservé"
+        )
+        raise
+    return jobs
+
+
+def main(
+    logger=setup_logger("emploi.log"),
+    mode=None,
+    full_crawl=None,
+    keywords=None,
+    depths=None,
+):
+    """Parcourt emploi.ma et extrait les offres liées à la Data.
+
+    Les mots-clés sont crawlés en parallèle et une offre trouvée par plusieurs d'entre
+    eux n'est gardée qu'une fois. Les offres ne sont sauvegardées que si tous réussissent.
+
+    mode: "http" pour lire les pages de listing sans navigateur (SCRAPER_FETCH_MODE)
+
+    full_crawl: parcourir toutes les pages au lieu de s'arrêter aux pages déjà connues
+
+    keywords: les mots-clés recherchés, SEARCH_KEYWORDS par défaut
+
+    depths: profondeur (en pages) de chaque mot-clé choisie par le planificateur (recrawl)
+    """
+    checkpoints = []
+    counts = {}
+    jobs = crawl_keywords(
+        "emploi",
+        keywords or search_keywords("emploi"),
+        lambda keyword, dedupe: crawl_keyword(
+            keyword, dedupe, mode, full_crawl, checkpoints, (depths or {}).get(keyword)
+        ),
+        counts=counts,
+    )
+    logger.info(f"Nombre total d'offres nouvellement extraites : {len(jobs)}")
+    save_json(jobs, "offres_emploi_emploi.json")
+    if not is_full_crawl(full_crawl):
+        record_runs("emploi", counts, depths)
+    for checkpoint in checkpoints:
+        checkpoint.clear()
+    logger.info("Extraction terminée !")
+    return jobs
 
 
 if __name__ == "__main__":
@@ -0,0 +1,243 @@
+import json
+import os
+import time
+
+from data_extraction.Websites import save_json, setup_logger
+from data_extraction.Websites.driver_pool import get_driver_pool
+from data_extraction.Websites.seen_store import get_seen_store
+
+try:
+    import redis
+except ImportError:  # Redis est optionnel, les détails sont alors extraits sur place
+    redis = None
+
+logger = setup_logger("frontier.log")
+
+# Ajoute les offres dont l'URL n'a pas encore été vue pendant ce crawl
+# ARGV: durée de vie de l'ensemble des URLs vues, puis les paires (url, offre)
+_PUSH_SCRIPT = """
+local added = 0
+for i = 2, #ARGV, 2 do
+    if redis.call('SADD', KEYS[1], ARGV[i]) == 1 then
+        redis.call('RPUSH', KEYS[2], ARGV[i + 1])
+        added = added + 1
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return added
+"""
+
+# Remet en file les baux expirés (worker arrêté), puis réserve jusqu'à ARGV[3] offres
+# KEYS: file, baux, essais, lettres mortes
+# ARGV: maintenant, fin du bail, nombre d'offres, nombre maximal d'essais
+_LEASE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, item in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], item)
+    if tonumber(redis.call('HGET', KEYS[3], item) or 0) >= tonumber(ARGV[4]) then
+        redis.call('HDEL', KEYS[3], item)
+        redis.call('RPUSH', KEYS[4], item)
+    else
+        redis.call('RPUSH', KEYS[1], item)
+    end
+end
+local items = {}
+for i = 1, tonumber(ARGV[3]) do
+    local item = redis.call('LPOP', KEYS[1])
+    if not item then break end
+    redis.call('ZADD', KEYS[2], ARGV[2], item)
+    redis.call('HINCRBY', KEYS[3], item, 1)
+    table.insert(items, item)
+end
+return items
+"""
+
+# Rend une offre en échec: remise en file, ou lettre morte après le dernier essai
+_FAIL_SCRIPT = """
+if redis.call('ZREM', KEYS[2], ARGV[1]) == 0 then
+    return 0
+end
+if tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or 0) >= tonumber(ARGV[2]) then
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    redis.call('RPUSH', KEYS[4], ARGV[1])
+    return 2
+end
+redis.call('RPUSH', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+def frontier_settings():
+    """Réglages de la frontière, à partir des variables d'environnement."""
+    return {
+        "lease_seconds": float(os.getenv("FRONTIER_LEASE_SECONDS", 300)),
+        "max_attempts": int(os.getenv("FRONTIER_MAX_ATTEMPTS", 3)),
+        "batch_size": int(os.getenv("FRONTIER_BATCH_SIZE", 10)),
+        # Les URLs vues sont oubliées après ce délai, le crawl suivant peut les reproposer
+        "seen_ttl": int(os.getenv("FRONTIER_SEEN_TTL", 24 * 3600)),
+    }
+
+
+class Frontier:
+    """File de pages de détail partagée par tous les workers, stockée dans Redis.
+
+    Une offre (les champs du listing, dont "job_url") n'est mise en file qu'une fois par
+    crawl. Un worker réserve un lot d'offres pour `lease_seconds`: s'il s'arrête sans les
+    rendre, le bail expire et elles sont remises en file. Après `max_attempts` essais,
+    une offre passe dans les lettres mortes au lieu de bloquer la file.
+
+    client: le client Redis
+
+    site: le nom du site, ex: "bayt"
+    """
+
+    def __init__(self, client, site, settings=None):
+        self.client = client
+        self.site = site
+        settings = settings or frontier_settings()
+        self.lease_seconds = settings["lease_seconds"]
+        self.max_attempts = settings["max_attempts"]
+        self.batch_size = settings["batch_size"]
+        self.seen_ttl = settings["seen_ttl"]
+        prefix = f"frontier:{site}"
+        self.seen_key = f"{prefix}:seen"
+        self.queue_key = f"{prefix}:queue"
+        self.leases_key = f"{prefix}:leases"
+        self.attempts_key = f"{prefix}:attempts"
+        self.dead_key = f"{prefix}:dead"
+        self._push = client.register_script(_PUSH_SCRIPT)
+        self._lease = client.register_script(_LEASE_SCRIPT)
+        self._fail = client.register_script(_FAIL_SCRIPT)
+
+    def push(self, offers):
+        """Met en file les offres pas encore vues, retourne le nombre d'offres ajoutées."""
+        args = [self.seen_ttl]
+        for offer in offers:
+            args += [offer["job_url"], json.dumps(offer, ensure_ascii=False)]
+        if len(args) == 1:
+            return 0
+        added = self._push(keys=[self.seen_key, self.queue_key], args=args)
+        logger.info(f"[{self.site}] {added} offres mises en file")
+        return added
+
+    def lease(self, count=None):
+        """Réserve jusqu'à `count` offres, retourne des paires (jeton, offre).
+
+        Le jeton est à rendre avec `complete` ou `fail`.
+        """
+        now = time.time()
+        tokens = self._lease(
+            keys=[self.queue_key, self.leases_key, self.attempts_key, self.dead_key],
+            args=[
+                now,
+                now + self.lease_seconds,
+                count or self.batch_size,
+                self.max_attempts,
+            ],
+        )
+        return [(token, json.loads(token)) for token in tokens]
+
+    def complete(self, tokens):
+        """Retire définitivement les offres traitées."""
+        if not tokens:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zrem(self.leases_key, *tokens)
+        pipe.hdel(self.attempts_key, *tokens)
+        pipe.execute()
+
+    def fail(self, token, error=None):
+        """Rend une offre en échec, retentée par un worker jusqu'à `max_attempts` essais."""
+        result = self._fail(
+            keys=[self.queue_key, self.leases_key, self.attempts_key, self.dead_key],
+            args=[token, self.max_attempts],
+        )
+        if result == 2:
+            logger.error(
+                f"[{self.site}] Abandon de {json.loads(token)['job_url']}: {error}"
+            )
+
+    def counts(self):
+        """Nombre d'offres en file, en cours de traitement et abandonnées."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.llen(self.queue_key)
+        pipe.zcard(self.leases_key)
+        pipe.llen(self.dead_key)
+        queued, leased, dead = pipe.execute()
+        return {"queued": queued, "leased": leased, "dead": dead}
+
+    def dead_letters(self):
+        """Les offres abandonnées après `max_attempts` essais."""
+        return [json.loads(token) for token in self.client.lrange(self.dead_key, 0, -1)]
+
+
+def frontier_enabled():
+    """La frontière est utilisée si FRONTIER_REDIS_URL est défini et Redis installé."""
+    return bool(os.getenv("FRONTIER_REDIS_URL")) and redis is not None
+
+
+_client = None
+
+
+def get_frontier(site):
+    """Retourne la frontière d'un site, None si elle n'est pas configurée."""
+    global _client
+    if not frontier_enabled():
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(os.getenv("FRONTIER_REDIS_URL"))
+    return Frontier(_client, site)
+
+
+def frontier_workers(default=4):
+    """Nombre de tâches Celery lancées pour vider la frontière d'un site (FRONTIER_WORKERS)."""
+    return max(1, int(os.getenv("FRONTIER_WORKERS", default)))
+
+
+def drain(frontier, fetch_one, filename, after_save=None, pool=None, poll=5.0):
+    """Traite les offres de la frontière jusqu'à ce qu'elle soit vide.
+
+    Chaque lot est sauvegardé (save_json) avant d'être retiré de la frontière: un worker
+    arrêté entre les deux laisse expirer son bail, le lot est retraité et les doublons
+    écartés à la sauvegarde. Tant que d'autres workers ont des offres en cours, on attend,
+    leurs baux pouvant expirer.
+
+    fetch_one: fonction (driver, offre) -> offre complète, ou None pour l'ignorer
+
+    filename: le fichier de sortie du site, ex: "offres_emploi_bayt.json"
+
+    after_save: fonction appelée avec les offres de chaque lot sauvegardé
+    """
+    pool = pool or get_driver_pool()
+    history = get_seen_store(filename)
+    saved = 0
+    with pool.driver() as driver:
+        while True:
+            leases = frontier.lease()
+            if not leases:
+                if frontier.counts()["leased"] == 0:
+                    break
+                time.sleep(poll)
+                continue
+            offers, done = [], []
+            for token, offer in leases:
+                try:
+                    offer = fetch_one(driver, offer)
+                except Exception as e:
+                    logger.exception(
+                        f"[{frontier.site}] Échec des détails {offer['job_url']}: {e}"
+                    )
+                    frontier.fail(token, e)
+                    continue
+                if offer:
+                    offers.append(offer)
+                done.append(token)
+            # Un lot retraité après l'expiration d'un bail peut avoir déjà été sauvegardé
+            offers = [offer for offer in offers if offer["job_url"] not in history]
+            save_json(offers, filename)
+            if after_save is not None:
+                after_save(offers)
+            frontier.complete(done)
+            saved += len(offers)
+    logger.info(f"[{frontier.site}] {saved} offres extraites par ce worker")
+    return saved
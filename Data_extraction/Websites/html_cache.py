@@ -0,0 +1,144 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from data_extraction.Websites import output_file, setup_logger
+
+logger = setup_logger("html_cache.log")
+
+HTML_CACHE_DIRECTORY = os.path.join("scraping_output", "html_cache")
+
+
+def cache_enabled():
+    """Le cache HTML est optionnel (HTML_CACHE=1), il grossit à chaque crawl."""
+    return os.getenv("HTML_CACHE", "0") == "1"
+
+
+class HtmlCache:
+    """Cache des pages HTML récupérées, compressées et adressées par leur contenu.
+
+    Chaque contenu distinct est stocké une seule fois (objects/ab/<sha256>.html.gz);
+    l'index SQLite associe chaque récupération (URL, date) au contenu, avec le domaine
+    et le type de page ("listing" ou "detail") pour le re-parsing hors ligne.
+
+    directory: le dossier du cache, scraping_output/html_cache par défaut
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.dirname(
+            output_file("index.sqlite", HTML_CACHE_DIRECTORY)
+        )
+        os.makedirs(os.path.join(self.directory, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite"),
+            timeout=30,
+            check_same_thread=False,
+        )
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT NOT NULL, fetched_at REAL NOT NULL, host TEXT NOT NULL, "
+                "kind TEXT NOT NULL, digest TEXT NOT NULL, "
+                "PRIMARY KEY (url, fetched_at))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS pages_host_kind ON pages (host, kind)"
+            )
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.html.gz")
+
+    def put(self, url, html, kind="listing", fetched_at=None):
+        """Ajoute une récupération de `url` au cache, retourne l'empreinte du contenu."""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, fetched_at, host, kind, digest) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    url,
+                    fetched_at or time.time(),
+                    urlparse(url).hostname or "",
+                    kind,
+                    digest,
+                ),
+            )
+        return digest
+
+    def read(self, digest):
+        with gzip.open(self._object_path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def pages(self, host=None, kind=None, since=None, latest=True):
+        """Les récupérations indexées (url, fetched_at, kind, digest), dans l'ordre de récupération.
+
+        host: ne garder qu'un domaine, ex: "www.rekrute.com"
+
+        kind: ne garder que les pages "listing" ou "detail"
+
+        since: ne garder que les récupérations postérieures à ce timestamp
+
+        latest: ne garder que la dernière récupération de chaque URL
+        """
+        conditions, params = [], []
+        for column, value in (("host", host), ("kind", kind)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            conditions.append("fetched_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        if latest:
+            query = (
+                "SELECT url, MAX(fetched_at), kind, digest FROM pages "
+                f"{where} GROUP BY url ORDER BY MAX(fetched_at)"
+            )
+        else:
+            query = (
+                f"SELECT url, fetched_at, kind, digest FROM pages {where} "
+                "ORDER BY fetched_at"
+            )
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def iter_html(self, **filters):
+        """Parcourt les pages du cache: (url, fetched_at, kind, html), voir `pages`."""
+        for url, fetched_at, kind, digest in self.pages(**filters):
+            yield url, fetched_at, kind, self.read(digest)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_html_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HtmlCache()
+        return _cache
+
+
+def cache_page(url, html, kind="listing"):
+    """Enregistre une page récupérée si le cache est activé, sans jamais faire échouer le crawl."""
+    if not cache_enabled() or not html:
+        return
+    try:
+        get_html_cache().put(url, html, kind)
+    except Exception as e:
+        logger.warning(f"Impossible de mettre en cache {url}: {e}")
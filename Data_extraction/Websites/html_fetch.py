@@ -0,0 +1,236 @@
+import os
+import threading
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+from requests.adapters import HTTPAdapter
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from urllib3.util.retry import Retry
+
+from data_extraction.Websites import setup_logger
+from data_extraction.Websites.driver_pool import get_driver_pool
+from data_extraction.Websites.html_cache import cache_page
+from data_extraction.Websites.rate_limit import (
+    THROTTLED_STATUS,
+    retry_after_seconds,
+    throttle,
+)
+
+logger = setup_logger("html_fetch.log")
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
+}
+
+_local = threading.local()
+
+
+def fetch_mode(default="selenium"):
+    """Mode de récupération des pages de listing: "selenium" (défaut) ou "http"."""
+    return os.getenv("SCRAPER_FETCH_MODE", default).lower()
+
+
+def get_session():
+    """Retourne la session HTTP du thread courant (connexions keep-alive réutilisées)."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        # 429 et 503 ne sont pas réessayés ici, même avec un Retry-After: le limiteur
+        # du domaine s'en charge
+        retries = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=(500, 502, 504),
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        _local.session = session
+    return session
+
+
+def fetch_html(url, timeout=20):
+    """Télécharge le HTML brut d'une page, retourne None en cas d'échec.
+
+    La requête passe par le limiteur du domaine, qui ralentit sur un 429, un 503 ou un
+    dépassement de délai; les autres échecs (404, erreur serveur, connexion refusée) ne
+    changent pas sa limite.
+    """
+    try:
+        with throttle(url, timeout_errors=(requests.Timeout,)) as request:
+            try:
+                response = get_session().get(url, timeout=timeout)
+            except requests.Timeout:
+                raise
+            except requests.RequestException:
+                request.ignored()
+                raise
+            if response.status_code in THROTTLED_STATUS:
+                request.throttled(retry_after_seconds(response))
+            elif response.status_code >= 400:
+                request.ignored()
+            else:
+                return response.text
+        logger.warning(f"Échec de la requête HTTP pour {url}: {response.status_code}")
+        return None
+    except requests.RequestException as e:
+        logger.warning(f"Échec de la requête HTTP pour {url}: {e}")
+        return None
+
+
+def parse_html(html):
+    return BeautifulSoup(html, "lxml")
+
+
+def page_snapshot(driver, kind="listing"):
+    """Récupère le HTML courant du driver en un seul appel et le parse localement.
+
+    Remplace les dizaines d'appels `find_element`/`.text` (un aller-retour HTTP vers
+    chromedriver chacun) par une seule requête `page_source`. Le HTML est ajouté au
+    cache (HTML_CACHE=1) pour pouvoir le re-parser hors ligne.
+
+    kind: le type de page pour le cache, "listing" ou "detail"
+    """
+    html = driver.page_source
+    cache_page(driver.current_url, html, kind)
+    return parse_html(html)
+
+
+def element_text(element):
+    """Équivalent de `WebElement.text` pour un noeud BeautifulSoup (espaces normalisés)."""
+    if element is None:
+        return ""
+    return " ".join(element.get_text(" ").split())
+
+
+# Balises qui commencent une nouvelle ligne dans le texte rendu par le navigateur
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "br",
+    "dd",
+    "div",
+    "dl",
+    "dt",
+    "footer",
+    "form",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "header",
+    "hr",
+    "li",
+    "main",
+    "nav",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "table",
+    "td",
+    "th",
+    "tr",
+    "ul",
+}
+
+
+def block_text(element):
+    """Équivalent de `WebElement.text` multiligne: un retour à la ligne par bloc HTML.
+
+    Les espaces sont normalisés dans chaque ligne et les lignes vides supprimées,
+    comme dans le texte rendu par le navigateur.
+    """
+    if element is None:
+        return ""
+    parts = []
+
+    def walk(node):
+        for child in node.children:
+            if isinstance(child, Tag):
+                block = child.name in BLOCK_TAGS
+                if block:
+                    parts.append("\n")
+                walk(child)
+                if block:
+                    parts.append("\n")
+            elif isinstance(child, NavigableString) and not isinstance(child, Comment):
+                parts.append(str(child))
+
+    walk(element)
+    lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def absolute_url(base_url, href):
+    """Selenium résout les attributs href en URL absolues, on fait de même ici."""
+    return urljoin(base_url, href) if href else href
+
+
+class PageFetcher:
+    """Récupère les pages en HTTP et ne démarre un driver que si une page a besoin de JavaScript.
+
+    wait_selector: sélecteur CSS qui doit être présent dans le HTML pour que la page
+    soit considérée comme complète sans navigateur
+
+    mode: "http" pour essayer d'abord le client HTTP, "selenium" pour toujours utiliser le driver
+    """
+
+    def __init__(self, wait_selector, mode=None, pool=None):
+        self.wait_selector = wait_selector
+        self.mode = mode or fetch_mode()
+        self.pool = pool or get_driver_pool()
+        self._driver = None
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = self.pool.acquire()
+        return self._driver
+
+    def get(self, url, wait_selector=None):
+        """Retourne le HTML parsé de `url`, ou None si le sélecteur attendu est absent."""
+        wait_selector = wait_selector or self.wait_selector
+        if self.mode == "http":
+            html = fetch_html(url)
+            if html:
+                soup = parse_html(html)
+                if soup.select_one(wait_selector):
+                    cache_page(url, html)
+                    return soup
+            logger.info(f"Page rendue en JavaScript, passage à Selenium: {url}")
+        self.driver.get(url)
+        try:
+            WebDriverWait(self.driver, 15).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector))
+            )
+        except TimeoutException:
+            logger.warning(f"Sélecteur {wait_selector} absent sur {url}")
+            return None
+        return page_snapshot(self.driver)
+
+    def close(self):
+        if self._driver is not None:
+            self.pool.release(self._driver)
+            self._driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,66 @@
+import os
+
+from data_extraction.Websites import setup_logger
+
+logger = setup_logger("incremental.log")
+
+# Nombre de pages consécutives sans nouvelle offre avant d'arrêter un crawl incrémental.
+# Les listings sont triés du plus récent au plus ancien: passé ce seuil, le reste est déjà connu.
+# Surchargeable par site avec INCREMENTAL_STOP_AFTER_<SITE>, ex: INCREMENTAL_STOP_AFTER_REKRUTE=3
+INCREMENTAL_STOP_AFTER = {
+    "rekrute": 2,
+    "bayt": 2,
+    "emploi": 2,
+    "marocannonces": 3,
+}
+
+
+def is_full_crawl(full_crawl=None):
+    """Un crawl complet (backfill) parcourt toutes les pages; sinon CRAWL_MODE décide."""
+    if full_crawl is not None:
+        return full_crawl
+    return os.getenv("CRAWL_MODE", "incremental").lower() == "full"
+
+
+def limit_pages(pages, depth=None, full_crawl=None):
+    """Les `depth` premières pages d'un crawl incrémental, toutes pour un crawl complet.
+
+    depth: la profondeur choisie par le planificateur (voir recrawl), None pour ne pas limiter
+    """
+    pages = list(pages)
+    if depth and not is_full_crawl(full_crawl):
+        return pages[:depth]
+    return pages
+
+
+def stop_threshold(site):
+    default = INCREMENTAL_STOP_AFTER.get(site, 2)
+    return int(os.getenv(f"INCREMENTAL_STOP_AFTER_{site.upper()}", default))
+
+
+class IncrementalStop:
+    """Décide quand arrêter la pagination d'un crawl incrémental.
+
+    site: le nom du site, pour choisir le seuil
+
+    full_crawl: si vrai, la pagination n'est jamais interrompue
+    """
+
+    def __init__(self, site, full_crawl=None):
+        self.site = site
+        self.full_crawl = is_full_crawl(full_crawl)
+        self.threshold = stop_threshold(site)
+        self.known_pages = 0
+
+    def page_done(self, new_offers):
+        """Enregistre le nombre de nouvelles offres d'une page, retourne True s'il faut s'arrêter."""
+        if new_offers:
+            self.known_pages = 0
+            return False
+        self.known_pages += 1
+        if self.full_crawl or self.known_pages < self.threshold:
+            return False
+        logger.info(
+            f"[{self.site}] {self.known_pages} pages consécutives déjà connues, arrêt du crawl incrémental"
+        )
+        return True
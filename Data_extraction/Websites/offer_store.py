@@ -0,0 +1,223 @@
+import argparse
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+from data_extraction.Websites import output_file
+
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class OfferStore:
+    """Stockage des offres en segments JSONL, en ajout seul.
+
+    Chaque source a son dossier dans scraping_output (ex: scraping_output/offres_emploi_rekrute/)
+    contenant des segments numérotés 000001.jsonl, 000002.jsonl, ... Une sauvegarde
+    n'écrit que les nouvelles offres à la fin du segment actif, sous un verrou fichier
+    partagé entre processus. Quand le segment actif dépasse `max_segment_bytes`, un
+    nouveau segment est créé; la compaction fusionne ensuite les segments scellés.
+    L'ancien fichier JSON de la source, s'il existe, reste lu comme historique.
+
+    filename: le nom de fichier historique de la source, ex: "offres_emploi_rekrute.json"
+
+    output_directory: le dossier où toutes les sorties sont stockées
+
+    max_segment_bytes: taille au-delà de laquelle on passe à un nouveau segment (OFFER_SEGMENT_BYTES)
+    """
+
+    def __init__(
+        self, filename, output_directory="scraping_output", max_segment_bytes=None
+    ):
+        self.legacy_path = output_file(filename, output_directory)
+        self.directory = os.path.splitext(self.legacy_path)[0]
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes or int(
+            os.getenv("OFFER_SEGMENT_BYTES", 8 * 1024 * 1024)
+        )
+        self._lock_path = os.path.join(self.directory, ".lock")
+        self._readers_path = os.path.join(self.directory, ".readers")
+
+    @contextmanager
+    def _locked(self, path=None, operation=fcntl.LOCK_EX):
+        with open(path or self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reading(self):
+        """Verrou partagé des lecteurs: la compaction ne remplace ni ne supprime de
+        segment tant qu'un parcours est en cours.
+        """
+        return self._locked(self._readers_path, fcntl.LOCK_SH)
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{number:06d}{SEGMENT_SUFFIX}")
+
+    def segments(self):
+        """Les segments existants, du plus ancien au plus récent."""
+        names = sorted(
+            name
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[: -len(SEGMENT_SUFFIX)].isdigit()
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _segment_number(self, path):
+        return int(os.path.basename(path)[: -len(SEGMENT_SUFFIX)])
+
+    def _rotate(self):
+        """Crée le segment suivant de façon atomique (doit être appelé sous verrou)."""
+        segments = self.segments()
+        number = self._segment_number(segments[-1]) + 1 if segments else 1
+        path = self._segment_path(number)
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+        return path
+
+    def _active_segment(self):
+        segments = self.segments()
+        if not segments or os.path.getsize(segments[-1]) >= self.max_segment_bytes:
+            return self._rotate()
+        return segments[-1]
+
+    def _truncate_partial_line(self, path):
+        """Retire la dernière ligne d'un segment si elle n'est pas terminée (doit être
+        appelé sous verrou: c'est alors l'écriture d'un processus mort ou d'un disque plein,
+        sur laquelle la sauvegarde suivante serait collée).
+        """
+        with open(path, "rb+") as segment:
+            end = segment.seek(0, os.SEEK_END)
+            if not end:
+                return
+            segment.seek(end - 1)
+            if segment.read(1) == b"\n":
+                return
+            size = end
+            while end > 0:
+                start = max(0, end - 65536)
+                segment.seek(start)
+                newline = segment.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    end = start + newline + 1
+                    break
+                end = start
+            segment.truncate(end)
+        logging.warning(
+            f"{path}: ligne incomplète de {size - end} octets retirée avant l'ajout"
+        )
+
+    def append(self, offers):
+        """Ajoute les offres à la fin du segment actif, en un seul write."""
+        if not offers:
+            return 0
+        payload = "".join(
+            json.dumps(offer, ensure_ascii=False) + "\n" for offer in offers
+        )
+        with self._locked():
+            path = self._active_segment()
+            self._truncate_partial_line(path)
+            with open(path, "a", encoding="utf-8") as segment:
+                segment.write(payload)
+                segment.flush()
+                os.fsync(segment.fileno())
+        return len(offers)
+
+    def _iter_segment(self, path):
+        with open(path, "r", encoding="utf-8") as segment:
+            for line in segment:
+                # Une ligne sans retour à la ligne est une écriture en cours
+                if not line.endswith("\n") or not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Ligne abîmée par une écriture interrompue avant la réparation
+                    logging.warning(f"{path}: ligne illisible ignorée")
+
+    def iter_offers(self):
+        """Parcourt l'historique JSON puis tous les segments, sans tout charger."""
+        if os.path.exists(self.legacy_path):
+            with open(self.legacy_path, "r", encoding="utf-8") as legacy:
+                yield from json.load(legacy)
+        with self._reading():
+            for path in self.segments():
+                yield from self._iter_segment(path)
+
+    def compact(self, dedupe_key="job_url"):
+        """Fusionne les segments scellés en un seul, en supprimant les doublons.
+
+        Le segment actif est d'abord scellé (les écritures suivantes partent dans un
+        nouveau segment), la fusion se fait ensuite sans bloquer les écrivains. Les
+        segments fusionnés ne sont remplacés qu'une fois les parcours en cours terminés.
+        """
+        with self._locked():
+            sealed = self.segments()
+            if len(sealed) < 2:
+                return 0
+            self._rotate()
+
+        seen = set()
+        written = 0
+        target = sealed[0]
+        tmp_path = target + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as merged:
+            for path in sealed:
+                for offer in self._iter_segment(path):
+                    key = offer.get(dedupe_key) if dedupe_key else None
+                    if key:
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    merged.write(json.dumps(offer, ensure_ascii=False) + "\n")
+                    written += 1
+            merged.flush()
+            os.fsync(merged.fileno())
+
+        with self._locked(), self._locked(self._readers_path):
+            os.replace(tmp_path, target)
+            for path in sealed[1:]:
+                os.remove(path)
+        logging.info(
+            f"Compaction de {len(sealed)} segments en {os.path.basename(target)}: {written} offres"
+        )
+        return written
+
+    def export_json(self, path=None):
+        """Écrit toutes les offres dans un fichier JSON (tableau), offre par offre."""
+        path = path or self.directory + ".export.json"
+        with open(path, "w", encoding="utf-8") as js_file:
+            js_file.write("[")
+            for index, offer in enumerate(self.iter_offers()):
+                js_file.write(",\n" if index else "\n")
+                js_file.write(json.dumps(offer, ensure_ascii=False))
+            js_file.write("\n]\n")
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Maintenance hors ligne des segments JSONL des offres."
+    )
+    parser.add_argument("command", choices=["compact", "export"])
+    parser.add_argument(
+        "filenames",
+        nargs="+",
+        help="Fichiers historiques des sources, ex: offres_emploi_rekrute.json",
+    )
+    parser.add_argument("--output", help="Fichier de sortie pour l'export")
+    args = parser.parse_args()
+
+    for filename in args.filenames:
+        store = OfferStore(filename)
+        if args.command == "compact":
+            store.compact()
+        else:
+            print(store.export_json(args.output))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
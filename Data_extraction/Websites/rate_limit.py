@@ -0,0 +1,324 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from data_extraction.Websites import setup_logger
+
+try:
+    import redis
+except ImportError:  # Redis est optionnel, l'état reste alors local au processus
+    redis = None
+
+logger = setup_logger("rate_limit.log")
+
+OK, SLOW, THROTTLED, TIMEOUT, ERROR = "ok", "slow", "throttled", "timeout", "error"
+# Échec qui ne dit rien de la charge du site (404, erreur serveur): limite inchangée
+IGNORED = "ignored"
+
+# Réglages par domaine, les autres domaines utilisent "default"
+# start: concurrence de départ, max_concurrency: plafond, min_delay: délai minimal entre
+# deux requêtes (s), target_latency: au-delà, la concurrence n'augmente plus (s)
+RATE_LIMITS = {
+    "default": {
+        "start": 2,
+        "max_concurrency": 6,
+        "min_delay": 0.2,
+        "target_latency": 8.0,
+    },
+    "www.bayt.com": {
+        "start": 2,
+        "max_concurrency": 4,
+        "min_delay": 0.5,
+        "target_latency": 10.0,
+    },
+    "www.marocannonces.com": {
+        "start": 1,
+        "max_concurrency": 3,
+        "min_delay": 0.5,
+        "target_latency": 8.0,
+    },
+}
+
+MAX_DELAY = 60.0
+# Une requête non rendue (processus tué) libère sa place partagée après ce délai
+LEASE_SECONDS = 120
+SYNC_INTERVAL = 1.0
+
+# Réserve une place dans l'ensemble des requêtes en cours du domaine, si la limite le permet
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+# Page de CAPTCHA ou de blocage servie à la place du contenu
+_BLOCKED_PAGE_SCRIPT = """
+const title = (document.title || '').toLowerCase();
+if (/captcha|access denied|too many requests|attention required|just a moment/.test(title)) {
+    return true;
+}
+return !!document.querySelector('#challenge-form, #cf-challenge-running');
+"""
+
+THROTTLED_STATUS = (429, 503)
+
+
+def domain_settings(host):
+    settings = dict(RATE_LIMITS["default"])
+    settings.update(RATE_LIMITS.get(host, {}))
+    prefix = f"RATE_LIMIT_{(host or 'default').upper().replace('.', '_')}"
+    for key in settings:
+        # ex: RATE_LIMIT_WWW_BAYT_COM_MAX_CONCURRENCY=2
+        value = os.getenv(f"{prefix}_{key.upper()}")
+        if value is not None:
+            settings[key] = float(value)
+    return settings
+
+
+class SharedState:
+    """État d'un domaine partagé entre les workers par Redis.
+
+    Les requêtes en cours sont des baux dans un ensemble trié (expirés après
+    LEASE_SECONDS), la limite, le délai et la fin de pause sont dans un hash.
+    """
+
+    def __init__(self, client, host):
+        self.client = client
+        self.key = f"ratelimit:{host}"
+        self.inflight_key = f"ratelimit:{host}:inflight"
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+
+    def try_acquire(self, token, limit):
+        now = time.time()
+        return bool(
+            self._acquire(
+                keys=[self.inflight_key],
+                args=[now, limit, now + LEASE_SECONDS, token],
+            )
+        )
+
+    def release(self, token):
+        self.client.zrem(self.inflight_key, token)
+
+    def read(self):
+        values = self.client.hgetall(self.key)
+        return {key.decode(): float(value) for key, value in values.items()}
+
+    def publish(self, limit, delay, backoff_until):
+        self.client.hset(
+            self.key,
+            mapping={"limit": limit, "delay": delay, "backoff_until": backoff_until},
+        )
+
+
+class DomainLimiter:
+    """Limite adaptative (AIMD) de la concurrence et du rythme des requêtes vers un domaine.
+
+    Chaque réponse rapide augmente la concurrence autorisée d'environ une requête par
+    aller-retour et réduit le délai entre requêtes; un 429, un CAPTCHA, une erreur ou un
+    dépassement de délai divise la concurrence par deux, double le délai et met le
+    domaine en pause. Le limiteur est partagé par tous les scrapers du processus
+    (get_limiter) et, si RATE_LIMIT_REDIS_URL est défini, entre les workers.
+
+    host: le domaine, ex: "www.bayt.com"
+
+    shared: l'état partagé par Redis, None pour un état local au processus
+    """
+
+    def __init__(self, host, shared=None):
+        self.host = host
+        settings = domain_settings(host)
+        self.max_concurrency = max(1.0, settings["max_concurrency"])
+        self.min_delay = settings["min_delay"]
+        self.target_latency = settings["target_latency"]
+        self.limit = min(max(1.0, settings["start"]), self.max_concurrency)
+        self.delay = self.min_delay
+        self.in_flight = 0
+        self.backoff_until = 0.0
+        self.shared = shared
+        self._next_start = 0.0
+        self._last_decrease = 0.0
+        self._last_sync = 0.0
+        self._condition = threading.Condition()
+
+    def _sync(self, now):
+        """Adopte la limite du domaine publiée par les autres workers."""
+        if self.shared is None or now - self._last_sync < SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        try:
+            state = self.shared.read()
+        except Exception as e:
+            logger.warning(f"[{self.host}] état partagé indisponible: {e}")
+            return
+        if state:
+            self.limit = min(state.get("limit", self.limit), self.max_concurrency)
+            self.delay = max(state.get("delay", self.delay), self.min_delay)
+            self.backoff_until = max(self.backoff_until, state.get("backoff_until", 0))
+
+    def _shared_slot(self, token):
+        if self.shared is None:
+            return True
+        try:
+            return self.shared.try_acquire(token, int(self.limit))
+        except Exception as e:
+            logger.warning(f"[{self.host}] réservation partagée impossible: {e}")
+            return True
+
+    def acquire(self, timeout=None):
+        """Attend une place libre et le délai entre requêtes, retourne le jeton de la requête."""
+        token = uuid.uuid4().hex
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.time()
+                self._sync(now)
+                wait = max(self._next_start - now, self.backoff_until - now, 0)
+                if (
+                    wait == 0
+                    and self.in_flight < int(self.limit)
+                    and self._shared_slot(token)
+                ):
+                    self.in_flight += 1
+                    self._next_start = now + self.delay
+                    return token
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Pas de place libre pour {self.host}")
+                # Les places partagées se libèrent dans d'autres processus: on réessaie
+                self._condition.wait(min(wait or SYNC_INTERVAL, SYNC_INTERVAL))
+
+    def release(self, token, latency, outcome=OK, retry_after=None):
+        """Rend la place de la requête et adapte la limite selon son résultat.
+
+        latency: la durée de la requête en secondes
+
+        outcome: OK, SLOW, THROTTLED (429, CAPTCHA), TIMEOUT, ERROR ou IGNORED
+
+        retry_after: la pause demandée par le site (en-tête Retry-After), en secondes
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.time()
+            if outcome == OK and latency > self.target_latency:
+                outcome = SLOW
+            if outcome == OK:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.delay = max(self.min_delay, self.delay * 0.9)
+            elif outcome not in (SLOW, IGNORED) and now - self._last_decrease > max(
+                latency, 1.0
+            ):
+                # Une seule réduction par aller-retour, même si plusieurs requêtes échouent
+                self._last_decrease = now
+                self.limit = max(1.0, self.limit / 2)
+                self.delay = min(MAX_DELAY, max(self.delay * 2, self.min_delay, 1.0))
+                self.backoff_until = now + max(retry_after or 0, self.delay)
+                logger.warning(
+                    f"[{self.host}] {outcome}: concurrence {self.limit:.1f}, "
+                    f"délai {self.delay:.1f}s, pause {self.backoff_until - now:.0f}s"
+                )
+            if self.shared is not None:
+                try:
+                    self.shared.release(token)
+                    self.shared.publish(self.limit, self.delay, self.backoff_until)
+                except Exception as e:
+                    logger.warning(f"[{self.host}] publication impossible: {e}")
+            self._condition.notify_all()
+
+
+class Request:
+    """Résultat d'une requête suivie par throttle(), à signaler si le site nous freine."""
+
+    def __init__(self):
+        self.outcome = None
+        self.retry_after = None
+
+    def throttled(self, retry_after=None):
+        """À appeler sur un 429, une page CAPTCHA ou une page de blocage."""
+        self.outcome = THROTTLED
+        self.retry_after = retry_after
+
+    def ignored(self):
+        """À appeler sur un échec qui n'est pas un freinage du site (404, erreur 500)."""
+        self.outcome = IGNORED
+
+
+def page_blocked(driver):
+    """Vrai si le driver affiche une page de CAPTCHA ou de blocage."""
+    try:
+        return bool(driver.execute_script(_BLOCKED_PAGE_SCRIPT))
+    except Exception:
+        return False
+
+
+def retry_after_seconds(response):
+    """Pause demandée par l'en-tête Retry-After d'une réponse HTTP, en secondes."""
+    value = response.headers.get("Retry-After")
+    return float(value) if value and value.isdigit() else None
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+_redis_client = None
+
+
+def _shared_client():
+    global _redis_client
+    url = os.getenv("RATE_LIMIT_REDIS_URL")
+    if not url or redis is None:
+        return None
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(url)
+    return _redis_client
+
+
+def rate_limit_enabled():
+    return os.getenv("RATE_LIMIT", "1") == "1"
+
+
+def get_limiter(url):
+    """Retourne le limiteur du domaine de `url`, partagé par tout le processus."""
+    host = urlparse(url).hostname or url
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            client = _shared_client()
+            shared = SharedState(client, host) if client is not None else None
+            limiter = _limiters[host] = DomainLimiter(host, shared)
+        return limiter
+
+
+@contextmanager
+def throttle(url, timeout_errors=(TimeoutError,)):
+    """Encadre une requête vers `url`: attend une place puis rend compte de son résultat.
+
+    Une exception levée dans le bloc compte comme un dépassement de délai si elle est
+    d'un type de `timeout_errors`, sinon comme une erreur; elle est ensuite relancée.
+    """
+    if not rate_limit_enabled() or not urlparse(url).hostname:
+        yield Request()
+        return
+    limiter = get_limiter(url)
+    token = limiter.acquire()
+    request = Request()
+    start = time.perf_counter()
+    try:
+        yield request
+    except timeout_errors:
+        request.outcome = request.outcome or TIMEOUT
+        raise
+    except Exception:
+        request.outcome = request.outcome or ERROR
+        raise
+    finally:
+        limiter.release(
+            token,
+            time.perf_counter() - start,
+            request.outcome or OK,
+            request.retry_after,
+        )
@@ -0,0 +1,198 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from data_extraction.Websites import output_file, setup_logger
+
+logger = setup_logger("recrawl.log")
+
+DEFAULT_DB = "crawl_stats.sqlite"
+
+# Nombre approximatif d'offres par page de résultats, pour passer d'un nombre d'offres
+# attendues à une profondeur de crawl (en pages)
+OFFERS_PER_PAGE = {
+    "rekrute": 20,
+    "bayt": 20,
+    "emploi": 25,
+    "marocannonces": 30,
+}
+
+
+def recrawl_settings():
+    """Réglages du planificateur, à partir des variables d'environnement.
+
+    target_offers: nombre de nouvelles offres visé par crawl (RECRAWL_TARGET_OFFERS)
+
+    min_hours / max_hours / default_hours: bornes de l'intervalle entre deux crawls d'un
+    mot-clé, et intervalle tant que son débit n'est pas connu
+
+    max_depth: nombre maximal de pages d'un crawl incrémental planifié
+
+    alpha: poids du dernier crawl dans la moyenne mobile du débit (0 < alpha <= 1)
+    """
+    return {
+        "target_offers": float(os.getenv("RECRAWL_TARGET_OFFERS", 10)),
+        "min_hours": float(os.getenv("RECRAWL_MIN_HOURS", 2)),
+        "max_hours": float(os.getenv("RECRAWL_MAX_HOURS", 7 * 24)),
+        "default_hours": float(os.getenv("RECRAWL_DEFAULT_HOURS", 24)),
+        "max_depth": int(os.getenv("RECRAWL_MAX_DEPTH", 20)),
+        "alpha": float(os.getenv("RECRAWL_ALPHA", 0.3)),
+    }
+
+
+def plan(site, rate, settings=None):
+    """Intervalle (en heures) et profondeur (en pages) du prochain crawl d'un mot-clé.
+
+    L'intervalle est le temps nécessaire pour voir apparaître `target_offers` nouvelles
+    offres au débit observé; la profondeur couvre ces offres avec une page de marge.
+    Un site actif est donc crawlé souvent et peu profondément, un site calme rarement.
+
+    rate: débit moyen de nouvelles offres par heure, None s'il n'est pas encore connu
+    """
+    settings = settings or recrawl_settings()
+    if rate is None:
+        return settings["default_hours"], None
+    if rate <= 0:
+        interval = settings["max_hours"]
+    else:
+        interval = settings["target_offers"] / rate
+    interval = min(max(interval, settings["min_hours"]), settings["max_hours"])
+    expected = rate * interval
+    depth = math.ceil(expected / OFFERS_PER_PAGE.get(site, 20)) + 1
+    return interval, min(max(depth, 1), settings["max_depth"])
+
+
+class CrawlStats:
+    """Historique des crawls incrémentaux et planning du prochain crawl, par site et mot-clé.
+
+    Stocké dans scraping_output/crawl_stats.sqlite, partagé par tous les workers.
+
+    path: chemin du fichier SQLite
+    """
+
+    def __init__(self, path=None, settings=None):
+        self.path = path or output_file(DEFAULT_DB)
+        self.settings = settings or recrawl_settings()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS schedule ("
+                "site TEXT NOT NULL, keyword TEXT NOT NULL, rate REAL, last_run REAL, "
+                "next_run REAL NOT NULL, depth INTEGER, "
+                "PRIMARY KEY (site, keyword))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "site TEXT NOT NULL, keyword TEXT NOT NULL, finished REAL NOT NULL, "
+                "new_offers INTEGER NOT NULL, depth INTEGER)"
+            )
+
+    def _row(self, site, keyword):
+        return self._conn.execute(
+            "SELECT rate, last_run, next_run, depth FROM schedule "
+            "WHERE site = ? AND keyword = ?",
+            (site, keyword),
+        ).fetchone()
+
+    def record(self, site, keyword, new_offers, depth=None, finished=None):
+        """Enregistre le résultat d'un crawl et planifie le suivant.
+
+        new_offers: nombre de nouvelles offres trouvées pour ce mot-clé
+
+        depth: la profondeur imposée à ce crawl, None s'il n'était pas limité
+        """
+        finished = finished or time.time()
+        with self._lock, self._conn:
+            row = self._row(site, keyword)
+            rate, last_run = (row[0], row[1]) if row else (None, None)
+            if last_run:
+                hours = max((finished - last_run) / 3600, self.settings["min_hours"])
+                observed = new_offers / hours
+                # Toutes les pages autorisées étaient nouvelles: le débit réel est plus
+                # élevé que celui observé, on le surestime pour crawler plus tôt et plus loin
+                if depth and new_offers >= depth * OFFERS_PER_PAGE.get(site, 20):
+                    observed *= 2
+                alpha = self.settings["alpha"]
+                rate = (
+                    observed if rate is None else alpha * observed + (1 - alpha) * rate
+                )
+            interval, next_depth = plan(site, rate, self.settings)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO schedule "
+                "(site, keyword, rate, last_run, next_run, depth) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (site, keyword, rate, finished, finished + interval * 3600, next_depth),
+            )
+            self._conn.execute(
+                "INSERT INTO runs (site, keyword, finished, new_offers, depth) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (site, keyword, finished, new_offers, depth),
+            )
+        logger.info(
+            f"[{site}] {keyword}: {new_offers} nouvelles offres, prochain crawl dans "
+            f"{interval:.1f} h" + (f" sur {next_depth} pages" if next_depth else "")
+        )
+
+    def due(self, site, keywords, now=None):
+        """Les mots-clés du site dont le crawl est dû, avec leur profondeur: {mot-clé: pages}.
+
+        Un mot-clé jamais crawlé est dû immédiatement, sans limite de profondeur.
+        """
+        now = now or time.time()
+        due = {}
+        with self._lock:
+            for keyword in keywords:
+                row = self._row(site, keyword)
+                if row is None or row[2] <= now:
+                    due[keyword] = row[3] if row else None
+        return due
+
+    def mark_dispatched(self, site, keywords, now=None):
+        """Repousse les mots-clés lancés pour qu'ils ne soient pas relancés pendant le crawl.
+
+        Si le crawl échoue sans rien enregistrer, il redevient dû après `min_hours`.
+        """
+        next_run = (now or time.time()) + self.settings["min_hours"] * 3600
+        with self._lock, self._conn:
+            for keyword in keywords:
+                if self._row(site, keyword) is None:
+                    self._conn.execute(
+                        "INSERT INTO schedule (site, keyword, next_run) VALUES (?, ?, ?)",
+                        (site, keyword, next_run),
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE schedule SET next_run = ? WHERE site = ? AND keyword = ?",
+                        (next_run, site, keyword),
+                    )
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_crawl_stats():
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = CrawlStats()
+        return _stats
+
+
+def record_runs(site, counts, depths=None):
+    """Enregistre les nouvelles offres par mot-clé d'un crawl incrémental réussi.
+
+    counts: {mot-clé: nombre de nouvelles offres}
+
+    depths: {mot-clé: profondeur imposée}, voir CrawlStats.due
+    """
+    stats = get_crawl_stats()
+    for keyword, new_offers in counts.items():
+        try:
+            stats.record(site, keyword, new_offers, (depths or {}).get(keyword))
+        except sqlite3.Error as e:
+            logger.warning(f"[{site}] Statistiques de {keyword} non enregistrées: {e}")
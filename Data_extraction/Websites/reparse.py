@@ -0,0 +1,98 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+from urllib.parse import urlparse
+
+from data_extraction.Websites import MarocAnn, Rekrute, bayt, emploi, setup_logger
+from data_extraction.Websites.html_cache import HtmlCache
+from data_extraction.Websites.html_fetch import parse_html
+
+logger = setup_logger("reparse.log")
+
+
+def _with_url(parse):
+    def parse_detail(soup, url):
+        details = parse(soup)
+        return [{**details, "job_url": url}] if details else []
+
+    return parse_detail
+
+
+# Parseurs des pages du cache par (domaine, type de page): fonction (soup, url) -> offres
+PARSERS = {
+    ("www.rekrute.com", "listing"): lambda soup, url: Rekrute.parse_offers(
+        soup, [], url
+    ),
+    ("www.emploi.ma", "listing"): lambda soup, url: emploi.parse_cards(soup, []),
+    ("www.marocannonces.com", "listing"): MarocAnn.parse_offers,
+    ("www.marocannonces.com", "detail"): _with_url(MarocAnn.parse_details),
+    ("www.bayt.com", "detail"): _with_url(bayt.parse_job_details),
+}
+
+SITES = {
+    "rekrute": "www.rekrute.com",
+    "emploi": "www.emploi.ma",
+    "marocannonces": "www.marocannonces.com",
+    "bayt": "www.bayt.com",
+}
+
+
+def reparse(cache, host=None, kind=None, since=None, latest=True):
+    """Re-parse les pages du cache HTML sans accès réseau, retourne les offres extraites.
+
+    Utile après une correction d'un parseur: les offres sont regénérées à partir des
+    pages déjà récupérées au lieu de relancer le crawl.
+    """
+    offers = []
+    for url, fetched_at, page_kind, html in cache.iter_html(
+        host=host, kind=kind, since=since, latest=latest
+    ):
+        parse = PARSERS.get((urlparse(url).hostname, page_kind))
+        if parse is None:
+            continue
+        try:
+            offers.extend(parse(parse_html(html), url))
+        except Exception as e:
+            logger.exception(f"Échec du parsing de {url} ({fetched_at}): {e}")
+    return offers
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-parse les pages du cache HTML (HTML_CACHE=1) sans accès réseau."
+    )
+    parser.add_argument("--site", choices=sorted(SITES), help="Ne garder qu'un site")
+    parser.add_argument("--kind", choices=["listing", "detail"])
+    parser.add_argument(
+        "--since", help="Pages récupérées à partir de cette date (AAAA-MM-JJ)"
+    )
+    parser.add_argument(
+        "--all-versions",
+        action="store_true",
+        help="Re-parser toutes les récupérations, pas seulement la dernière par URL",
+    )
+    parser.add_argument("--cache", help="Dossier du cache, scraping_output/html_cache")
+    parser.add_argument("--output", help="Fichier JSONL de sortie, stdout par défaut")
+    args = parser.parse_args()
+
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    offers = reparse(
+        HtmlCache(args.cache),
+        host=SITES.get(args.site),
+        kind=args.kind,
+        since=since,
+        latest=not args.all_versions,
+    )
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for offer in offers:
+            output.write(json.dumps(offer, ensure_ascii=False) + "\n")
+    finally:
+        if args.output:
+            output.close()
+    logger.info(f"{len(offers)} offres re-parsées")
+
+
+if __name__ == "__main__":
+    main()
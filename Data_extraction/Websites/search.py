@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+from urllib.parse import quote, urlencode
+
+from data_extraction.Websites import setup_logger
+
+logger = setup_logger("search.log")
+
+DEFAULT_KEYWORDS = ("DATA",)
+
+
+def search_keywords(site=None, default=DEFAULT_KEYWORDS):
+    """Mots-clés recherchés, séparés par des virgules.
+
+    SEARCH_KEYWORDS s'applique à tous les sites, SEARCH_KEYWORDS_<SITE> à un seul site,
+    ex: SEARCH_KEYWORDS_BAYT="data,machine learning"
+    """
+    value = os.getenv(f"SEARCH_KEYWORDS_{site.upper()}") if site else None
+    value = value or os.getenv("SEARCH_KEYWORDS")
+    if not value:
+        return list(default)
+    return [keyword.strip() for keyword in value.split(",") if keyword.strip()]
+
+
+def keyword_slug(keyword):
+    """Forme d'un mot-clé utilisable dans un chemin d'URL ou un nom de fichier."""
+    return re.sub(r"[^a-z0-9]+", "-", keyword.lower()).strip("-")
+
+
+def rekrute_search_url(keyword, **filters):
+    """Page de résultats Rekrute d'un mot-clé, filtres en paramètres de requête."""
+    params = {"s": 1, "p": 1, "o": 1, "query": keyword, "keyword": keyword, **filters}
+    return "https://www.rekrute.com/offres.html?" + urlencode(params)
+
+
+def bayt_search_url(keyword, country="morocco"):
+    """Page de résultats bayt d'un mot-clé, la pagination ajoute ?page=N."""
+    return f"https://www.bayt.com/en/{country}/jobs/{keyword_slug(keyword)}-jobs/"
+
+
+def emploi_search_url(keyword, facets=("im_field_offre_metiers:31",)):
+    """Page de résultats emploi.ma d'un mot-clé; facets: filtres du site, ex: le métier."""
+    params = {f"f[{index}]": facet for index, facet in enumerate(facets)}
+    url = f"https://www.emploi.ma/recherche-jobs-maroc/{quote(keyword.lower())}"
+    return f"{url}?{urlencode(params)}" if params else url
+
+
+def marocannonces_search_url(keyword, category="offres-emploi-b309"):
+    """Modèle d'URL MarocAnnonces d'un mot-clé, le numéro de page remplace {}."""
+    query = urlencode({"kw": keyword.lower()})
+    return f"https://www.marocannonces.com/maroc/{category}.html?{query}&pge={{}}"
+
+
+SEARCH_URL_BUILDERS = {
+    "rekrute": rekrute_search_url,
+    "bayt": bayt_search_url,
+    "emploi": emploi_search_url,
+    "marocannonces": marocannonces_search_url,
+}
+
+
+def search_url(site, keyword, **filters):
+    """URL de résultats d'un site pour un mot-clé, sans passer par le formulaire de recherche."""
+    return SEARCH_URL_BUILDERS[site](keyword, **filters)
+
+
+class SharedDedupe:
+    """Ensemble d'URLs partagé par les crawls d'un même site sur plusieurs mots-clés.
+
+    Le premier crawl qui réclame une URL la traite; les autres l'ignorent, de sorte
+    qu'une offre trouvée par deux mots-clés n'est extraite qu'une fois.
+    """
+
+    def __init__(self):
+        self._claimed = set()
+        self._lock = threading.Lock()
+
+    def claim(self, values):
+        """Retourne les valeurs pas encore réclamées, dans leur ordre, et les réclame."""
+        new = []
+        with self._lock:
+            for value in values:
+                if value not in self._claimed:
+                    self._claimed.add(value)
+                    new.append(value)
+        return new
+
+    def claim_offers(self, offers, key="job_url"):
+        """Filtre une liste d'offres sur les URLs pas encore réclamées."""
+        claimed = set(self.claim(offer.get(key) for offer in offers))
+        return [offer for offer in offers if offer.get(key) in claimed]
+
+
+def keyword_concurrency(default=2):
+    """Nombre de mots-clés crawlés en parallèle pour un site (KEYWORD_CONCURRENCY)."""
+    return max(1, int(os.getenv("KEYWORD_CONCURRENCY", default)))
+
+
+def crawl_keywords(site, keywords, crawl_keyword, concurrency=None, counts=None):
+    """Crawle plusieurs mots-clés en parallèle avec un dédoublonnage commun.
+
+    Les offres sont retournées dans l'ordre des mots-clés. Si un crawl échoue, les autres
+    vont jusqu'au bout avant que la première erreur ne soit relancée.
+
+    site: le nom du site, pour les logs
+
+    keywords: les mots-clés à crawler
+
+    crawl_keyword: fonction (keyword, dedupe) -> liste d'offres
+
+    counts: dictionnaire complété avec le nombre d'offres de chaque mot-clé réussi
+    """
+    keywords = list(keywords)
+    dedupe = SharedDedupe()
+    results = [[] for _ in keywords]
+    errors = []
+    pending = list(enumerate(keywords))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                index, keyword = pending.pop(0)
+            try:
+                results[index] = crawl_keyword(keyword, dedupe)
+                if counts is not None:
+                    counts[keyword] = len(results[index])
+                logger.info(f"[{site}] {keyword}: {len(results[index])} offres")
+            except Exception as e:
+                logger.exception(f"[{site}] Échec du crawl pour {keyword}: {e}")
+                errors.append(e)
+
+    concurrency = min(concurrency or keyword_concurrency(), len(keywords))
+    threads = [
+        threading.Thread(target=worker, name=f"{site}-keyword-{i}")
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return [offer for offers in results for offer in offers]
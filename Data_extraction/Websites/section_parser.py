@@ -0,0 +1,107 @@
+import re
+
+
+class ParsedText:
+    """Résultat de SectionSpec.parse.
+
+    lines: les lignes non vides du texte, sans espaces autour
+
+    fields: {champ: valeur} des lignes "Libellé : valeur", la première occurrence l'emporte
+
+    sections: {section: [lignes]}, dans l'ordre du texte
+    """
+
+    def __init__(self, lines, fields, sections):
+        self.lines = lines
+        self.fields = fields
+        self.sections = sections
+
+    def text(self, section):
+        """Le contenu d'une section en une chaîne, "" si elle est absente."""
+        return "\n".join(self.sections.get(section, []))
+
+
+class SectionSpec:
+    """Description déclarative du texte d'une offre, compilée une fois en un seul motif.
+
+    Le texte est parcouru une seule fois, ligne par ligne: une ligne de titre ouvre une
+    section, une ligne "Libellé : valeur" renseigne un champ (la valeur peut aussi être
+    sur la ligne suivante), les autres lignes vont à la section en cours. Titres et
+    libellés sont des fragments d'expression régulière sans groupe capturant, reconnus
+    en début de ligne; plusieurs alias peuvent désigner la même section ou le même champ.
+
+    headers: {section: (titres, ...)}, ex: {"competences": ("skills", "required skills")}
+
+    labels: {champ: (libellés, ...)}, ex: {"ville": ("Ville",)}
+
+    preamble: la section des lignes qui précèdent le premier titre
+
+    keep_header_line: garder la ligne de titre au début du contenu de sa section
+
+    labels_end_sections: une ligne de champ ferme la section en cours
+
+    ignore_case: titres et libellés reconnus sans tenir compte de la casse
+    """
+
+    def __init__(
+        self,
+        headers=None,
+        labels=None,
+        preamble="intro",
+        keep_header_line=False,
+        labels_end_sections=False,
+        ignore_case=False,
+    ):
+        self.preamble = preamble
+        self.keep_header_line = keep_header_line
+        self.labels_end_sections = labels_end_sections
+        # Un groupe nommé par section (s0, s1, ...) et par champ (f0, f1, ...): le groupe
+        # reconnu (lastgroup) donne directement la section ou le champ de la ligne
+        self._names = {}
+        alternatives = []
+        for index, (section, titles) in enumerate((headers or {}).items()):
+            self._names[f"s{index}"] = section
+            alternatives.append(f"(?P<s{index}>{'|'.join(titles)})")
+        for index, (field, names) in enumerate((labels or {}).items()):
+            self._names[f"f{index}"] = field
+            alternatives.append(f"(?P<f{index}>(?:{'|'.join(names)})\\s*:\\s*)")
+        flags = re.IGNORECASE if ignore_case else 0
+        self._pattern = (
+            re.compile(f"^(?:{'|'.join(alternatives)})", flags)
+            if alternatives
+            else None
+        )
+
+    def parse(self, text):
+        """Découpe le texte en champs et en sections, voir ParsedText."""
+        lines = [line.strip() for line in text.split("\n") if line.strip()]
+        match = self._pattern.match if self._pattern is not None else lambda line: None
+        fields = {}
+        sections = {self.preamble: []}
+        current = sections[self.preamble]
+        pending_field = None
+        for line in lines:
+            if pending_field is not None:
+                fields.setdefault(pending_field, line)
+                pending_field = None
+                continue
+            found = match(line)
+            if found is None:
+                if current is not None:
+                    current.append(line)
+                continue
+            group = found.lastgroup
+            name = self._names[group]
+            if group[0] == "s":
+                current = sections.setdefault(name, [])
+                if self.keep_header_line:
+                    current.append(line)
+                continue
+            value = line[found.end() :]
+            if value:
+                fields.setdefault(name, value)
+            else:
+                pending_field = name
+            if self.labels_end_sections:
+                current = None
+        return ParsedText(lines, fields, sections)
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+
+from data_extraction.Websites import load_json, output_file, setup_logger
+
+logger = setup_logger("seen_store.log")
+
+DEFAULT_DB = "seen_urls.sqlite"
+
+
+class SeenStore:
+    """Index persistant (SQLite) des valeurs déjà extraites, par espace de noms.
+
+    Remplace le parcours linéaire de l'historique JSON: l'appartenance se vérifie en
+    O(1) grâce à la clé primaire (namespace, value), et les insertions se font par lot.
+    Le fichier est partagé par tous les scrapers, chacun dans son espace de noms.
+
+    namespace: l'espace de noms (une source, éventuellement suffixée par le champ indexé)
+
+    path: chemin du fichier SQLite, scraping_output/seen_urls.sqlite par défaut
+    """
+
+    def __init__(self, namespace, path=None):
+        self.namespace = namespace
+        self.path = path or output_file(DEFAULT_DB)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                "namespace TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, value)) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seeded (namespace TEXT PRIMARY KEY)"
+            )
+
+    def __contains__(self, value):
+        if not value:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM seen WHERE namespace = ? AND value = ?",
+                (self.namespace, value),
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM seen WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        return count
+
+    def add_many(self, values):
+        """Ajoute un lot de valeurs en une seule transaction, les doublons sont ignorés."""
+        rows = [(self.namespace, value) for value in values if value]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (namespace, value) VALUES (?, ?)", rows
+            )
+
+    def add(self, value):
+        self.add_many([value])
+
+    def filter_new(self, values):
+        """Retourne les valeurs absentes de l'index, dans leur ordre d'origine."""
+        return [value for value in values if value not in self]
+
+    def is_seeded(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM seeded WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        return row is not None
+
+    def seed(self, values):
+        """Importe l'historique existant une seule fois, lors de la première utilisation."""
+        self.add_many(values)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO seeded (namespace) VALUES (?)", (self.namespace,)
+            )
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_seen_store(history_file, field="job_url"):
+    """Retourne l'index des valeurs déjà vues pour un fichier d'historique.
+
+    L'espace de noms est dérivé du nom du fichier (et du champ s'il ne s'agit pas de
+    `job_url`). Au premier appel, l'index est alimenté à partir de l'historique JSON.
+
+    history_file: le fichier de sortie du scraper, ex: "offres_emploi_rekrute.json"
+
+    field: le champ des offres à indexer
+    """
+    namespace = os.path.splitext(history_file)[0]
+    if field != "job_url":
+        namespace = f"{namespace}:{field}"
+    with _stores_lock:
+        store = _stores.get(namespace)
+        if store is None:
+            store = SeenStore(namespace)
+            if not store.is_seeded():
+                history = load_json(history_file)
+                store.seed(offer.get(field) for offer in history)
+                logger.info(f"Index {namespace} initialisé avec {len(store)} valeurs")
+            _stores[namespace] = store
+    return store
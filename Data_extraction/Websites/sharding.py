@@ -0,0 +1,55 @@
+import os
+
+from data_extraction.Websites import save_json, setup_logger
+from data_extraction.Websites.seen_store import get_seen_store
+
+logger = setup_logger("sharding.log")
+
+
+def shard_size(default=10):
+    """Nombre de pages de résultats traitées par une sous-tâche (SHARD_PAGES)."""
+    return max(1, int(os.getenv("SHARD_PAGES", default)))
+
+
+def split_pages(items, size=None):
+    """Découpe une liste de pages en tranches contiguës de `size` pages, dans l'ordre."""
+    items = list(items)
+    size = size or shard_size()
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+def merge_shards(results, filename, dedupe_key="job_url"):
+    """Fusionne les offres renvoyées par les sous-tâches et les sauvegarde une seule fois.
+
+    Les doublons entre tranches (une offre remontée d'une page à l'autre pendant le crawl)
+    et les offres déjà présentes dans l'historique sont écartés.
+
+    results: la liste des résultats des sous-tâches (une liste d'offres par tranche, None en cas d'échec)
+
+    filename: le fichier de sortie du scraper, ex: "offres_emploi_rekrute.json"
+    """
+    history = get_seen_store(filename, dedupe_key)
+    seen = set()
+    merged = []
+    for offers in results:
+        for offer in offers or []:
+            key = offer.get(dedupe_key)
+            if key:
+                if key in seen:
+                    continue
+                seen.add(key)
+            merged.append(offer)
+    new_keys = set(history.filter_new(list(seen)))
+    merged = [
+        offer
+        for offer in merged
+        if not offer.get(dedupe_key) or offer[dedupe_key] in new_keys
+    ]
+    failed = sum(1 for offers in results if offers is None)
+    if failed:
+        logger.warning(f"{failed} tranches sans résultat pour {filename}")
+    save_json(merged, filename=filename)
+    logger.info(
+        f"{len(results)} tranches fusionnées pour {filename}: {len(merged)} nouvelles offres"
+    )
+    return merged
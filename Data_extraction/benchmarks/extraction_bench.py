@@ -0,0 +1,92 @@
+"""Compare le temps d'extraction d'une page Rekrute: appels WebDriver par champ vs snapshot unique.
+
+Usage: python -m data_extraction.benchmarks.extraction_bench [--url URL] [--repeat N]
+"""
+
+import argparse
+import time
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from data_extraction.Websites import Rekrute
+from data_extraction.Websites.driver_pool import get_driver_pool
+from data_extraction.Websites.html_fetch import page_snapshot
+
+
+def _span_near(holder, icon_selector):
+    try:
+        field = holder.find_element(By.CSS_SELECTOR, icon_selector)
+        parent_div = field.find_element(By.XPATH, "./ancestor::div[1]")
+        return parent_div.find_element(By.TAG_NAME, "span").text.strip()
+    except NoSuchElementException:
+        return ""
+
+
+def extract_with_rpc(driver):
+    """Ancienne approche: un aller-retour chromedriver par élément et par champ."""
+    offers = []
+    for holder in driver.find_elements(By.CSS_SELECTOR, "div.holder")[1:]:
+        info_divs = holder.find_elements(By.CSS_SELECTOR, "div.info")
+        parent_div = holder.find_element(By.XPATH, "./ancestor::div[1]")
+        titre = parent_div.find_element(By.CSS_SELECTOR, "a.titreJob")
+        offer = {
+            "job_url": titre.get_attribute("href"),
+            "titre": titre.text.strip(),
+            "competences": _span_near(holder, "i.fa.fa-search"),
+            "companie": _span_near(holder, "i.fa.fa-industry"),
+            "description": _span_near(holder, "i.fa.fa-binoculars"),
+        }
+        try:
+            date_elem = holder.find_element(By.CSS_SELECTOR, "em.date")
+            spans = date_elem.find_elements(By.TAG_NAME, "span")
+            offer["publication_date"] = spans[0].text.strip() if spans else ""
+        except NoSuchElementException:
+            offer["publication_date"] = ""
+        if len(info_divs) >= 3:
+            offer["details"] = [
+                li.text.strip() for li in info_divs[-1].find_elements(By.TAG_NAME, "li")
+            ]
+        offers.append(offer)
+    return offers
+
+
+def extract_with_snapshot(driver):
+    """Nouvelle approche: un seul `page_source`, puis parsing local."""
+    return Rekrute.parse_offers(page_snapshot(driver), [], driver.current_url)
+
+
+def timed(function, driver, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        offers = function(driver)
+        durations.append(time.perf_counter() - start)
+    return min(durations), sum(durations) / len(durations), len(offers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=Rekrute.SEARCH_URL)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with get_driver_pool().driver() as driver:
+        driver.get(args.url)
+        WebDriverWait(driver, 15).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div.holder"))
+        )
+        for name, function in (
+            ("webdriver rpc", extract_with_rpc),
+            ("page snapshot", extract_with_snapshot),
+        ):
+            best, mean, count = timed(function, driver, args.repeat)
+            print(
+                f"{name:<14} offres={count:<3} min={best * 1000:.1f} ms moyenne={mean * 1000:.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
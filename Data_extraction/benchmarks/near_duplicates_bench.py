@@ -0,0 +1,80 @@
+"""Mesure la détection des quasi-doublons (MinHash + LSH) quand le nombre d'offres croît.
+
+Les offres sont générées: une part d'entre elles est recopiée avec un titre et une
+description légèrement modifiés, comme une offre republiée sur un autre site. Le temps
+par offre doit rester à peu près constant d'une taille à l'autre.
+
+Usage: python -m data_extraction.benchmarks.near_duplicates_bench [--sizes N ...] [--repeat N]
+"""
+
+import argparse
+import random
+import time
+
+from data_extraction.Traitement.near_duplicates import (
+    find_near_duplicates,
+    near_duplicate_settings,
+)
+
+
+def synthetic_offers(count, duplicate_ratio=0.2, seed=0):
+    """Offres générées, et le nombre de copies modifiées qu'elles contiennent."""
+    generator = random.Random(seed)
+    vocabulary = [f"mot{i}" for i in range(20000)]
+    originals = count - int(count * duplicate_ratio)
+    offers = [
+        {
+            "title": f"Ingénieur données {i}",
+            "company": f"Société {i % 500}",
+            "description": " ".join(generator.choices(vocabulary, k=150)),
+            "publication_date": "2025-04-10",
+            "via": ["Rekrute"],
+        }
+        for i in range(originals)
+    ]
+    for i in range(count - originals):
+        copy = dict(offers[generator.randrange(originals)])
+        words = copy["description"].split()
+        words[generator.randrange(len(words))] = "modifié"
+        copy["description"] = " ".join(words)
+        copy["title"] = copy["title"].replace("Ingénieur", "Ingenieur")
+        copy["publication_date"] = "2025-04-12"
+        copy["via"] = ["Emplois.ma"]
+        offers.append(copy)
+    generator.shuffle(offers)
+    return offers, count - originals
+
+
+def timed(function, offers, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(offers)
+        durations.append(time.perf_counter() - start)
+    return min(durations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 80000])
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    settings = near_duplicate_settings()
+    if args.threshold is not None:
+        settings["threshold"] = args.threshold
+    for size in args.sizes:
+        offers, copies = synthetic_offers(size)
+        best, clusters = timed(
+            lambda offers: find_near_duplicates(offers, settings), offers, args.repeat
+        )
+        found = sum(len(members) - 1 for members in clusters)
+        print(
+            f"{size:>7} offres en {best:.2f} s ({best / size * 1e6:.0f} µs/offre), "
+            f"{found}/{copies} copies retrouvées"
+        )
+
+
+if __name__ == "__main__":
+    main()
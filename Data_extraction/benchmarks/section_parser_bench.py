@@ -0,0 +1,160 @@
+"""Compare l'analyse des textes d'offres: regex reconstruites à chaque champ vs SectionSpec compilé.
+
+Les textes sont ceux des pages de détail du cache HTML (HTML_CACHE=1); sans cache, ou avec
+--synthetic N, des textes générés sont utilisés.
+
+Usage: python -m data_extraction.benchmarks.section_parser_bench [--synthetic N] [--repeat N]
+"""
+
+import argparse
+import re
+import time
+
+from data_extraction.Websites import MarocAnn, bayt
+from data_extraction.Websites.html_cache import HtmlCache
+from data_extraction.Websites.html_fetch import block_text, parse_html
+
+
+def legacy_maroc_ann(text):
+    """Ancienne approche: un `re.search` sur tout le texte par champ, plus `lines.index`."""
+    details = {"via": "Maroc_annonces"}
+    lines = [line.strip() for line in text.split("\n") if line.strip()]
+    text_joined = "\n".join(lines)
+    if len(lines) >= 2:
+        details["titre"] = lines[0]
+        details["region"] = lines[1]
+    for line in lines:
+        if line.startswith("Publiée le:"):
+            details["publication_date"] = line.split("Publiée le:")[1].strip()
+
+    def extract_block(pattern):
+        match = re.search(pattern, text_joined, re.DOTALL)
+        return match.group(1).strip().split("\n") if match else []
+
+    description = re.search(r"Annonce N°:.*\n(.*?)\nMissions :", text_joined, re.DOTALL)
+    if description:
+        details["description"] = description.group(1).strip()
+    missions = extract_block(r"Missions\s*:\s*\n(.*?)\nProfil requis\s*:")
+    profil = extract_block(r"Profil requis\s*:\s*\n(.*?)(Domaine\s*:|$)")
+    details["extra"] = [
+        item.strip("- ").strip() for item in missions + profil if item.strip()
+    ]
+    for field in (
+        "Domaine",
+        "Fonction",
+        "Contrat",
+        "companie",
+        "Salaire",
+        "Niveau_etudes",
+        "Ville",
+    ):
+        match = re.search(rf"{field}\s*:\s*(.+)", text_joined)
+        if match:
+            details[field.lower()] = match.group(1).strip()
+    for label in ("Annonceur :", "Téléphone :"):
+        if label in lines and lines.index(label) + 1 < len(lines):
+            details["extra"].append(lines[lines.index(label) + 1])
+    return details
+
+
+def legacy_bayt(job_offer_details):
+    """Ancienne approche: motif des titres reconstruit et recompilé à chaque appel."""
+    header_keywords = {
+        "description": ["Job description", "job description", "description"],
+        "competences": ["Competences", "competences", "skills", "required skills"],
+    }
+    all_keywords = [kw for group in header_keywords.values() for kw in group]
+    regex_pattern = r"\n(?=({}))".format("|".join(map(re.escape, all_keywords)))
+    sections = re.split(regex_pattern, job_offer_details, flags=re.IGNORECASE)
+    parsed_sections = {"intro": sections[0].strip()}
+    for i in range(1, len(sections), 2):
+        header = sections[i].lower().strip()
+        key = next(
+            (
+                norm
+                for norm, variations in header_keywords.items()
+                if any(header.startswith(v) for v in variations)
+            ),
+            header,
+        )
+        parsed_sections[key] = (
+            sections[i + 1] if i + 1 < len(sections) else ""
+        ).strip()
+    return parsed_sections
+
+
+def synthetic_texts(count):
+    maroc_ann = (
+        "Data Engineer {i}\nCasablanca\nPubliée le: 12/10/2025\nAnnonce N°: {i}\n"
+        "Nous recrutons un ingénieur data.\nMissions :\n- Construire les pipelines\n"
+        "- Superviser les flux\nProfil requis :\n- Bac+5\n- Python, SQL\n"
+        "Domaine : Informatique\nFonction : Ingénieur\nContrat : CDI\n"
+        "Salaire : 15000\nNiveau_etudes : Bac+5\nVille : Casablanca\n"
+        "Annonceur :\nSociété {i}\nTéléphone :\n0600000000"
+    )
+    bayt_text = (
+        "Nous recherchons un profil data {i}.\nJob Description\n"
+        "Concevoir des modèles\nAnalyser les données\nSkills\nPython\nSpark\nSQL"
+    )
+    return (
+        [maroc_ann.format(i=i) for i in range(count)],
+        [bayt_text.format(i=i) for i in range(count)],
+    )
+
+
+def cached_texts():
+    """Textes des pages de détail du cache HTML, par site."""
+    texts = {"www.marocannonces.com": [], "www.bayt.com": []}
+    selectors = {
+        "www.marocannonces.com": "div.used-cars",
+        "www.bayt.com": 'div[class="t-break"]',
+    }
+    cache = HtmlCache()
+    for host, selector in selectors.items():
+        for _, _, _, html in cache.iter_html(host=host, kind="detail"):
+            text = block_text(parse_html(html).select_one(selector))
+            if text:
+                texts[host].append(text)
+    return texts["www.marocannonces.com"], texts["www.bayt.com"]
+
+
+def timed(function, texts, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            function(text)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    maroc_ann, bayt_texts = (
+        synthetic_texts(args.synthetic) if args.synthetic else cached_texts()
+    )
+    if not maroc_ann and not bayt_texts:
+        print("Cache HTML vide, utilisation de 2000 textes générés")
+        maroc_ann, bayt_texts = synthetic_texts(2000)
+
+    for name, texts, function in (
+        ("MarocAnn regex", maroc_ann, legacy_maroc_ann),
+        ("MarocAnn spec", maroc_ann, MarocAnn.parse_details_text),
+        ("bayt regex", bayt_texts, legacy_bayt),
+        ("bayt spec", bayt_texts, bayt.text_segmentation),
+    ):
+        if not texts:
+            continue
+        best = timed(function, texts, args.repeat)
+        print(
+            f"{name:<15} {len(texts)} textes en {best * 1000:.1f} ms "
+            f"({len(texts) / best:,.0f} textes/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
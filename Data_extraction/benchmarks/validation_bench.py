@@ -0,0 +1,59 @@
+"""Compare la validation par offre (schéma relu et compilé à chaque appel) au validateur compilé.
+
+Usage: python -m data_extraction.benchmarks.validation_bench [--source FICHIER] [--repeat N]
+"""
+
+import argparse
+import json
+import time
+
+from jsonschema import ValidationError, validate
+
+from data_extraction.Websites import SCHEMA_PATH, load_json, validate_many
+
+
+def legacy_validate(offers):
+    """Ancienne approche: lecture du schéma et `jsonschema.validate` pour chaque offre."""
+    errors = []
+    for offer in offers:
+        with open(SCHEMA_PATH) as f:
+            schema = json.load(f)
+        try:
+            validate(offer, schema)
+            errors.append([])
+        except ValidationError as e:
+            errors.append([e.message])
+    return errors
+
+
+def timed(function, offers, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(offers)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", default="offres_emploi_rekrute.json")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    offers = load_json(args.source)
+    # Premier appel hors mesure: compilation du validateur
+    validate_many(offers[:1])
+    for name, function in (
+        ("validate par offre", legacy_validate),
+        ("validate_many", validate_many),
+    ):
+        best = timed(function, offers, args.repeat)
+        print(
+            f"{name:<19} {len(offers)} offres en {best * 1000:.1f} ms "
+            f"({best / max(len(offers), 1) * 1e6:.1f} µs/offre)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Normalisation des dates de publication, commune aux scrapers et à la fusion des sources.
+
+Chaque forme de date (ISO, j/m/a, "10 Apr-10:20", "3 days ago", ...) est reconnue par un
+motif compilé une fois, sans essayer les formats un à un avec `strptime`. Les résultats
+sont mis en cache: une même chaîne, très fréquente dans un crawl, n'est analysée qu'une fois.
+"""
+
+import datetime
+import logging
+import re
+from functools import lru_cache
+
+ISO_FORMAT = "%Y-%m-%d"
+CACHE_SIZE = 4096
+
+MONTHS = {
+    "jan": 1,
+    "feb": 2,
+    "mar": 3,
+    "apr": 4,
+    "may": 5,
+    "jun": 6,
+    "jul": 7,
+    "aug": 8,
+    "sep": 9,
+    "oct": 10,
+    "nov": 11,
+    "dec": 12,
+}
+
+# Formes de dates reconnues, chacune par un motif appliqué à la chaîne entière
+SHAPES = {
+    # 2025-04-10, 2025/04/10, 2025-04-10T08:00:00+01:00
+    "ymd": re.compile(r"(\d{4})([/-])(\d{1,2})\2(\d{1,2})(?:[T ][\d:.+Z-]*)?"),
+    # 10/04/2025, 10-04-2025 (04/25/2025 est lu comme une date américaine)
+    "dmy": re.compile(r"(\d{1,2})([/-])(\d{1,2})\2(\d{4})"),
+    # 10 Apr-10:20, sans année
+    "day_month_time": re.compile(r"(\d{1,2}) ([a-z]{3})-\d{1,2}:\d{2}", re.IGNORECASE),
+}
+
+# Dates relatives, cherchées n'importe où dans la chaîne ("Posted 3 days ago")
+RELATIVE = re.compile(
+    r"\b(?:(?P<yesterday>yesterday|hier)"
+    r"|(?P<today>today|just now|aujourd'hui)"
+    r"|(?P<minutes>\d+)\s*(?:minutes?|mins?)\b"
+    r"|(?P<hours>\d+)\s*(?:hours?|heures?)\b"
+    r"|(?P<days>\d+)\s*\+?\s*(?:days?|jours?)\b"
+    r"|(?P<weeks>\d+)\s*\+?\s*(?:weeks?|semaines?)\b"
+    r"|(?P<months>\d+)\s*\+?\s*(?:months?|mois)\b)",
+    re.IGNORECASE,
+)
+
+RELATIVE_UNITS = {
+    "minutes": datetime.timedelta(minutes=1),
+    "hours": datetime.timedelta(hours=1),
+    "days": datetime.timedelta(days=1),
+    "weeks": datetime.timedelta(weeks=1),
+    "months": datetime.timedelta(days=30),
+}
+
+# Formes essayées en premier pour chaque source, avant les autres
+SOURCE_HINTS = {
+    "rekrute": ("dmy",),
+    "emploi": ("ymd",),
+    "marocannonces": ("day_month_time", "dmy"),
+    "bayt": ("relative",),
+}
+DEFAULT_ORDER = ("ymd", "dmy", "day_month_time", "relative")
+
+
+def _clock():
+    """L'heure courante tronquée à l'heure: les dates relatives en cache restent exactes."""
+    return datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+
+
+def _from_shape(shape, match, now):
+    if shape == "ymd":
+        year, _, month, day = match.groups()
+        return datetime.date(int(year), int(month), int(day))
+    if shape == "dmy":
+        day, separator, month, year = match.groups()
+        day, month = int(day), int(month)
+        if separator == "/" and month > 12 >= day:
+            day, month = month, day
+        return datetime.date(int(year), month, day)
+    day, month = match.groups()
+    month = MONTHS.get(month.lower())
+    if month is None:
+        return None
+    date = datetime.date(now.year, month, int(day))
+    # Sans année: une date "future" date de l'année précédente (offre de décembre lue en janvier)
+    return date.replace(year=now.year - 1) if date > now.date() else date
+
+
+def _from_relative(match, now):
+    if match.group("yesterday"):
+        return (now - datetime.timedelta(days=1)).date()
+    if match.group("today"):
+        return now.date()
+    unit = match.lastgroup
+    return (now - int(match.group(unit)) * RELATIVE_UNITS[unit]).date()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(text, source, now):
+    hints = SOURCE_HINTS.get(source, ())
+    for shape in hints + tuple(s for s in DEFAULT_ORDER if s not in hints):
+        if shape == "relative":
+            match = RELATIVE.search(text)
+            if match:
+                return _from_relative(match, now)
+            continue
+        match = SHAPES[shape].fullmatch(text)
+        if match:
+            try:
+                return _from_shape(shape, match, now)
+            except ValueError:
+                # 31/02/2025: la forme est reconnue mais la date n'existe pas
+                break
+    # Journalisé une seule fois par chaîne grâce au cache
+    logging.warning(f"Aucun format reconnu pour la date '{text}' ({source}).")
+    return None
+
+
+def parse_date(text, source=None):
+    """Retourne la date (datetime.date) décrite par `text`, None si elle n'est pas reconnue.
+
+    source: le site d'origine ("rekrute", "emploi", "marocannonces", "bayt"), dont les
+    formes habituelles sont essayées en premier
+    """
+    if not text or not isinstance(text, str):
+        return None
+    return _parse(text.strip(), source, _clock())
+
+
+def normalize_date(text, source=None, fmt=ISO_FORMAT, default=None):
+    """Date de `text` au format `fmt` (ISO par défaut), `default` si elle n'est pas reconnue."""
+    date = parse_date(text, source)
+    return date.strftime(fmt) if date else default
+
+
+def normalize_dates(values, source=None, fmt=ISO_FORMAT, keep_unparsed=True):
+    """Normalise une colonne de dates: chaque valeur distincte n'est convertie qu'une fois.
+
+    keep_unparsed: garder telle quelle une valeur non reconnue (sinon None)
+    """
+    converted = {}
+    result = []
+    for value in values:
+        if value not in converted:
+            default = value if keep_unparsed else None
+            converted[value] = (
+                normalize_date(value, source, fmt, default)
+                if isinstance(value, str)
+                else default
+            )
+        result.append(converted[value])
+    return result
@@ -1,5 +1,21 @@
+from celery.schedules import crontab
+
 broker_url = "redis://redis:6379/0"
 result_backend = "redis://redis:6379/0"
 worker_send_task_events = True  # to use flower event monitoring
 events_logfile = "celery.log"
 events_pidfile = "celery.pid"
+
+# Crawls incrémentaux planifiés d'après le débit de nouvelles offres de chaque site et
+# mot-clé (la tâche ne lance que les crawls dus), crawl complet (backfill) chaque semaine
+beat_schedule = {
+    "adaptive-recrawl": {
+        "task": "recrawl",
+        "schedule": crontab(minute="*/15"),
+    },
+    "weekly-full-crawl": {
+        "task": "web_scrape",
+        "schedule": crontab(hour=2, minute=0, day_of_week="sunday"),
+        "kwargs": {"full_crawl": True},
+    },
+}
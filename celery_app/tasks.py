@@ -1,6 +1,17 @@
-from celery import Celery, group
+import os
+
+from celery import Celery, chord, group
+from celery.signals import worker_process_init, worker_process_shutdown
 
 from data_extraction.Websites import MarocAnn, Rekrute, bayt, emploi
+from data_extraction.Websites.checkpoint import Checkpoint
+from data_extraction.Websites.driver_pool import close_driver_pool, get_driver_pool
+from data_extraction.Websites.frontier import frontier_workers, get_frontier
+from data_extraction.Websites.html_fetch import PageFetcher
+from data_extraction.Websites.incremental import is_full_crawl
+from data_extraction.Websites.recrawl import get_crawl_stats
+from data_extraction.Websites.search import search_keywords, search_url
+from data_extraction.Websites.sharding import merge_shards, shard_size, split_pages
 
 # Names the app "celery_app"
 app = Celery("celery_app")
@@ -9,50 +20,274 @@ default_config = "celery_app.celeryconfig"
 app.config_from_object(default_config)
 
 
+@worker_process_init.connect
+def warm_up_driver_pool(**kwargs):
+    # Chaque processus du worker démarre ses drivers une seule fois, avant les crawls
+    if os.getenv("DRIVER_POOL_WARMUP", "1") == "1":
+        try:
+            get_driver_pool().warm_up()
+        except Exception as e:
+            print(f"Impossible de préchauffer le pool de drivers: {e}")
+
+
+@worker_process_shutdown.connect
+def shutdown_driver_pool(**kwargs):
+    close_driver_pool()
+
+
+def rekrute_shards(full_crawl, keywords=None):
+    """Chord des tranches de pages d'un crawl complet Rekrute, None s'il n'y a pas lieu de découper.
+
+    keywords: les mots-clés demandés à la tâche, SEARCH_KEYWORDS par défaut
+    """
+    if not is_full_crawl(full_crawl):
+        return None
+    with PageFetcher("div.holder") as fetcher:
+        # Les pages de tous les mots-clés, les doublons sont retirés par merge_shards_task
+        page_urls = [
+            page_url
+            for keyword in keywords or search_keywords("rekrute")
+            for page_url in Rekrute.list_pages(fetcher, search_url("rekrute", keyword))
+        ]
+    if len(page_urls) <= shard_size():
+        return None
+    shards = group(
+        [
+            rekrute_shard_task.s(page_range, full_crawl)
+            for page_range in split_pages(page_urls)
+        ]
+    )
+    print(f"Rekrute: {len(page_urls)} pages réparties en {len(shards)} tranches")
+    return chord(shards, merge_shards_task.s("offres_emploi_rekrute.json"))
+
+
 @app.task(name="rekrute", bind=True, max_retries=3, default_retry_delay=10)
-def rekrute_task(self):
+def rekrute_task(self, full_crawl=None, keywords=None, depths=None):
     try:
         print("Appel du script rekrute")
-        return Rekrute.main()
+        shards = rekrute_shards(full_crawl, keywords)
+        if shards is None:
+            return Rekrute.main(full_crawl=full_crawl, keywords=keywords, depths=depths)
     except Exception as e:
         print(f"Exception lors de l'execution du script rekrute: {e} ")
         raise self.retry(exc=e)
+    # Crawl complet: la tâche est remplacée par les tranches, fusionnées dans le callback
+    raise self.replace(shards)
+
+
+def run_shard(task, site, pending, crawl):
+    """Exécute une tranche avec un point de reprise propre à la tâche.
+
+    L'id de tâche est conservé entre les essais: un retry reprend à la première page non
+    traitée de la tranche. Au dernier essai, les offres déjà extraites sont rendues au
+    callback du chord plutôt que perdues.
+
+    crawl: fonction (pages, data, checkpoint) qui parcourt les pages restantes
+    """
+    checkpoint = Checkpoint(f"{site}_shard_{task.request.id}")
+    state = checkpoint.load()
+    data = []
+    if state is not None:
+        data.extend(state["offers"])
+        pending = state["pending"]
+    else:
+        checkpoint.save(pending=list(pending))
+    try:
+        crawl(pending, data, checkpoint)
+    except Exception as e:
+        print(f"Exception lors de l'extraction d'une tranche {site}: {e} ")
+        if task.request.retries < task.max_retries:
+            raise task.retry(exc=e)
+        print(f"Tranche {site} abandonnée avec {len(data)} offres partielles")
+    checkpoint.clear()
+    return data
+
+
+@app.task(name="rekrute_shard", bind=True, max_retries=3, default_retry_delay=10)
+def rekrute_shard_task(self, page_urls, full_crawl=None):
+    """Extrait une tranche de pages Rekrute, la sauvegarde est faite par merge_shards_task."""
+
+    def crawl(pending, data, checkpoint):
+        with PageFetcher("div.holder") as fetcher:
+            Rekrute.crawl_pages(fetcher, pending, full_crawl, data, checkpoint)
+
+    return run_shard(self, "rekrute", page_urls, crawl)
+
+
+def bayt_shards(full_crawl, keywords=None):
+    """Chord des tranches de pages d'un crawl complet bayt, None s'il n'y a pas lieu de découper.
+
+    keywords: les mots-clés demandés à la tâche, SEARCH_KEYWORDS par défaut
+    """
+    if not is_full_crawl(full_crawl):
+        return None
+    searches = []
+    with get_driver_pool().driver() as driver:
+        for keyword in keywords or search_keywords("bayt"):
+            searches.append(bayt.open_search(driver, keyword))
+    if sum(max_pages for _, max_pages in searches) <= shard_size():
+        return None
+    shards = group(
+        [
+            bayt_shard_task.s(main_page, page_range, full_crawl)
+            for main_page, max_pages in searches
+            for page_range in split_pages(range(1, max_pages + 1))
+        ]
+    )
+    print(f"Bayt: {len(searches)} recherches réparties en {len(shards)} tranches")
+    return chord(shards, merge_shards_task.s("offres_emploi_bayt.json"))
 
 
 @app.task(name="bayt", bind=True, max_retries=3, default_retry_delay=10)
-def bayt_task(self):
+def bayt_task(self, full_crawl=None, keywords=None, depths=None):
     try:
         print("Appel du script bayt")
-        return bayt.main()
+        replacement = detail_workers(
+            "bayt",
+            lambda frontier: bayt.enqueue_details(
+                frontier, keywords, full_crawl, depths
+            ),
+        )
+        if replacement is None:
+            replacement = bayt_shards(full_crawl, keywords)
+        if replacement is None:
+            return bayt.main(full_crawl=full_crawl, keywords=keywords, depths=depths)
     except Exception as e:
         print(f"Exception lors de l'execution du script bayt: {e} ")
         raise self.retry(exc=e)
+    raise self.replace(replacement)
+
+
+@app.task(name="bayt_shard", bind=True, max_retries=3, default_retry_delay=10)
+def bayt_shard_task(self, main_page, pages, full_crawl=None):
+    """Extrait une tranche de pages bayt, la sauvegarde est faite par merge_shards_task."""
+
+    def crawl(pending, data, checkpoint):
+        with get_driver_pool().driver() as driver:
+            bayt.crawl_pages(
+                driver,
+                main_page,
+                pending,
+                full_crawl=full_crawl,
+                data=data,
+                checkpoint=checkpoint,
+            )
+
+    return run_shard(self, "bayt", pages, crawl)
+
+
+@app.task(name="merge_shards")
+def merge_shards_task(results, filename):
+    """Callback du chord: fusionne, dédoublonne et sauvegarde les offres des tranches."""
+    return merge_shards(results, filename)
+
+
+def detail_workers(site, enqueue):
+    """Met les offres du site en file dans la frontière Redis et retourne le groupe de
+    workers qui extraient leurs détails, None si la frontière n'est pas configurée.
+
+    enqueue: fonction (frontier) -> nombre d'offres en file, qui parcourt les listings
+    """
+    frontier = get_frontier(site)
+    if frontier is None:
+        return None
+    queued = enqueue(frontier)
+    workers = frontier_workers()
+    print(f"{site}: {queued} offres en file pour {workers} workers")
+    return group([frontier_details_task.s(site) for _ in range(workers)])
+
+
+# Workers de la frontière par site: fonction (frontier) -> nombre d'offres sauvegardées
+DETAIL_WORKERS = {
+    "bayt": bayt.drain_details,
+    "marocannonces": MarocAnn.drain_details,
+}
+
+
+@app.task(name="frontier_details", bind=True, max_retries=3, default_retry_delay=10)
+def frontier_details_task(self, site):
+    """Extrait les pages de détail en file pour un site, sur n'importe quel worker.
+
+    Les offres d'un worker arrêté sont remises en file à l'expiration de leur bail.
+    """
+    try:
+        return DETAIL_WORKERS[site](get_frontier(site))
+    except Exception as e:
+        print(f"Exception lors de l'extraction des détails {site}: {e} ")
+        raise self.retry(exc=e)
 
 
 @app.task(name="Marocannonce", bind=True, max_retries=3, default_retry_delay=10)
-def marocann_task(self):
+def marocann_task(self, full_crawl=None, keywords=None, depths=None):
     try:
         print("Appel du script maroc annonces")
-        return MarocAnn.main()
+        workers = detail_workers(
+            "marocannonces",
+            lambda frontier: MarocAnn.enqueue_details(
+                frontier, keywords, full_crawl=full_crawl, depths=depths
+            ),
+        )
+        if workers is None:
+            return MarocAnn.main(
+                full_crawl=full_crawl, keywords=keywords, depths=depths
+            )
     except Exception as e:
         print(f"Exception lors de l'execution du script emploi marocann: {e} ")
         raise self.retry(exc=e)
+    raise self.replace(workers)
 
 
 @app.task(name="emploi", bind=True, max_retries=3, default_retry_delay=10)
-def emploi_task(self):
+def emploi_task(self, full_crawl=None, keywords=None, depths=None):
     try:
         print("Appel du script emploi")
-        return emploi.main()
+        return emploi.main(full_crawl=full_crawl, keywords=keywords, depths=depths)
     except Exception as e:
         print(f"Exception lors de l'execution du script emploi: {e} ")
         raise self.retry(exc=e)
 
 
 @app.task(name="web_scrape")
-def web_scrape():
+def web_scrape(full_crawl=None):
+    """Lance les quatre scrapers. full_crawl=True parcourt toutes les pages (backfill),
+    sinon chaque site s'arrête dès que ses pages ne contiennent plus que des offres connues."""
     scrapers = group(
-        emploi_task.s(), rekrute_task.s(), bayt_task.s(), marocann_task.s()
+        emploi_task.s(full_crawl),
+        rekrute_task.s(full_crawl),
+        bayt_task.s(full_crawl),
+        marocann_task.s(full_crawl),
     )
+    # Pas de result.get() dans une tâche: les sous-tâches découpées en tranches
+    # occupent les mêmes workers, attendre ici pourrait bloquer tous les slots
     result = scrapers.apply_async()
-    print(f"The group finished running with these results: {result.get()}")
+    print(f"Scrapers lancés: {result.id}")
+    return result.id
+
+
+# Tâche de chaque site, lancée par le planificateur adaptatif
+SITE_TASKS = {
+    "rekrute": rekrute_task,
+    "bayt": bayt_task,
+    "emploi": emploi_task,
+    "marocannonces": marocann_task,
+}
+
+
+@app.task(name="recrawl")
+def recrawl_task():
+    """Lance les crawls incrémentaux arrivés à échéance (appelée régulièrement par beat).
+
+    Chaque site ne crawle que ses mots-clés dus, à la profondeur choisie d'après le
+    nombre de nouvelles offres observé aux crawls précédents (voir Websites.recrawl).
+    """
+    stats = get_crawl_stats()
+    launched = {}
+    for site, task in SITE_TASKS.items():
+        depths = stats.due(site, search_keywords(site))
+        if not depths:
+            continue
+        stats.mark_dispatched(site, depths)
+        task.delay(keywords=list(depths), depths=depths)
+        launched[site] = depths
+    print(f"Crawls planifiés lancés: {launched}")
+    return launched
@@ -20,16 +20,19 @@ if not client.bucket_exists(BUCKET_NAME):
 else:
     print(f"📦 Bucket '{BUCKET_NAME}' déjà existant.")
 
-# --- Upload automatique de tous les fichiers .json ---
-for filename in os.listdir(FOLDER_PATH):
-    if filename.endswith(".json"):
-        file_path = os.path.join(FOLDER_PATH, filename)
-        object_name = f"scraping_output/{filename}"
+# --- Upload automatique de tous les fichiers .json et des segments .jsonl ---
+for root, _, filenames in os.walk(FOLDER_PATH):
+    for filename in filenames:
+        if not filename.endswith((".json", ".jsonl")):
+            continue
+        file_path = os.path.join(root, filename)
+        relative_path = os.path.relpath(file_path, FOLDER_PATH).replace(os.sep, "/")
+        object_name = f"scraping_output/{relative_path}"
 
         try:
             client.fput_object(
                 BUCKET_NAME, object_name, file_path, content_type="application/json"
             )
-            print(f"📤 Upload : {filename}")
+            print(f"📤 Upload : {relative_path}")
         except S3Error as err:
-            print(f"❌ Erreur : {filename} → {err}")
+            print(f"❌ Erreur : {relative_path} → {err}")